@@ -0,0 +1,201 @@
+"""
+Backends de transcripción
+Todos devuelven un TranscriptionResult cuya salida tiene la forma del modelo Whisper de
+Replicate ({'transcription': SRT, 'segments': [...], 'detected_language': ...}), de modo que
+save_transcription / save_transcription_files funcionan igual con cualquiera de ellos
+"""
+
+import importlib.util
+import os
+import threading
+from pathlib import Path
+
+from results import TranscriptionResult
+
+REPLICATE_MODEL_VERSION = "8099696689d249cf8b122d833c36ac3f75505c666a395ca40ef26f68e7d3d16e"
+
+
+def seconds_to_srt_time(seconds):
+    """Segundos → 00:01:23,456"""
+    millis = int(round(seconds * 1000))
+    hours, millis = divmod(millis, 3600000)
+    minutes, millis = divmod(millis, 60000)
+    secs, millis = divmod(millis, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d},{millis:03d}"
+
+
+def segments_to_srt(segments):
+    """Lista de segmentos {'start', 'end', 'text'} → contenido SRT"""
+    blocks = []
+    for i, segment in enumerate(segments, 1):
+        blocks.append(f"{i}\n{seconds_to_srt_time(segment['start'])} --> "
+                      f"{seconds_to_srt_time(segment['end'])}\n{segment['text'].strip()}\n")
+    return '\n'.join(blocks)
+
+
+class TranscriptionBackend:
+    """Interfaz común de los motores de transcripción"""
+
+    name = 'base'
+    # Tamaño máximo del audio de entrada en MB (None = sin límite, no hace falta comprimir)
+    max_size_mb = None
+    # Códecs que acepta al comprimir, por orden de preferencia
+    compression_formats = ('mp3',)
+
+    def unavailable_reason(self, downloader):
+        """None si el backend puede usarse; si no, el motivo para mostrar al usuario"""
+        return None
+
+    def transcribe(self, downloader, audio_path, output_base=None, writer=None) -> TranscriptionResult:
+        """writer: PartialTranscriptWriter opcional al que se entregan los segmentos según llegan"""
+        raise NotImplementedError
+
+
+class ReplicateBackend(TranscriptionBackend):
+    """Whisper en Replicate: subida + predicción + polling (ver VideoDownloader.transcribe_with_replicate)"""
+
+    name = 'replicate'
+    max_size_mb = 45
+    # El modelo decodifica la entrada con ffmpeg: Opus da mejor voz por byte que MP3
+    compression_formats = ('opus', 'mp3')
+
+    def __init__(self, model_version=REPLICATE_MODEL_VERSION, model='large-v3', language='auto'):
+        self.model_version = model_version
+        self.model = model
+        self.language = language
+
+    def build_input(self, audio):
+        return {
+            "audio": audio,
+            "model": self.model,  # large-v3: el modelo más preciso
+            "transcription": "srt",  # Formato SRT con timestamps
+            "language": self.language,  # auto: detección automática de idioma
+            "translate": False,  # No traducir, mantener idioma original
+            "temperature": 0,  # Más determinístico
+            "suppress_tokens": "-1",  # Tokens a suprimir
+            "condition_on_previous_text": True,  # Usar contexto previo
+            "compression_ratio_threshold": 2.4,
+            "logprob_threshold": -1.0,
+            "no_speech_threshold": 0.6,
+            "temperature_increment_on_fallback": 0.2
+        }
+
+    def unavailable_reason(self, downloader):
+        return None if downloader.replicate_token else "falta REPLICATE_API_TOKEN en .env"
+
+    def transcribe(self, downloader, audio_path, output_base=None, writer=None):
+        return downloader.transcribe_with_replicate(audio_path, output_base, backend=self, writer=writer)
+
+
+class FasterWhisperBackend(TranscriptionBackend):
+    """
+    Whisper local en CPU con faster-whisper (CTranslate2, cuantización int8).
+    Sin subida ni cola: útil para clips cortos y sin límite de tamaño
+    """
+
+    name = 'local'
+    max_size_mb = None
+    compression_formats = ('opus', 'mp3')
+
+    # Los modelos cargados se comparten entre descargadores (cargar large-v3 tarda segundos)
+    _models = {}
+    _models_lock = threading.Lock()
+
+    def __init__(self, model='large-v3', compute_type='int8', threads=None, batch_size=8, beam_size=5,
+                 language=None, device='cpu'):
+        self.model = model
+        self.compute_type = compute_type
+        self.threads = threads or os.cpu_count() or 4
+        self.batch_size = batch_size
+        self.beam_size = beam_size
+        self.language = language
+        self.device = device
+
+    def unavailable_reason(self, downloader):
+        if importlib.util.find_spec('faster_whisper') is None:
+            return "faster-whisper no está instalado (pip install faster-whisper)"
+        return None
+
+    def _load_model(self):
+        key = (self.model, self.device, self.compute_type, self.threads)
+        with self._models_lock:
+            model = self._models.get(key)
+            if model is None:
+                from faster_whisper import WhisperModel
+                model = WhisperModel(self.model, device=self.device, compute_type=self.compute_type,
+                                     cpu_threads=self.threads)
+                self._models[key] = model
+        return model
+
+    def transcribe(self, downloader, audio_path, output_base=None, writer=None):
+        reason = self.unavailable_reason(downloader)
+        if reason:
+            downloader._log(f"❌ No se puede transcribir en local: {reason}")
+            return TranscriptionResult(False, str(audio_path), error=reason)
+
+        downloader._log(f"\n🎤 Transcribiendo en local ({self.model}, {self.compute_type}, "
+                        f"{self.threads} hilos, lotes de {self.batch_size}): {Path(audio_path).name}")
+
+        with downloader._stage('transcribe', audio_path=str(audio_path), backend=self.name,
+                               bytes=downloader._file_size(audio_path)) as span:
+            try:
+                with downloader._stage('model_load', model=self.model):
+                    model = self._load_model()
+
+                options = {'beam_size': self.beam_size, 'language': self.language}
+                if self.batch_size and self.batch_size > 1:
+                    from faster_whisper import BatchedInferencePipeline
+                    segments_iter, info = BatchedInferencePipeline(model=model).transcribe(
+                        str(audio_path), batch_size=self.batch_size, **options)
+                else:
+                    segments_iter, info = model.transcribe(str(audio_path), **options)
+
+                # La decodificación ocurre al iterar los segmentos: cada uno se persiste al llegar
+                downloader._emit('spinner.start', "Transcribiendo")
+                try:
+                    segments = []
+                    for i, segment in enumerate(segments_iter):
+                        segments.append({'id': i, 'start': segment.start, 'end': segment.end, 'text': segment.text})
+                        if writer is not None:
+                            writer.add(segments[-1])
+                finally:
+                    downloader._emit('spinner.stop')
+            except Exception as e:
+                span['ok'] = False
+                downloader._log(f"❌ Error en transcripción local: {e}")
+                return TranscriptionResult(False, str(audio_path), error=str(e))
+
+            span['ok'] = True
+            span['media_seconds'] = getattr(info, 'duration', None)
+
+        output = {
+            'transcription': segments_to_srt(segments),
+            'segments': segments,
+            'detected_language': getattr(info, 'language', None),
+            'language_probability': getattr(info, 'language_probability', None),
+            'backend': self.name,
+            'model': self.model,
+        }
+        downloader._log(f"✅ Transcripción completada ({len(segments)} segmentos)")
+        return TranscriptionResult(True, str(audio_path), output)
+
+
+BACKENDS = {
+    'replicate': ReplicateBackend,
+    'local': FasterWhisperBackend,
+}
+
+
+def make_backend(name=None, **options):
+    """
+    Crea un backend por nombre (por defecto DESCARGA_VIDEOS_BACKEND o 'replicate').
+    Las opciones que no apliquen al backend elegido (p. ej. threads para Replicate) se ignoran
+    """
+    name = name or os.environ.get('DESCARGA_VIDEOS_BACKEND') or 'replicate'
+    if name not in BACKENDS:
+        raise ValueError(f"Backend de transcripción no válido: {name} (usa {', '.join(BACKENDS)})")
+
+    if name == 'local':
+        options = {key: value for key, value in options.items() if value is not None}
+        return FasterWhisperBackend(**options)
+    return ReplicateBackend()
@@ -0,0 +1,195 @@
+"""
+Fixtures sintéticas para los benchmarks: páginas HTML de varios MB, SRT de N segmentos,
+JSON de transcripción y stubs de yt-dlp/ffmpeg/ffprobe/Replicate para el pipeline completo
+"""
+
+import hashlib
+import json
+import os
+import random
+import stat
+import sys
+import textwrap
+import time
+import types
+
+VOCABULARY = (
+    "vamos a empezar hoy hablamos de ventas clientes estrategia negocio objetivo plan problema "
+    "solución ejemplo pregunta herramienta plataforma entonces bueno vale importante cuando "
+    "proceso equipo mercado precio producto campaña resultado semana mes llamada reunión idea"
+).split()
+
+
+def seconds_to_srt(seconds):
+    return (f"{int(seconds // 3600):02d}:{int((seconds % 3600) // 60):02d}:"
+            f"{int(seconds % 60):02d},{int((seconds % 1) * 1000):03d}")
+
+
+def make_segments(count, seed=42):
+    """Segmentos tipo Whisper con pausas variables (algunas > 3 s para formar párrafos)"""
+    rng = random.Random(seed)
+    segments = []
+    current = 0.0
+    for _ in range(count):
+        current += rng.choice((0.1, 0.2, 0.3, 0.5, 4.0)) if rng.random() < 0.3 else 0.05
+        duration = rng.uniform(1.5, 5.0)
+        words = rng.choices(VOCABULARY, k=rng.randint(6, 16))
+        segments.append({'start': round(current, 3), 'end': round(current + duration, 3),
+                         'text': ' ' + ' '.join(words)})
+        current += duration
+    return segments
+
+
+def make_srt(count, seed=42):
+    lines = []
+    for i, segment in enumerate(make_segments(count, seed), 1):
+        lines.append(str(i))
+        lines.append(f"{seconds_to_srt(segment['start'])} --> {seconds_to_srt(segment['end'])}")
+        lines.append(segment['text'].strip())
+        lines.append("")
+    return '\n'.join(lines)
+
+
+def make_transcription_json(count, seed=42):
+    """Salida tal como la devuelve el modelo de Replicate (SRT escapado + segmentos)"""
+    return {
+        'detected_language': 'spanish',
+        'transcription': make_srt(count, seed).replace('\n', '\\n'),
+        'segments': make_segments(count, seed),
+    }
+
+
+EMBEDS = (
+    '<iframe src="https://player.vimeo.com/video/{vimeo_id}?h=a1b2c3d4e5&amp;badge=0&amp;autopause=0" '
+    'frameborder="0" allow="autoplay; fullscreen"></iframe>',
+    '<div data-player-url="https://player.vimeo.com/video/{vimeo_id}"></div>',
+    '<script>window.lesson = {{"video_id": "{vimeo_id}", "provider": "vimeo"}};</script>',
+    '<a href="https://www.loom.com/share/{loom_id}?sid=abc">Loom</a>',
+    '<iframe src="https://www.loom.com/embed/{loom_id}" allowfullscreen></iframe>',
+)
+
+FILLER = (
+    '<div class="lesson-card"><h3 class="title">Lección {n}</h3><p class="text">{words}</p>'
+    '<span data-track="click" data-id="{n}">ver más</span></div>\n'
+)
+
+
+def make_html(size_bytes, embeds_every=200_000, seed=42):
+    """Página HTML sintética de ~size_bytes con embeds de Vimeo/Loom repartidos"""
+    rng = random.Random(seed)
+    parts = ['<!DOCTYPE html><html lang="es"><head><title>Curso</title></head><body>\n']
+    total = len(parts[0])
+    next_embed = embeds_every
+    n = 0
+    while total < size_bytes:
+        n += 1
+        chunk = FILLER.format(n=n, words=' '.join(rng.choices(VOCABULARY, k=30)))
+        if total >= next_embed:
+            chunk += rng.choice(EMBEDS).format(vimeo_id=rng.randint(10 ** 8, 10 ** 9 - 1),
+                                               loom_id='%032x' % rng.getrandbits(128))
+            next_embed += embeds_every
+        parts.append(chunk)
+        total += len(chunk)
+    parts.append('</body></html>\n')
+    return ''.join(parts)
+
+
+# === Stubs del pipeline completo ===
+
+YTDLP_STUB = '''
+import json, os, re, sys, time
+args = sys.argv[1:]
+template = args[args.index("-o") + 1]
+directory = os.path.dirname(template)
+os.makedirs(directory, exist_ok=True)
+# Un archivo por video (las descargas en paralelo no se pisan); BENCH_YTDLP_DELAY simula la red
+video_id = (re.findall(r"\\d{6,}", args[0]) or ["0"])[-1]
+delay = float(os.environ.get("BENCH_YTDLP_DELAY", "0"))
+video = os.path.join(directory, f"Bench Video {video_id}.mp4")
+print(f"[download] Destination: {video}", flush=True)
+for percent in (10.0, 50.0, 90.0):
+    time.sleep(delay / 3)
+    print(f"[download]  {percent}% of 10.00MiB at 5.00MiB/s ETA 00:01", flush=True)
+with open(video, "wb") as f:
+    f.write(os.urandom(1024 * 1024))
+with open(os.path.join(directory, f"Bench Video {video_id}.info.json"), "w") as f:
+    json.dump({"id": video_id, "title": "Bench Video", "duration": 3600}, f)
+print("[download] 100% of 10.00MiB", flush=True)
+'''
+
+FFMPEG_STUB = '''
+import sys
+with open(sys.argv[-1], "wb") as f:
+    f.write(b"\\0" * 256 * 1024)
+'''
+
+FFPROBE_STUB = '''
+import json, sys
+if "json" in sys.argv:
+    print(json.dumps({"format": {"duration": "3600.0"},
+                      "streams": [{"codec_type": "audio", "codec_name": "mp3", "sample_rate": "16000"}]}))
+else:
+    print("3600.0")
+'''
+
+
+def install_tool_stubs(directory):
+    """Crea ejecutables falsos de yt-dlp/ffmpeg/ffprobe y los antepone al PATH"""
+    os.makedirs(directory, exist_ok=True)
+    for name, body in (('yt-dlp', YTDLP_STUB), ('ffmpeg', FFMPEG_STUB), ('ffprobe', FFPROBE_STUB)):
+        path = os.path.join(directory, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(f"#!{sys.executable}\n" + textwrap.dedent(body))
+        os.chmod(path, os.stat(path).st_mode | stat.S_IEXEC)
+    os.environ['PATH'] = directory + os.pathsep + os.environ.get('PATH', '')
+
+
+class _FakePrediction:
+    def __init__(self, prediction_id, output=None):
+        self.id = prediction_id
+        self.status = 'succeeded' if output is not None else 'starting'
+        self.output = output
+        self.logs = ''
+        self.error = None
+        self.created_at = '2025-01-01T00:00:00.000000Z'
+        self.started_at = '2025-01-01T00:00:01.000000Z'
+        self.completed_at = '2025-01-01T00:00:05.000000Z'
+        self.metrics = {'predict_time': 4.0}
+
+
+def install_replicate_stub(segments=2000):
+    """Sustituye el módulo `replicate` por uno en memoria que responde al instante"""
+    output = make_transcription_json(segments)
+    output['transcription'] = output['transcription'].replace('\\n', '\n')
+
+    module = types.ModuleType('replicate')
+
+    def create(version=None, input=None, **kwargs):
+        audio = input.get('audio')
+        if hasattr(audio, 'read'):
+            audio.read()
+        return _FakePrediction('bench-prediction')
+
+    def get(prediction_id):
+        return _FakePrediction(prediction_id, output)
+
+    def create_file(file, **kwargs):
+        digest = hashlib.sha256(file.read()).hexdigest()
+        return types.SimpleNamespace(id=digest[:16], urls={'get': f'https://stub.invalid/files/{digest}'},
+                                     expires_at=time.time() + 24 * 3600)
+
+    def cancel(prediction_id):
+        prediction = _FakePrediction(prediction_id)
+        prediction.status = 'canceled'
+        return prediction
+
+    module.predictions = types.SimpleNamespace(create=create, get=get, cancel=cancel)
+    module.files = types.SimpleNamespace(create=create_file)
+    sys.modules['replicate'] = module
+    os.environ.setdefault('REPLICATE_API_TOKEN', 'r8_benchmark_stub_token')
+    return module
+
+
+def write_json(path, data):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
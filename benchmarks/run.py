@@ -0,0 +1,251 @@
+"""
+Suite de benchmarks offline de descarga_videos
+
+Mide los caminos calientes sin red ni herramientas reales:
+  - extract_video_urls_from_text sobre 1.html y páginas sintéticas de varios MB
+  - parse_srt_content con 10k-500k segmentos
+  - cada generate_* de TranscriptionFormatter y su slice() por rango de tiempo
+  - extract_srt_from_json_data
+  - carga de una transcripción: JSON indentado frente a formato compacto con mmap
+  - pipeline completo (descarga → audio → transcripción → formatos) con yt-dlp, ffmpeg,
+    ffprobe y Replicate sustituidos por stubs
+  - 8 descargas con el stub de yt-dlp: una tras otra frente a supervisadas en paralelo
+
+Uso:
+  python benchmarks/run.py                      # ejecuta y compara con benchmarks/baseline.json
+  python benchmarks/run.py --quick              # tamaños reducidos
+  python benchmarks/run.py --only parse_srt     # filtra casos por prefijo
+  python benchmarks/run.py --save-baseline      # guarda los resultados como nueva referencia
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import fixtures  # noqa: E402
+from events import EventBus  # noqa: E402
+from main import TranscriptionFormatter, VideoDownloader  # noqa: E402
+
+BASELINE_PATH = Path(__file__).resolve().parent / 'baseline.json'
+
+FULL_SIZES = {'html_mb': (2, 8), 'srt_segments': (10_000, 100_000, 500_000), 'format_segments': 100_000}
+QUICK_SIZES = {'html_mb': (2,), 'srt_segments': (10_000,), 'format_segments': 10_000}
+
+
+def measure(func, repeat):
+    """Ejecuta func `repeat` veces; devuelve los tiempos en segundos"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def build_cases(sizes, workdir):
+    """Genera (nombre, función, parámetros) para cada caso; las fixtures se crean una sola vez"""
+    downloader = VideoDownloader(events=EventBus())
+    cases = []
+
+    # === Extracción de URLs ===
+    html_1 = ROOT / '1.html'
+    if html_1.exists():
+        text = downloader.read_html_file(str(html_1))
+        cases.append(('extract_urls.1html', lambda text=text: downloader.extract_video_urls_from_text(text),
+                      {'bytes': len(text)}))
+    for mb in sizes['html_mb']:
+        text = fixtures.make_html(mb * 1024 * 1024)
+        cases.append((f'extract_urls.synthetic_{mb}mb',
+                      lambda text=text: downloader.extract_video_urls_from_text(text), {'bytes': len(text)}))
+
+    # === Parseo de SRT ===
+    for count in sizes['srt_segments']:
+        srt = fixtures.make_srt(count)
+        cases.append((f'parse_srt.{count // 1000}k',
+                      lambda srt=srt: TranscriptionFormatter().parse_srt_content(srt), {'segments': count}))
+
+    # === Formatos legibles ===
+    count = sizes['format_segments']
+    formatter = TranscriptionFormatter()
+    formatter.parse_srt_content(fixtures.make_srt(count))
+    for method in ('generate_clean_transcript', 'generate_conversation_format',
+                   'generate_summary_by_topics', 'generate_searchable_index'):
+        output_path = os.path.join(workdir, f'{method}.txt')
+        cases.append((f'format.{method}',
+                      lambda method=method, output_path=output_path: getattr(formatter, method)(output_path),
+                      {'segments': count}))
+
+    # Ventana de 5 minutos en mitad de la transcripción (búsqueda binaria sobre los inicios)
+    middle = formatter.starts[len(formatter.starts) // 2]
+    cases.append(('slice.formatter_5min', lambda: formatter.slice(middle, middle + 300), {'segments': count}))
+
+    # === Extracción de SRT desde JSON ===
+    data = fixtures.make_transcription_json(count)
+    cases.append(('extract_srt_from_json.transcription',
+                  lambda data=data: downloader.extract_srt_from_json_data(data), {'segments': count}))
+    segments_only = {'segments': data['segments']}
+    cases.append(('extract_srt_from_json.segments',
+                  lambda data=segments_only: downloader.extract_srt_from_json_data(data), {'segments': count}))
+
+    # === Carga de transcripciones: JSON indentado frente a formato compacto (mmap) ===
+    from compact import CompactTranscript, write_compact
+
+    json_path = os.path.join(workdir, 'load_transcription.json')
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    bin_path = os.path.join(workdir, 'load_transcription.bin')
+    write_compact(bin_path, data)
+
+    def load_json():
+        with open(json_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def slice_compact():
+        with CompactTranscript(bin_path) as transcript:
+            middle = transcript.starts[len(transcript) // 2] / 1000
+            return transcript.slice(middle, middle + 300)
+
+    cases.append(('load.json', load_json, {'segments': count, 'bytes': os.path.getsize(json_path)}))
+    cases.append(('load.compact_slice', slice_compact, {'segments': count, 'bytes': os.path.getsize(bin_path)}))
+
+    # === Pipeline completo con stubs ===
+    fixtures.install_tool_stubs(os.path.join(workdir, 'bin'))
+    fixtures.install_replicate_stub()
+
+    def pipeline():
+        output_dir = tempfile.mkdtemp(dir=workdir, prefix='pipeline-')
+        result = downloader.process_single_url('https://vimeo.com/123456789', output_dir=output_dir,
+                                               extract_audio=True, transcribe=True)
+        if not (isinstance(result, dict) and result.get('transcribed')):
+            raise RuntimeError(f"El pipeline con stubs no completó la transcripción: {result!r}")
+
+    cases.append(('pipeline.end_to_end', pipeline, {'stubbed': True}))
+
+    # === Descargas: 8 yt-dlp (stub con 0,3 s de "red") uno tras otro o supervisados a la vez ===
+    urls = [f'https://vimeo.com/{100000000 + i}' for i in range(8)]
+
+    def downloads(parallel):
+        def run_downloads():
+            output_dir = tempfile.mkdtemp(dir=workdir, prefix='downloads-')
+            os.environ['BENCH_YTDLP_DELAY'] = '0.3'
+            try:
+                if parallel:
+                    results = downloader.download_many([(url, 'vimeo', None) for url in urls], output_dir, 8)
+                else:
+                    results = [downloader.download(url, 'vimeo', output_dir) for url in urls]
+            finally:
+                os.environ.pop('BENCH_YTDLP_DELAY', None)
+            if not all(result.ok and result.video_path for result in results):
+                raise RuntimeError("Alguna descarga con stubs falló")
+        return run_downloads
+
+    cases.append(('download.sequential_8', downloads(False), {'stubbed': True, 'videos': len(urls)}))
+    cases.append(('download.parallel_8', downloads(True), {'stubbed': True, 'videos': len(urls)}))
+    return cases
+
+
+def run(args):
+    sizes = QUICK_SIZES if args.quick else FULL_SIZES
+    results = {}
+
+    with tempfile.TemporaryDirectory(prefix='descarga-bench-') as workdir:
+        # Cachés (versiones de herramientas, subidas) aisladas de las del usuario
+        os.environ['DESCARGA_VIDEOS_CACHE'] = os.path.join(workdir, 'cache')
+        print("🧪 Preparando fixtures...", file=sys.stderr)
+        cases = build_cases(sizes, workdir)
+
+        for name, func, params in cases:
+            if args.only and not any(name.startswith(prefix) for prefix in args.only):
+                continue
+            timings = measure(func, args.repeat)
+            results[name] = {
+                'median': statistics.median(timings),
+                'min': min(timings),
+                'runs': len(timings),
+                **params,
+            }
+            print(f"⏱️  {name:<45} {results[name]['median'] * 1000:10.2f} ms", file=sys.stderr)
+
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'quick': args.quick,
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'results': results,
+    }
+
+
+def compare(report, baseline, tolerance):
+    """Devuelve la lista de casos cuya mediana empeora más de `tolerance` respecto a la referencia"""
+    regressions = []
+    print(f"\n{'caso':<45} {'referencia':>12} {'actual':>12} {'cambio':>8}", file=sys.stderr)
+    for name, current in report['results'].items():
+        reference = baseline.get('results', {}).get(name)
+        if not reference:
+            print(f"{name:<45} {'—':>12} {current['median'] * 1000:10.2f}ms {'nuevo':>8}", file=sys.stderr)
+            continue
+        change = current['median'] / reference['median'] - 1 if reference['median'] else 0.0
+        marker = ' ❌' if change > tolerance else ''
+        print(f"{name:<45} {reference['median'] * 1000:10.2f}ms {current['median'] * 1000:10.2f}ms "
+              f"{change:+8.1%}{marker}", file=sys.stderr)
+        if change > tolerance:
+            regressions.append(name)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks offline de descarga_videos")
+    parser.add_argument('--quick', action='store_true', help="Tamaños reducidos (para iterar rápido)")
+    parser.add_argument('--repeat', type=int, default=3, help="Repeticiones por caso (se usa la mediana)")
+    parser.add_argument('--only', action='append', metavar='PREFIJO', help="Ejecutar solo los casos con este prefijo")
+    parser.add_argument('-o', '--output', default='bench_results.json', help="Archivo JSON de resultados")
+    parser.add_argument('--baseline', default=str(BASELINE_PATH), help="Referencia con la que comparar")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="Empeoramiento relativo admitido antes de marcar regresión (0.25 = 25%%)")
+    parser.add_argument('--save-baseline', action='store_true', help="Guardar los resultados como nueva referencia")
+    args = parser.parse_args(argv)
+
+    report = run(args)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n📄 Resultados: {args.output}", file=sys.stderr)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"📌 Referencia guardada en {args.baseline}", file=sys.stderr)
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("ℹ️  No hay referencia guardada; usa --save-baseline para crearla", file=sys.stderr)
+        return 0
+
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    if baseline.get('meta', {}).get('quick') != args.quick:
+        print("⚠️  La referencia se generó con otros tamaños (--quick); la comparación no es fiable",
+              file=sys.stderr)
+
+    regressions = compare(report, baseline, args.tolerance)
+    if regressions:
+        print(f"\n❌ {len(regressions)} regresión(es): {', '.join(regressions)}", file=sys.stderr)
+        return 1
+    print("\n✅ Sin regresiones", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
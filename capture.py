@@ -0,0 +1,313 @@
+"""
+Recolección de videos desde capturas de red (HAR o logs exportados)
+Muchas páginas de cursos cargan los embeds de Vimeo/Loom con JavaScript y no aparecen en el
+HTML guardado. Una captura HAR de las herramientas de desarrollo sí contiene las peticiones
+al reproductor y sus respuestas (config JSON, oEmbed, HTML del iframe).
+
+Las entradas se leen en streaming: el archivo se recorre por bloques y cada entrada se
+delimita y decodifica por separado (una sola vez), así que la memoria depende de la entrada
+más grande y no de la captura
+"""
+
+import base64
+import json
+import re
+from pathlib import Path
+from urllib.parse import urlparse
+
+CHUNK_SIZE = 1024 * 1024
+# Respuestas más grandes que esto no son configs ni páginas de embed (vídeo, imágenes...)
+MAX_BODY_BYTES = 20 * 1024 * 1024
+TEXT_MIME = re.compile(r'json|javascript|html|text|xml', re.I)
+# Solo se analizan cuerpos que mencionan alguna plataforma
+PLATFORM_HINT = re.compile(r'vimeo|loom\.com', re.I)
+
+_VIMEO_CANONICAL = re.compile(r'https?://(?:www\.)?vimeo\.com/(\d{6,})/([0-9a-f]{6,})', re.I)
+_VIMEO_ID_HASH_JSON = re.compile(r'"(?:video_)?id"\s*:\s*"?(\d{6,})"?[^{}]{0,2000}?"unlisted_hash"\s*:\s*"([0-9a-f]+)"', re.I)
+_VIMEO_URI = re.compile(r'/videos/(\d{6,}):([0-9a-f]{6,})', re.I)
+_VIDEO_ID = re.compile(r'/video/(\d+)|/(?:embed|share)/([a-f0-9]{32})', re.I)
+
+
+def is_network_capture(path):
+    """HAR (.har o JSON con "log") o log de red en JSON por líneas (.ndjson/.jsonl)"""
+    path = Path(path)
+    if path.suffix.lower() in ('.har', '.ndjson', '.jsonl'):
+        return True
+    if path.suffix.lower() != '.json':
+        return False
+    try:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            head = f.read(4096)
+    except OSError:
+        return False
+    return bool(re.match(r'\s*\{\s*"log"\s*:', head))
+
+
+# Fin de un objeto JSON sin decodificarlo: fuera de cadenas solo importan llaves y comillas;
+# dentro, comillas y escapes (un cuerpo base64 de varios MB se salta con una sola búsqueda)
+_STRUCTURE = re.compile(r'[{}"]')
+_STRING_END = re.compile(r'["\\]')
+_NEXT_ITEM = re.compile(r'[{\]]')
+
+
+def _scan_object(buffer, state):
+    """
+    Avanza state = [posición, profundidad, dentro_de_cadena] sobre el búfer y devuelve el
+    índice tras la llave que cierra el objeto, o None si hace falta leer más
+    """
+    position, depth, in_string = state
+    size = len(buffer)
+    while True:
+        if in_string:
+            match = _STRING_END.search(buffer, position)
+            if match is None:
+                position = size
+                break
+            if match.group() == '\\':
+                if match.end() >= size:  # el carácter escapado llega en el siguiente bloque
+                    position = match.start()
+                    break
+                position = match.end() + 1
+                continue
+            in_string = False
+            position = match.end()
+            continue
+        match = _STRUCTURE.search(buffer, position)
+        if match is None:
+            position = size
+            break
+        position = match.end()
+        char = match.group()
+        if char == '"':
+            in_string = True
+        elif char == '{':
+            depth += 1
+        else:
+            depth -= 1
+            if depth == 0:
+                state[:] = [position, depth, in_string]
+                return position
+    state[:] = [position, depth, in_string]
+    return None
+
+
+def _iter_json_array(f, key):
+    """
+    Objetos del primer array `"key": [...]` del archivo, decodificados uno a uno a medida
+    que se leen bloques. Primero se localiza la llave de cierre de cada objeto (retomando el
+    recorrido donde se quedó al leer más, con lecturas que crecen geométricamente) y después
+    se decodifica una sola vez; un objeto mal formado se salta sin leer el resto de la captura
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    marker = re.compile(r'"%s"\s*:\s*\[' % re.escape(key))
+
+    # Avanzar hasta el inicio del array
+    while True:
+        chunk = f.read(CHUNK_SIZE)
+        if not chunk:
+            return
+        buffer += chunk
+        match = marker.search(buffer)
+        if match:
+            buffer = buffer[match.end():]
+            break
+        buffer = buffer[-len(key) - 16:]
+
+    position = 0
+    eof = False
+
+    def read_more(size):
+        nonlocal buffer, position, eof
+        chunk = f.read(size)
+        eof = not chunk
+        buffer, position = buffer[position:] + chunk, 0
+
+    while True:
+        # Saltar separadores (y basura) hasta el siguiente objeto o el fin del array
+        while True:
+            match = _NEXT_ITEM.search(buffer, position)
+            position = match.start() if match else len(buffer)
+            if match or eof:
+                break
+            read_more(CHUNK_SIZE)
+
+        if position >= len(buffer) or buffer[position] == ']':
+            return
+
+        state = [position, 0, False]
+        read_size = CHUNK_SIZE
+        end = _scan_object(buffer, state)
+        while end is None:
+            if eof:
+                return  # captura truncada: se devuelve lo que se pudo leer
+            offset = position
+            read_more(read_size)
+            state[0] -= offset
+            read_size *= 2
+            end = _scan_object(buffer, state)
+
+        try:
+            item, decoded_end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            decoded_end = None
+        position = end
+        if decoded_end == end:
+            yield item
+        # si no, entrada mal formada: se descarta y se sigue con la siguiente
+
+
+def iter_capture_entries(path):
+    """Entradas {'url', 'page', 'body'} de un HAR o de un log de red JSON por líneas"""
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        first = f.read(1)
+        while first and first.isspace():
+            first = f.read(1)
+        f.seek(0)
+
+        if Path(path).suffix.lower() in ('.ndjson', '.jsonl') or first != '{':
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Línea de texto libre (p. ej. log de consola): se analiza tal cual
+                    yield {'url': '', 'page': '', 'body': line}
+                    continue
+                yield from _log_record_entries(record)
+            return
+
+        for entry in _iter_json_array(f, 'entries'):
+            yield _har_entry(entry)
+
+
+def _har_entry(entry):
+    request = entry.get('request') or {}
+    response = entry.get('response') or {}
+    content = response.get('content') or {}
+
+    body = content.get('text') or ''
+    if body and (content.get('size') or len(body)) > MAX_BODY_BYTES:
+        body = ''
+    elif body and not TEXT_MIME.search(content.get('mimeType') or 'text'):
+        body = ''
+    elif body and content.get('encoding') == 'base64':
+        try:
+            body = base64.b64decode(body).decode('utf-8', errors='replace')
+        except ValueError:
+            body = ''
+
+    headers = {h.get('name', '').lower(): h.get('value', '') for h in request.get('headers') or []}
+    return {'url': request.get('url') or '', 'page': headers.get('referer', ''), 'body': body}
+
+
+def _log_record_entries(record):
+    """Registro de un log exportado: formato DevTools ({'message': {'params': ...}}) o genérico"""
+    message = record.get('message') if isinstance(record, dict) else None
+    if isinstance(message, str):
+        try:
+            message = json.loads(message)
+        except ValueError:
+            message = None
+    if isinstance(message, dict) and isinstance(message.get('message'), dict):
+        message = message['message']  # performance log de chromedriver
+    params = message.get('params') if isinstance(message, dict) else None
+    if isinstance(params, dict):
+        request = params.get('request') or params.get('response') or {}
+        headers = {k.lower(): v for k, v in (request.get('headers') or {}).items()}
+        yield {'url': request.get('url') or params.get('documentURL') or '',
+               'page': headers.get('referer') or params.get('documentURL') or '',
+               'body': params.get('body') or ''}
+        return
+    yield {'url': record.get('url', '') if isinstance(record, dict) else '',
+           'page': record.get('page', '') if isinstance(record, dict) else '',
+           'body': json.dumps(record, ensure_ascii=False)}
+
+
+def _vimeo_player_url(video_id, unlisted_hash=None):
+    url = f"https://player.vimeo.com/video/{video_id}"
+    return f"{url}?h={unlisted_hash}" if unlisted_hash else url
+
+
+def _config_urls(body):
+    """URLs de reproductor a partir de un config JSON u oEmbed de Vimeo (con el hash si es oculto)"""
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return []
+    if not isinstance(data, dict):
+        return []
+
+    urls = []
+    video = data.get('video') if isinstance(data.get('video'), dict) else data
+    video_id = video.get('id') or video.get('video_id')
+    unlisted_hash = video.get('unlisted_hash') or video.get('hash')
+    for key in ('share_url', 'url', 'link', 'uri'):
+        value = video.get(key)
+        if isinstance(value, str):
+            match = _VIMEO_CANONICAL.search(value) or _VIMEO_URI.search(value)
+            if match:
+                video_id, unlisted_hash = video_id or match.group(1), unlisted_hash or match.group(2)
+    if video_id and str(video_id).isdigit() and ('vimeo' in body.lower()):
+        urls.append(_vimeo_player_url(video_id, unlisted_hash))
+    if isinstance(data.get('html'), str):
+        urls.extend(re.findall(r'src="([^"]+)"', data['html']))
+    return urls
+
+
+def harvest_capture(path, vimeo_patterns=(), loom_patterns=()):
+    """
+    Recorre la captura y devuelve (texto, páginas):
+      - un texto con las URLs de reproductor e IDs encontrados, pensado para pasarlo por
+        extract_video_urls_from_text (mismo formato de resultados que con un HTML)
+      - por ID de video, la página que lo cargó (útil como referer en embeds con privacidad por dominio)
+    Los patrones del descargador se aplican a cada cuerpo por separado y solo se guardan sus
+    coincidencias, no los cuerpos
+    """
+    vimeo = [re.compile(pattern, re.I) for pattern in vimeo_patterns]
+    loom = [re.compile(pattern, re.I) for pattern in loom_patterns]
+    snippets = []
+    pages = {}
+
+    def add(url, page):
+        snippets.append(f'"{url}"')
+        match = _VIDEO_ID.search(url)
+        video_id = match and (match.group(1) or match.group(2))
+        if video_id and page and video_id not in pages:
+            pages[video_id] = page
+
+    for entry in iter_capture_entries(path):
+        url, page, body = entry['url'], entry['page'], entry['body']
+
+        host = urlparse(url).netloc.lower()
+        if host.endswith('vimeo.com') or host.endswith('loom.com'):
+            add(url.replace('/config?', '?').replace('/config', ''), page)
+
+        if not body or not PLATFORM_HINT.search(body):
+            continue
+        body = body.replace('\\/', '/')  # URLs escapadas en JSON/JS
+
+        for config_url in _config_urls(body):
+            add(config_url, page or url)
+        for regex in (_VIMEO_CANONICAL, _VIMEO_ID_HASH_JSON, _VIMEO_URI):
+            for video_id, unlisted_hash in regex.findall(body):
+                add(_vimeo_player_url(video_id, unlisted_hash), page or url)
+
+        for regex in vimeo:
+            for match in regex.findall(body):
+                if match.startswith('http'):
+                    add(match, page or url)
+                else:
+                    snippets.append(f'vimeo_id: "{match}"')
+                    pages.setdefault(match, page or url)
+        for regex in loom:
+            for match in regex.findall(body):
+                if match.startswith('http'):
+                    add(match, page or url)
+                else:
+                    snippets.append(f'loom_id: "{match}"')
+                    pages.setdefault(match, page or url)
+
+    return '\n'.join(dict.fromkeys(snippets)), pages
@@ -0,0 +1,103 @@
+"""
+Exportación de clips por rangos de tiempo (resultados de búsqueda o rangos explícitos)
+Los clips se cortan con copia de streams (-c copy, sin recodificar). Como un corte con copia
+solo puede empezar en un fotograma clave, cada inicio se ajusta al keyframe anterior (leído de
+los paquetes con ffprobe, sin decodificar). Los clips de un mismo archivo se agrupan en una sola
+ejecución de ffmpeg: una entrada con -ss/-t (búsqueda por índice) y una salida por clip
+"""
+
+import bisect
+import subprocess
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional
+
+# Clips por ejecución de ffmpeg (cada uno abre el archivo como una entrada más)
+CLIPS_PER_RUN = 32
+
+
+@dataclass(slots=True)
+class ClipRange:
+    """Intervalo [start, end) en segundos del archivo original"""
+    start: float
+    end: float
+    label: str = ''
+
+
+def merge_ranges(ranges, padding=0.0, gap=0.0, duration=None) -> List[ClipRange]:
+    """
+    Amplía cada rango `padding` segundos por los dos lados y fusiona los que se solapan
+    o quedan a menos de `gap` segundos (varios aciertos seguidos → un solo clip)
+    """
+    padded = sorted(
+        (ClipRange(max(0.0, r.start - padding), r.end + padding if duration is None else min(duration, r.end + padding),
+                   r.label) for r in ranges if r.end > r.start),
+        key=lambda r: r.start)
+
+    merged = []
+    for clip in padded:
+        if merged and clip.start <= merged[-1].end + gap:
+            last = merged[-1]
+            last.end = max(last.end, clip.end)
+            if clip.label and clip.label not in last.label:
+                last.label = f"{last.label} | {clip.label}" if last.label else clip.label
+        else:
+            merged.append(clip)
+    return merged
+
+
+def probe_keyframes(media_path) -> Optional[List[float]]:
+    """
+    Tiempos (s) de los fotogramas clave del primer stream de vídeo, leyendo solo las
+    cabeceras de los paquetes. None si ffprobe falla
+    """
+    cmd = ["ffprobe", "-v", "error", "-select_streams", "v:0",
+           "-show_entries", "packet=pts_time,flags", "-of", "csv=p=0", str(media_path)]
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True)
+    except OSError:
+        return None
+    if result.returncode != 0:
+        return None
+
+    keyframes = []
+    for line in result.stdout.splitlines():
+        pts, _, flags = line.partition(',')
+        if 'K' in flags:
+            try:
+                keyframes.append(float(pts))
+            except ValueError:
+                continue
+    keyframes.sort()
+    return keyframes
+
+
+def snap_to_keyframe(start, keyframes):
+    """Último fotograma clave en o antes de `start` (el clip empieza un poco antes, nunca después)"""
+    if not keyframes:
+        return start
+    index = bisect.bisect_right(keyframes, start + 1e-3) - 1
+    return keyframes[index] if index >= 0 else 0.0
+
+
+def clip_command(media_path, jobs):
+    """
+    Comando ffmpeg para una tanda de clips: jobs = [(ClipRange ajustado, ruta de salida)].
+    -ss delante de -i busca por índice (no decodifica desde el principio)
+    """
+    cmd = ["ffmpeg", "-hide_banner", "-nostats", "-y"]
+    for clip, _ in jobs:
+        cmd += ["-ss", f"{clip.start:.3f}", "-t", f"{clip.end - clip.start:.3f}", "-i", str(media_path)]
+    for index, (_, output_path) in enumerate(jobs):
+        # Solo vídeo y audio: los streams de datos (timecode, capítulos) no siempre admiten copia
+        cmd += ["-map", f"{index}:v?", "-map", f"{index}:a?", "-c", "copy",
+                "-avoid_negative_ts", "make_zero", "-map_metadata", "-1", str(output_path)]
+    return cmd
+
+
+def clip_filename(media_path, index, clip):
+    total = int(clip.start)
+    hours, rest = divmod(total, 3600)
+    minutes, seconds = divmod(rest, 60)
+    media_path = Path(media_path)
+    return f"{media_path.stem}_clip{index:03d}_{hours:02d}{minutes:02d}{seconds:02d}{media_path.suffix}"
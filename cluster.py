@@ -0,0 +1,676 @@
+"""
+Modo distribuido: varios nodos procesan un mismo índice de videos sin pisarse.
+El índice (salida de harvest) se vuelca a una cola compartida con una fila por video, con clave
+(plataforma, video_id). Cada worker reclama un video de forma atómica y obtiene un lease que
+renueva con latidos mientras trabaja; si el nodo cae, el lease caduca y otro worker lo retoma.
+Las descargas se guardan en <raíz compartida>/<plataforma>/<video_id>/, así que un reintento
+en otro nodo continúa sobre los mismos archivos (yt-dlp reanuda los .part).
+
+Almacenes (open_work_store):
+  - sqlite:///ruta/cola.sqlite3 (o una ruta): SQLite en un disco compartido. WAL no funciona
+    en sistemas de archivos de red, así que se usa el journal clásico y cada escritura se
+    serializa además con un lock de directorio (mkdir es atómico también en NFS)
+  - memory://: cola en memoria del proceso, para pruebas y un solo nodo
+Otros almacenes (Postgres con SELECT ... FOR UPDATE SKIP LOCKED, Redis...) se registran con
+register_work_store y solo tienen que implementar los métodos de WorkStore
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import closing, contextmanager
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from events import EventBus
+from urls import canonical_video_url, prefer
+
+WORK_STATUSES = ('queued', 'running', 'done', 'failed')
+DEFAULT_LEASE = 300
+DEFAULT_HEARTBEAT = 60
+# Espera máxima de SQLite por el lock del archivo; el lock de directorio se rompe solo pasado
+# bastante más tiempo, así que nunca se rompe mientras su dueño sigue esperando o escribiendo
+SQLITE_TIMEOUT = 60
+LOCK_STALE = 3 * SQLITE_TIMEOUT
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS videos (
+    platform TEXT NOT NULL,
+    video_id TEXT NOT NULL,
+    url TEXT NOT NULL,
+    referer TEXT,
+    source TEXT,
+    status TEXT NOT NULL DEFAULT 'queued',
+    owner TEXT,
+    lease_expires_at REAL NOT NULL DEFAULT 0,
+    heartbeat_at REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    next_attempt_at REAL NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    PRIMARY KEY (platform, video_id)
+);
+CREATE INDEX IF NOT EXISTS videos_pending ON videos (status, next_attempt_at);
+CREATE INDEX IF NOT EXISTS videos_leases ON videos (status, lease_expires_at);
+"""
+
+
+def video_key(url, platform=None):
+    """(plataforma, video_id) de una URL; la clave con la que se indexa la cola y el disco"""
+    return canonical_video_url(url, platform).key
+
+
+def video_dir(root, platform, video_id):
+    """Directorio compartido de un video: <raíz>/<plataforma>/<video_id>"""
+    safe_id = ''.join(c if c.isalnum() or c in '-_' else '_' for c in str(video_id))
+    return Path(root) / platform / safe_id
+
+
+def default_worker_id(index=None):
+    """host:pid[:n], único entre nodos y entre los hilos de un mismo nodo"""
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+    return worker if index is None else f"{worker}:{index}"
+
+
+def _node(worker_id):
+    """host:pid de un worker host:pid:n (los hilos de un proceso cuentan como un nodo)"""
+    return worker_id.rsplit(':', 1)[0]
+
+
+class DirectoryLock:
+    """
+    Lock entre procesos y máquinas basado en mkdir (atómico en NFS, a diferencia de flock
+    en muchos montajes). Quien lo obtiene deja su testigo en <lock>/owner y solo borra el
+    directorio si el testigo sigue siendo el suyo. Un lock más viejo que `stale` segundos se
+    considera de un nodo caído: se aparta con un rename atómico (solo un nodo puede moverlo) y
+    se comprueba que lo apartado es el lock caducado que se vio, no uno recién tomado.
+    `stale` debe superar la retención más larga posible del lock
+    """
+
+    OWNER_FILE = 'owner'
+
+    def __init__(self, path, stale=180, poll=0.05, timeout=None):
+        self.path = str(path)
+        self.stale = stale
+        self.poll = poll
+        # Por defecto se espera lo bastante para poder romper el lock de un nodo caído
+        self.timeout = timeout if timeout is not None else 2 * stale
+        # Testigo de cada hilo que tiene el lock (un mismo objeto lo comparten varios hilos)
+        self._held = threading.local()
+
+    def _read_owner(self, path):
+        try:
+            with open(os.path.join(path, self.OWNER_FILE), 'r', encoding='utf-8') as f:
+                return f.read()
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+
+    @staticmethod
+    def _remove(path):
+        for name in os.listdir(path):
+            os.remove(os.path.join(path, name))
+        os.rmdir(path)
+
+    def _break_stale(self):
+        """Aparta el lock si lleva más de `stale` segundos sin cambiar. True si se apartó"""
+        try:
+            token = self._read_owner(self.path)
+            if time.time() - os.stat(self.path).st_mtime <= self.stale:
+                return False
+            aside = f"{self.path}.stale-{uuid.uuid4().hex}"
+            os.rename(self.path, aside)
+        except FileNotFoundError:
+            return True  # otro nodo lo liberó o lo apartó antes
+        except OSError:
+            return False
+        if self._read_owner(aside) != token:
+            # Entre la comprobación y el rename otro nodo tomó un lock nuevo: devolverlo
+            try:
+                os.rename(aside, self.path)
+            except OSError:
+                pass
+            return False
+        try:
+            self._remove(aside)
+        except OSError:
+            pass
+        return True
+
+    def acquire(self):
+        deadline = time.monotonic() + self.timeout
+        token = f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}:{uuid.uuid4().hex}"
+        while True:
+            try:
+                os.mkdir(self.path)
+            except FileExistsError:
+                if self._break_stale():
+                    continue
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"No se pudo obtener el lock {self.path}")
+                time.sleep(self.poll)
+                continue
+            with open(os.path.join(self.path, self.OWNER_FILE), 'w', encoding='utf-8') as f:
+                f.write(token)
+            self._held.token = token
+            return
+
+    def release(self):
+        token = getattr(self._held, 'token', None)
+        self._held.token = None
+        if token is None or self._read_owner(self.path) != token:
+            return  # ya no es nuestro (se rompió por caducado): no tocar el de otro
+        try:
+            self._remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class WorkStore:
+    """
+    Interfaz de la cola distribuida. Un elemento es un dict con platform, video_id, url,
+    referer, status, owner, attempts... Los métodos que cambian un elemento en curso reciben
+    el worker que lo reclamó y no hacen nada si su lease ya pasó a otro
+    """
+
+    def enqueue(self, videos, max_attempts=3):
+        """Añade videos (dicts con url, platform, referer, source); ignora los ya indexados. Devuelve cuántos entraron"""
+        raise NotImplementedError
+
+    def claim(self, worker_id, lease_seconds=DEFAULT_LEASE):
+        """Reclama un video pendiente (o con el lease caducado) o None si no hay"""
+        raise NotImplementedError
+
+    def heartbeat(self, platform, video_id, worker_id, lease_seconds=DEFAULT_LEASE):
+        """Renueva el lease; False si el worker ya no es el dueño"""
+        raise NotImplementedError
+
+    def complete(self, platform, video_id, worker_id, result):
+        raise NotImplementedError
+
+    def fail(self, platform, video_id, worker_id, error, retry_delay=30):
+        """Devuelve 'queued' si se reintentará, 'failed' si no quedan intentos o None si el lease se perdió"""
+        raise NotImplementedError
+
+    def list(self, status=None, limit=100):
+        raise NotImplementedError
+
+    def stats(self, window_seconds=3600):
+        raise NotImplementedError
+
+    @staticmethod
+    def _unique(videos):
+        """Un video por clave; entre formas repetidas se queda la que trae el hash de acceso"""
+        chosen = {}
+        for video in videos:
+            canonical = canonical_video_url(video['url'], video.get('platform'))
+            current = chosen.get(canonical.key)
+            if current is None or prefer(current[0], canonical) is canonical:
+                chosen[canonical.key] = (canonical, video)
+        return {key: video for key, (_, video) in chosen.items()}
+
+    @staticmethod
+    def _retry_at(attempts, retry_delay, now):
+        return now + retry_delay * (2 ** max(attempts - 1, 0))
+
+    @staticmethod
+    def _summary(items, now, window_seconds):
+        """Estadísticas a partir de los elementos (para almacenes sin agregados propios)"""
+        counts = {status: 0 for status in WORK_STATUSES}
+        owners = set()
+        durations = []
+        for item in items:
+            counts[item['status']] += 1
+            if item['status'] == 'running' and item['lease_expires_at'] >= now:
+                owners.add(_node(item['owner']))
+            if item['status'] == 'done' and item['finished_at'] >= now - window_seconds:
+                durations.append(item['finished_at'] - item['started_at'])
+        return {
+            'queue_depth': counts['queued'],
+            'by_status': counts,
+            'active_nodes': len(owners),
+            'window_seconds': window_seconds,
+            'completed_in_window': len(durations),
+            'throughput_per_hour': len(durations) * 3600 / window_seconds,
+            'avg_video_seconds': round(sum(durations) / len(durations), 1) if durations else None,
+        }
+
+
+class SqliteWorkStore(WorkStore):
+    """
+    Cola en un archivo SQLite que pueden compartir varios nodos por NFS/SMB. Cada escritura
+    va dentro del lock de directorio <db>.lock y de una transacción BEGIN IMMEDIATE, así que
+    dos workers nunca reclaman el mismo video aunque los locks POSIX del montaje fallen
+    """
+
+    def __init__(self, db_path, lock_stale=LOCK_STALE):
+        self.db_path = str(db_path)
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.lock = DirectoryLock(self.db_path + '.lock', stale=max(lock_stale, 2 * SQLITE_TIMEOUT))
+        with self.lock, closing(self._connect()) as conn:
+            # WAL necesita memoria compartida entre procesos: no sirve en discos de red
+            conn.execute("PRAGMA journal_mode=DELETE")
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=SQLITE_TIMEOUT, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @contextmanager
+    def _write(self):
+        with self.lock, closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    @staticmethod
+    def _row_to_item(row):
+        if row is None:
+            return None
+        item = dict(row)
+        if item['result']:
+            item['result'] = json.loads(item['result'])
+        return item
+
+    def enqueue(self, videos, max_attempts=3):
+        now = time.time()
+        rows = []
+        for (platform, video_id), video in self._unique(videos).items():
+            rows.append((platform, video_id, video['url'], video.get('referer'), video.get('source'),
+                         int(max_attempts), now))
+        with self._write() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO videos (platform, video_id, url, referer, source, max_attempts, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            return conn.total_changes - before
+
+    def claim(self, worker_id, lease_seconds=DEFAULT_LEASE):
+        now = time.time()
+        with self._write() as conn:
+            # Leases caducados sin intentos restantes: el nodo cayó en el último intento
+            conn.execute(
+                "UPDATE videos SET status = 'failed', owner = NULL, finished_at = ?, "
+                "error = COALESCE(error, 'Lease caducado (el worker dejó de responder)') "
+                "WHERE status = 'running' AND lease_expires_at < ? AND attempts >= max_attempts",
+                (now, now)
+            )
+            row = conn.execute(
+                "SELECT platform, video_id FROM videos "
+                "WHERE (status = 'queued' AND next_attempt_at <= ?) OR (status = 'running' AND lease_expires_at < ?) "
+                "ORDER BY created_at LIMIT 1",
+                (now, now)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE videos SET status = 'running', owner = ?, lease_expires_at = ?, heartbeat_at = ?, "
+                "attempts = attempts + 1, started_at = ? WHERE platform = ? AND video_id = ?",
+                (worker_id, now + lease_seconds, now, now, row['platform'], row['video_id'])
+            )
+            claimed = conn.execute("SELECT * FROM videos WHERE platform = ? AND video_id = ?",
+                                   (row['platform'], row['video_id'])).fetchone()
+        return self._row_to_item(claimed)
+
+    def heartbeat(self, platform, video_id, worker_id, lease_seconds=DEFAULT_LEASE):
+        now = time.time()
+        with self._write() as conn:
+            cursor = conn.execute(
+                "UPDATE videos SET lease_expires_at = ?, heartbeat_at = ? "
+                "WHERE platform = ? AND video_id = ? AND owner = ? AND status = 'running'",
+                (now + lease_seconds, now, platform, video_id, worker_id)
+            )
+            return cursor.rowcount > 0
+
+    def complete(self, platform, video_id, worker_id, result):
+        with self._write() as conn:
+            cursor = conn.execute(
+                "UPDATE videos SET status = 'done', result = ?, error = NULL, finished_at = ? "
+                "WHERE platform = ? AND video_id = ? AND owner = ? AND status = 'running'",
+                (json.dumps(result, ensure_ascii=False, default=str), time.time(), platform, video_id, worker_id)
+            )
+            return cursor.rowcount > 0
+
+    def fail(self, platform, video_id, worker_id, error, retry_delay=30):
+        now = time.time()
+        with self._write() as conn:
+            row = conn.execute(
+                "SELECT attempts, max_attempts FROM videos "
+                "WHERE platform = ? AND video_id = ? AND owner = ? AND status = 'running'",
+                (platform, video_id, worker_id)
+            ).fetchone()
+            if row is None:
+                return None
+            if row['attempts'] < row['max_attempts']:
+                conn.execute(
+                    "UPDATE videos SET status = 'queued', owner = NULL, error = ?, next_attempt_at = ? "
+                    "WHERE platform = ? AND video_id = ?",
+                    (error, self._retry_at(row['attempts'], retry_delay, now), platform, video_id)
+                )
+                return 'queued'
+            conn.execute(
+                "UPDATE videos SET status = 'failed', owner = NULL, error = ?, finished_at = ? "
+                "WHERE platform = ? AND video_id = ?",
+                (error, now, platform, video_id)
+            )
+            return 'failed'
+
+    def list(self, status=None, limit=100):
+        query = "SELECT * FROM videos"
+        params = []
+        if status:
+            query += " WHERE status = ?"
+            params.append(status)
+        query += " ORDER BY created_at, platform, video_id LIMIT ?"
+        params.append(int(limit))
+        with closing(self._connect()) as conn:
+            rows = conn.execute(query, params).fetchall()
+        return [self._row_to_item(row) for row in rows]
+
+    def stats(self, window_seconds=3600):
+        now = time.time()
+        with closing(self._connect()) as conn:
+            counts = dict(conn.execute("SELECT status, COUNT(*) FROM videos GROUP BY status").fetchall())
+            owners = [row[0] for row in conn.execute(
+                "SELECT DISTINCT owner FROM videos WHERE status = 'running' AND lease_expires_at >= ?", (now,))]
+            finished, avg_duration = conn.execute(
+                "SELECT COUNT(*), AVG(finished_at - started_at) FROM videos WHERE status = 'done' AND finished_at >= ?",
+                (now - window_seconds,)
+            ).fetchone()
+        return {
+            'queue_depth': counts.get('queued', 0),
+            'by_status': {status: counts.get(status, 0) for status in WORK_STATUSES},
+            'active_nodes': len({_node(owner) for owner in owners}),
+            'window_seconds': window_seconds,
+            'completed_in_window': finished,
+            'throughput_per_hour': finished * 3600 / window_seconds,
+            'avg_video_seconds': round(avg_duration, 1) if avg_duration else None,
+        }
+
+
+class MemoryWorkStore(WorkStore):
+    """Misma semántica que SqliteWorkStore en memoria del proceso (pruebas, un solo nodo)"""
+
+    def __init__(self):
+        self._items = {}
+        self._lock = threading.Lock()
+
+    def enqueue(self, videos, max_attempts=3):
+        now = time.time()
+        added = 0
+        with self._lock:
+            for key, video in self._unique(videos).items():
+                if key in self._items:
+                    continue
+                self._items[key] = {
+                    'platform': key[0], 'video_id': key[1], 'url': video['url'],
+                    'referer': video.get('referer'), 'source': video.get('source'),
+                    'status': 'queued', 'owner': None, 'lease_expires_at': 0, 'heartbeat_at': None,
+                    'attempts': 0, 'max_attempts': int(max_attempts), 'next_attempt_at': 0,
+                    'result': None, 'error': None, 'created_at': now, 'started_at': None, 'finished_at': None,
+                }
+                added += 1
+        return added
+
+    def _owned(self, platform, video_id, worker_id):
+        item = self._items.get((platform, video_id))
+        if item is None or item['owner'] != worker_id or item['status'] != 'running':
+            return None
+        return item
+
+    def claim(self, worker_id, lease_seconds=DEFAULT_LEASE):
+        now = time.time()
+        with self._lock:
+            for item in self._items.values():
+                expired = item['status'] == 'running' and item['lease_expires_at'] < now
+                if expired and item['attempts'] >= item['max_attempts']:
+                    item.update(status='failed', owner=None, finished_at=now,
+                                error=item['error'] or 'Lease caducado (el worker dejó de responder)')
+                elif expired or (item['status'] == 'queued' and item['next_attempt_at'] <= now):
+                    item.update(status='running', owner=worker_id, lease_expires_at=now + lease_seconds,
+                                heartbeat_at=now, attempts=item['attempts'] + 1, started_at=now)
+                    return dict(item)
+        return None
+
+    def heartbeat(self, platform, video_id, worker_id, lease_seconds=DEFAULT_LEASE):
+        now = time.time()
+        with self._lock:
+            item = self._owned(platform, video_id, worker_id)
+            if item is None:
+                return False
+            item.update(lease_expires_at=now + lease_seconds, heartbeat_at=now)
+            return True
+
+    def complete(self, platform, video_id, worker_id, result):
+        with self._lock:
+            item = self._owned(platform, video_id, worker_id)
+            if item is None:
+                return False
+            item.update(status='done', result=result, error=None, finished_at=time.time())
+            return True
+
+    def fail(self, platform, video_id, worker_id, error, retry_delay=30):
+        now = time.time()
+        with self._lock:
+            item = self._owned(platform, video_id, worker_id)
+            if item is None:
+                return None
+            if item['attempts'] < item['max_attempts']:
+                item.update(status='queued', owner=None, error=error,
+                            next_attempt_at=self._retry_at(item['attempts'], retry_delay, now))
+                return 'queued'
+            item.update(status='failed', owner=None, error=error, finished_at=now)
+            return 'failed'
+
+    def list(self, status=None, limit=100):
+        with self._lock:
+            items = [dict(item) for item in self._items.values() if not status or item['status'] == status]
+        return items[:int(limit)]
+
+    def stats(self, window_seconds=3600):
+        with self._lock:
+            items = [dict(item) for item in self._items.values()]
+        return self._summary(items, time.time(), window_seconds)
+
+
+WORK_STORES = {
+    'sqlite': lambda spec: SqliteWorkStore(spec.netloc + spec.path if spec.netloc else spec.path),
+    'memory': lambda spec: MemoryWorkStore(),
+}
+
+
+def register_work_store(scheme, factory):
+    """Registra un almacén: factory(urlsplit(spec)) -> WorkStore (p. ej. 'postgresql', 'redis')"""
+    WORK_STORES[scheme] = factory
+
+
+def open_work_store(spec):
+    """Abre la cola indicada por una URL (sqlite:///ruta, memory://) o una ruta a un archivo SQLite"""
+    if isinstance(spec, WorkStore):
+        return spec
+    parts = urlsplit(str(spec))
+    if not parts.scheme or len(parts.scheme) == 1:  # ruta (o unidad de Windows)
+        return SqliteWorkStore(spec)
+    factory = WORK_STORES.get(parts.scheme)
+    if factory is None:
+        raise ValueError(f"Cola no soportada: {parts.scheme}:// (disponibles: {', '.join(sorted(WORK_STORES))})")
+    return factory(parts)
+
+
+class ClusterWorker:
+    """
+    Worker de un nodo: reclama videos de la cola, los procesa en su directorio compartido y
+    mantiene vivo el lease con un hilo de latidos. Varios ClusterWorker (en hilos o en
+    máquinas distintas) pueden compartir la misma cola
+    """
+
+    def __init__(self, store, downloader_factory, root, workers=1, lease_seconds=DEFAULT_LEASE,
+                 heartbeat_interval=DEFAULT_HEARTBEAT, poll_interval=5, retry_delay=30,
+                 extract_audio=True, transcribe=True, worker_id=None, configure=None):
+        self.store = store
+        self.downloader_factory = downloader_factory
+        self.root = Path(root)
+        self.workers = max(1, int(workers))
+        self.lease_seconds = lease_seconds
+        self.heartbeat_interval = min(heartbeat_interval, lease_seconds / 3)
+        self.poll_interval = poll_interval
+        self.retry_delay = retry_delay
+        self.extract_audio = extract_audio
+        self.transcribe = transcribe
+        self.worker_id = worker_id or default_worker_id()
+        # configure(downloader): comparte backend, trimmer, storage... entre los hilos del nodo
+        self.configure = configure
+        self._stop = threading.Event()
+        self._processed_lock = threading.Lock()
+        self.processed = 0
+
+    def run(self, drain=False):
+        """
+        Procesa videos hasta stop() o, con drain, hasta que la cola no tenga nada reclamable.
+        Devuelve cuántos videos procesó este nodo
+        """
+        threads = [threading.Thread(target=self._loop, args=(f"{self.worker_id}:{i + 1}", drain),
+                                    name=f"cluster-{i + 1}", daemon=True)
+                   for i in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(0.5)
+        except KeyboardInterrupt:
+            # Los leases de lo que estaba en curso caducarán y otro nodo lo retomará
+            self._stop.set()
+            raise
+        return self.processed
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self, worker_id, drain):
+        while not self._stop.is_set():
+            item = self.store.claim(worker_id, self.lease_seconds)
+            if item is None:
+                if drain:
+                    return
+                self._stop.wait(self.poll_interval)
+                continue
+            self.run_item(item, worker_id)
+
+    def run_item(self, item, worker_id):
+        """Procesa un video reclamado y registra el resultado (si el lease sigue siendo suyo)"""
+        label = f"{item['platform']}/{item['video_id']}"
+        events = EventBus()
+        events.subscribe(_PrefixSubscriber(label))
+        downloader = self.downloader_factory(events=events)
+        if self.configure is not None:
+            self.configure(downloader)
+        downloader.layout = 'video'
+
+        lost = threading.Event()
+        done = threading.Event()
+
+        def beat():
+            while not done.wait(self.heartbeat_interval):
+                try:
+                    renewed = self.store.heartbeat(item['platform'], item['video_id'], worker_id, self.lease_seconds)
+                except Exception as e:
+                    # Lock ocupado o disco de red inestable: se reintenta en el siguiente latido
+                    print(f"[{label}] ⚠️  No se pudo renovar el lease ({type(e).__name__}: {e}); se reintentará")
+                    continue
+                if not renewed:
+                    lost.set()
+                    print(f"[{label}] ⚠️  Lease perdido: otro worker retomará este video")
+                    return
+
+        heartbeat = threading.Thread(target=beat, name=f"heartbeat-{label}", daemon=True)
+        heartbeat.start()
+        print(f"[{label}] ▶️  Intento {item['attempts']}/{item['max_attempts']} en {worker_id}")
+
+        try:
+            existing = self._existing_result(downloader, item)
+            if existing is not None:
+                result = existing
+                print(f"[{label}] ♻️  Ya procesado en {self.root}, se reutiliza")
+            else:
+                result = downloader.process_single_url(item['url'], str(self.root), item['referer'],
+                                                       self.extract_audio or self.transcribe, self.transcribe)
+        except Exception as e:
+            result = None
+            error = f"{type(e).__name__}: {e}"
+        else:
+            error = "El procesamiento no produjo resultados" if not result else None
+        finally:
+            done.set()
+            heartbeat.join()
+
+        if lost.is_set():
+            return
+        if error is None:
+            if self.store.complete(item['platform'], item['video_id'], worker_id, result):
+                with self._processed_lock:
+                    self.processed += 1
+                print(f"[{label}] ✅ Completado")
+            return
+        outcome = self.store.fail(item['platform'], item['video_id'], worker_id, error, self.retry_delay)
+        if outcome == 'queued':
+            print(f"[{label}] 🔁 Reintento programado: {error}")
+        elif outcome == 'failed':
+            print(f"[{label}] ❌ Falló definitivamente: {error}")
+
+    def _existing_result(self, downloader, item):
+        """
+        Si un nodo terminó el trabajo pero cayó antes de registrarlo, el directorio compartido
+        ya tiene el video (y la transcripción si se pidió): no se repite
+        """
+        directory = video_dir(self.root, item['platform'], item['video_id'])
+        if not directory.is_dir():
+            return None
+        videos = [path for ext in downloader.VIDEO_EXTENSIONS for path in directory.glob(f"*{ext}")]
+        if len(videos) != 1:
+            return None
+        video = videos[0]
+        if self.transcribe:
+            transcript = downloader.find_transcript(video)
+            if transcript is None:
+                return None
+            return {'video_path': str(video), 'transcribed': True, 'transcription_path': str(transcript)}
+        if self.extract_audio:
+            audio = video.with_suffix('.mp3')
+            if not downloader.audio_is_current(video, audio):
+                return None
+            return {'video_path': str(video), 'audio_extracted': True, 'audio_path': str(audio)}
+        return {'video_path': str(video)}
+
+
+class _PrefixSubscriber:
+    """Mensajes de un video con su clave como prefijo (varios hilos escriben a la vez)"""
+
+    def __init__(self, label):
+        self.label = label
+
+    def __call__(self, event):
+        if event.message and not event.kind.startswith('spinner.'):
+            for line in event.message.strip('\n').split('\n'):
+                print(f"[{self.label}] {line}", flush=True)
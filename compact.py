@@ -0,0 +1,209 @@
+"""
+Formato binario columnar de transcripciones (<nombre>_transcription.bin)
+
+    cabecera   '<4sHHIIIQ': magia, versión, reservado, nº de segmentos, duración máxima
+               de un segmento (ms), bytes de metadatos, bytes de texto
+    metadatos  JSON UTF-8 (idioma detectado, backend, modelo...), alineado a 8 bytes
+    starts     uint32[n]  inicio de cada segmento en ms (ordenados)
+    ends       uint32[n]  fin de cada segmento en ms
+    offsets    uint64[n+1] posición de cada texto dentro del blob
+    texto      blob UTF-8 con los textos concatenados
+
+Se abre con mmap: cargar un archivo no parsea nada y un rango de tiempo se localiza con
+búsqueda binaria sobre `starts`, decodificando solo el texto de los segmentos devueltos.
+El JSON completo sigue disponible con `to_output()` / `export_json()`
+"""
+
+import bisect
+import json
+import mmap
+import re
+import struct
+import sys
+from array import array
+from pathlib import Path
+
+from backends import segments_to_srt
+
+MAGIC = b'DVTR'
+VERSION = 1
+HEADER = struct.Struct('<4sHHIIIQ')
+
+_SRT_BLOCK = re.compile(
+    r'(\d{1,2}):(\d{2}):(\d{2})[,.](\d{3})\s*-->\s*(\d{1,2}):(\d{2}):(\d{2})[,.](\d{3})[^\n]*\n(.*?)(?:\n\s*\n|\Z)',
+    re.S)
+
+
+def compact_path(output_base):
+    return Path(f"{Path(output_base).with_suffix('')}_transcription.bin")
+
+
+def is_compact(path):
+    try:
+        with open(path, 'rb') as f:
+            return f.read(4) == MAGIC
+    except OSError:
+        return False
+
+
+def srt_to_segments(srt_content):
+    """SRT → lista de segmentos {'start', 'end', 'text'} (segundos)"""
+    segments = []
+    for match in _SRT_BLOCK.finditer(srt_content.replace('\r\n', '\n')):
+        g = match.groups()
+        start = int(g[0]) * 3600 + int(g[1]) * 60 + int(g[2]) + int(g[3]) / 1000
+        end = int(g[4]) * 3600 + int(g[5]) * 60 + int(g[6]) + int(g[7]) / 1000
+        text = ' '.join(g[8].split())
+        if text:
+            segments.append({'start': start, 'end': end, 'text': text})
+    return segments
+
+
+def output_segments(output):
+    """Segmentos de una salida de transcripción (dict con 'segments'/'transcription' o SRT)"""
+    if isinstance(output, dict):
+        if isinstance(output.get('segments'), list) and output['segments']:
+            return [{'start': float(s.get('start') or 0), 'end': float(s.get('end') or 0),
+                     'text': (s.get('text') or '').strip()} for s in output['segments']]
+        if isinstance(output.get('transcription'), str):
+            return srt_to_segments(output['transcription'])
+        return []
+    if isinstance(output, str):
+        return srt_to_segments(output)
+    return []
+
+
+def write_compact(path, output):
+    """Escribe la salida de transcripción en formato columnar. Devuelve el nº de segmentos"""
+    segments = sorted(output_segments(output), key=lambda s: s['start'])
+    meta = {key: value for key, value in output.items()
+            if key not in ('segments', 'transcription')} if isinstance(output, dict) else {}
+
+    starts = array('I', (max(0, int(round(s['start'] * 1000))) for s in segments))
+    ends = array('I', (max(0, int(round(s['end'] * 1000))) for s in segments))
+    texts = [s['text'].encode('utf-8') for s in segments]
+    offsets = array('Q', [0])
+    for text in texts:
+        offsets.append(offsets[-1] + len(text))
+    max_duration = max((end - start for start, end in zip(starts, ends)), default=0)
+    text_len = offsets[-1]
+    if sys.byteorder != 'little':
+        for column in (starts, ends, offsets):
+            column.byteswap()
+
+    meta_bytes = json.dumps(meta, ensure_ascii=False, default=str).encode('utf-8')
+    meta_bytes += b' ' * (-(HEADER.size + len(meta_bytes)) % 8)
+
+    tmp = Path(f"{path}.tmp")
+    with open(tmp, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 0, len(segments), max(0, max_duration), len(meta_bytes), text_len))
+        f.write(meta_bytes)
+        f.write(starts.tobytes())
+        f.write(ends.tobytes())
+        f.write(offsets.tobytes())
+        for text in texts:
+            f.write(text)
+    tmp.replace(path)
+    return len(segments)
+
+
+class CompactTranscript:
+    """Lectura de un .bin mapeado en memoria; usar como context manager o llamar a close()"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._file = open(self.path, 'rb')
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # archivo vacío
+            self._file.close()
+            raise ValueError(f"{self.path.name}: no es una transcripción compacta")
+
+        magic, version, _, count, max_duration, meta_len, text_len = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{self.path.name}: no es una transcripción compacta (versión {VERSION})")
+
+        self.count = count
+        self.max_duration_ms = max_duration
+        view = memoryview(self._mmap)
+        position = HEADER.size
+        self.meta = json.loads(bytes(view[position:position + meta_len]) or b'{}')
+        position += meta_len
+
+        def column(code, length):
+            nonlocal position
+            size = array(code).itemsize * length
+            raw = view[position:position + size]
+            position += size
+            if sys.byteorder == 'little':
+                return raw.cast(code)
+            values = array(code, raw)  # big-endian: copia con los bytes invertidos
+            values.byteswap()
+            return values
+
+        self.starts = column('I', count)
+        self.ends = column('I', count)
+        self.offsets = column('Q', count + 1)
+        self._text = view[position:position + text_len]
+        self._views = [view, self._text] + [c for c in (self.starts, self.ends, self.offsets)
+                                            if isinstance(c, memoryview)]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        for view in getattr(self, '_views', []):
+            view.release()
+        self._views = []
+        if getattr(self, '_mmap', None) is not None and not self._mmap.closed:
+            self._mmap.close()
+        self._file.close()
+
+    def __len__(self):
+        return self.count
+
+    def text(self, index):
+        return str(self._text[self.offsets[index]:self.offsets[index + 1]], 'utf-8')
+
+    def segment(self, index):
+        return {'id': index, 'start': self.starts[index] / 1000, 'end': self.ends[index] / 1000,
+                'text': self.text(index)}
+
+    def segments(self, first=0, last=None):
+        return [self.segment(i) for i in range(first, self.count if last is None else last)]
+
+    def span(self, start, end):
+        """Rango [primero, último) de segmentos que se solapan con [start, end) segundos (O(log n))"""
+        start_ms, end_ms = int(start * 1000), int(end * 1000)
+        last = bisect.bisect_left(self.starts, end_ms)
+        # Ningún segmento dura más que max_duration: los anteriores a esto terminan antes de start
+        first = bisect.bisect_left(self.starts, start_ms - self.max_duration_ms, 0, last)
+        while first < last and self.ends[first] <= start_ms:
+            first += 1
+        return first, last
+
+    def slice(self, start, end):
+        """Segmentos que se solapan con [start, end) segundos"""
+        first, last = self.span(start, end)
+        return [self.segment(i) for i in range(first, last) if self.ends[i] > start * 1000]
+
+    @property
+    def duration(self):
+        return max(self.ends, default=0) / 1000 if self.count else 0.0
+
+    def to_srt(self):
+        return segments_to_srt(self.segments())
+
+    def to_output(self):
+        """Salida con la forma del JSON original ({'transcription', 'segments', metadatos})"""
+        segments = self.segments()
+        return {**self.meta, 'transcription': segments_to_srt(segments), 'segments': segments}
+
+    def export_json(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_output(), f, ensure_ascii=False, indent=2)
+        return str(path)
@@ -0,0 +1,91 @@
+"""
+Planificador de compresión de audio para la transcripción
+A partir de la duración elige códec, bitrate y frecuencia de muestreo para que el archivo
+quepa en el límite del backend con una sola codificación
+"""
+
+import math
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+MIB = 1024 * 1024
+
+# Bitrates CBR válidos de MP3 a 16 kHz (MPEG-2) y a 8 kHz (MPEG-2.5), en kbps
+MP3_BITRATES_16K = (8, 16, 24, 32, 40, 48, 56, 64)
+MP3_BITRATES_8K = (8, 16, 24, 32)
+
+# Voz mono: por encima de esto no se gana precisión en la transcripción
+MAX_USEFUL_KBPS = {'opus': 32, 'mp3': 64}
+MIN_KBPS = {'opus': 6, 'mp3': 8}
+
+
+@dataclass(slots=True)
+class CompressionPlan:
+    """Una codificación concreta y el tamaño que se espera de ella"""
+    codec: str              # 'opus' o 'mp3'
+    bitrate_kbps: int
+    sample_rate: int
+    extension: str
+    expected_mb: float
+    filters: List[str] = field(default_factory=list)
+
+    def ffmpeg_args(self) -> List[str]:
+        """Argumentos de salida de ffmpeg (mono, sin vídeo ni metadatos)"""
+        args = ["-vn", "-map_metadata", "-1", "-ac", "1", "-ar", str(self.sample_rate)]
+        if self.codec == 'opus':
+            # VBR restringido: calidad de VBR sin pasarse del bitrate medio
+            args += ["-c:a", "libopus", "-b:a", f"{self.bitrate_kbps}k", "-vbr", "constrained",
+                     "-application", "voip"]
+        else:
+            args += ["-c:a", "libmp3lame", "-b:a", f"{self.bitrate_kbps}k"]
+        if self.filters:
+            args += ["-af", ",".join(self.filters)]
+        return args
+
+
+def available_kbps(duration_seconds, max_size_mb, safety=0.97, overhead_bytes=64 * 1024):
+    """
+    Bitrate medio (kbps) que cabe en max_size_mb MiB: el límite se mide en MiB
+    (1 MiB = 8 * 1024 * 1024 bits), no en MB decimales
+    """
+    budget_bits = (max_size_mb * MIB * safety - overhead_bytes) * 8
+    return budget_bits / duration_seconds / 1000
+
+
+def plan_compression(duration_seconds, max_size_mb, formats=('mp3',)) -> Optional[CompressionPlan]:
+    """
+    Devuelve el plan de mayor calidad que cabe en el límite, probando los formatos en orden
+    de preferencia (p. ej. ('opus', 'mp3')). None si ni al bitrate mínimo cabría
+    """
+    if not duration_seconds or duration_seconds <= 0:
+        # Sin duración: bitrate conservador (el de la compresión agresiva de siempre)
+        return CompressionPlan('mp3', 32, 16000, '.mp3', 0.0)
+
+    kbps = available_kbps(duration_seconds, max_size_mb)
+
+    for codec in formats:
+        if kbps < MIN_KBPS.get(codec, 8):
+            continue
+
+        if codec == 'opus':
+            bitrate = int(min(MAX_USEFUL_KBPS['opus'], math.floor(kbps)))
+            # Opus por debajo de 12k funciona mejor en banda estrecha
+            sample_rate = 16000 if bitrate >= 12 else 8000
+            plan = CompressionPlan('opus', bitrate, sample_rate, '.ogg', 0.0)
+        elif codec == 'mp3':
+            ceiling = min(MAX_USEFUL_KBPS['mp3'], kbps)
+            bitrate = max(rate for rate in MP3_BITRATES_16K if rate <= ceiling)
+            if bitrate >= 24:
+                plan = CompressionPlan('mp3', bitrate, 16000, '.mp3', 0.0)
+            else:
+                # Bitrates muy bajos: 8 kHz y banda de voz telefónica para que se entienda
+                bitrate = max(rate for rate in MP3_BITRATES_8K if rate <= ceiling)
+                plan = CompressionPlan('mp3', bitrate, 8000, '.mp3', 0.0,
+                                       filters=["highpass=f=100", "lowpass=f=3400"])
+        else:
+            continue
+
+        plan.expected_mb = plan.bitrate_kbps * 1000 * duration_seconds / 8 / MIB
+        return plan
+
+    return None
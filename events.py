@@ -0,0 +1,207 @@
+"""
+Bus de eventos del descargador
+El progreso y los mensajes se publican como eventos; la consola es solo un suscriptor más
+"""
+
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+
+@dataclass(slots=True)
+class Event:
+    """Evento emitido por el pipeline"""
+    kind: str
+    message: Optional[str] = None
+    data: Dict[str, Any] = field(default_factory=dict)
+    timestamp: float = 0.0
+
+
+class EventBus:
+    """
+    Bus de eventos síncrono y sin dependencias.
+    Si no hay suscriptores, `emit` no construye ningún evento.
+    """
+
+    def __init__(self):
+        self._subscribers: List[Callable[[Event], None]] = []
+        self._lock = threading.Lock()
+
+    @property
+    def has_subscribers(self) -> bool:
+        return bool(self._subscribers)
+
+    def subscribe(self, callback: Callable[[Event], None]) -> Callable[[Event], None]:
+        """Registra un suscriptor (callable que recibe un Event)"""
+        with self._lock:
+            # Copia al escribir: emit() recorre la lista sin bloquear
+            self._subscribers = self._subscribers + [callback]
+        return callback
+
+    def unsubscribe(self, callback: Callable[[Event], None]) -> None:
+        with self._lock:
+            self._subscribers = [s for s in self._subscribers if s is not callback]
+
+    def emit(self, kind: str, message: Optional[str] = None, **data) -> Optional[Event]:
+        """Publica un evento a todos los suscriptores"""
+        subscribers = self._subscribers
+        if not subscribers:
+            return None
+
+        event = Event(kind, message, data, time.time())
+        for callback in subscribers:
+            callback(event)
+        return event
+
+
+def _render_download_progress(data):
+    size_info = f" ({data['size']})" if data.get('size') else ''
+    speed_info = f" | Velocidad: {data['speed']}" if data.get('speed') else ''
+    eta_info = f" | ETA: {data['eta']}" if data.get('eta') else ''
+    return f"📥 Progreso: {data.get('percent', 'N/A')}{size_info}{speed_info}{eta_info}"
+
+
+class ProgressBoard:
+    """
+    Vista combinada de varias descargas simultáneas: una línea por descarga.
+    En una terminal las líneas se redibujan en su sitio (como mucho 10 veces por segundo);
+    si la salida es un archivo o una tubería solo se escribe cada 25 % y al terminar
+    """
+
+    BAR_WIDTH = 20
+    REFRESH = 0.1
+
+    def __init__(self, labels, stream=None):
+        self.stream = stream or sys.stdout
+        self.labels = list(labels)
+        self.rows = [self._row(i, 'pendiente') for i in range(len(self.labels))]
+        self.interactive = hasattr(self.stream, 'isatty') and self.stream.isatty()
+        self._drawn = 0
+        self._last_draw = 0.0
+        self._milestones = {}
+
+    def _row(self, slot, status, percent=None, speed=None, eta=None):
+        label = self.labels[slot]
+        label = label if len(label) <= 40 else label[:39] + '…'
+        head = f"[{slot + 1:>{len(str(len(self.labels)))}}/{len(self.labels)}] {label:<40}"
+        if percent is None:
+            return f"{head} {status}"
+        filled = int(self.BAR_WIDTH * min(percent, 100) / 100)
+        bar = '█' * filled + '░' * (self.BAR_WIDTH - filled)
+        extra = ''.join(part for part in (f" {speed}" if speed else '', f" ETA {eta}" if eta else ''))
+        return f"{head} {bar} {percent:5.1f}%{extra} {status}".rstrip()
+
+    def update(self, slot, status='', percent=None, speed=None, eta=None):
+        self.rows[slot] = self._row(slot, status, percent, speed, eta)
+        if self.interactive:
+            if status in ('✅', '❌') or time.monotonic() - self._last_draw >= self.REFRESH:
+                self.draw()
+            return
+        milestone = 5 if status in ('✅', '❌') else int((percent or 0) // 25)
+        if self._milestones.get(slot, -1) < milestone:
+            self._milestones[slot] = milestone
+            print(self.rows[slot], file=self.stream, flush=True)
+
+    def draw(self):
+        if not self.interactive:
+            return
+        # Subir al principio de la vista y reescribir cada línea
+        up = f"\x1b[{self._drawn}F" if self._drawn else ''
+        self.stream.write(up + ''.join(f"\x1b[2K{row}\n" for row in self.rows))
+        self.stream.flush()
+        self._drawn = len(self.rows)
+        self._last_draw = time.monotonic()
+
+    def clear(self):
+        """Borra la vista para escribir un mensaje por encima; draw() la vuelve a pintar"""
+        if self.interactive and self._drawn:
+            self.stream.write(f"\x1b[{self._drawn}F\x1b[J")
+            self.stream.flush()
+            self._drawn = 0
+
+
+class ConsoleSubscriber:
+    """
+    Suscriptor que reproduce la interfaz de consola clásica (mensajes con emojis y spinners)
+    """
+
+    SPINNER_CHARS = ['⠋', '⠙', '⠹', '⠸', '⠼', '⠴', '⠦', '⠧', '⠇', '⠏']
+
+    # Eventos estructurados sin mensaje que la consola sabe presentar
+    RENDERERS = {
+        'download.progress': _render_download_progress,
+    }
+
+    def __init__(self, stream=None):
+        self.stream = stream
+        self._spinner_stop = None
+        self._spinner_thread = None
+        self._board = None
+
+    def __call__(self, event: Event) -> None:
+        if event.kind == 'spinner.start':
+            self._start_spinner(event.message)
+            return
+        if event.kind == 'spinner.stop':
+            self._stop_spinner()
+            return
+        if event.kind == 'downloads.start':
+            self._board = ProgressBoard(event.data.get('labels', []), self.stream)
+            self._board.draw()
+            return
+        if event.kind == 'downloads.end':
+            if self._board is not None:
+                self._board.draw()
+            self._board = None
+            return
+        if self._board is not None and event.kind == 'download.progress' and 'slot' in event.data:
+            data = event.data
+            self._board.update(data['slot'], data.get('status', ''), data.get('percent_value'),
+                               data.get('speed'), data.get('eta'))
+            return
+
+        message = event.message
+        if message is None:
+            renderer = self.RENDERERS.get(event.kind)
+            if renderer is None:
+                return
+            message = renderer(event.data)
+
+        if self._board is not None:
+            # Los mensajes se escriben por encima de la vista de descargas
+            self._board.clear()
+            print(message, file=self.stream or sys.stdout, flush=True)
+            self._board.draw()
+            return
+        print(message, file=self.stream or sys.stdout, flush=True)
+
+    def show_progress_spinner(self, message, stop_event):
+        """
+        Muestra un spinner animado mientras se ejecuta una tarea
+        """
+        stream = self.stream or sys.stdout
+        i = 0
+        while not stop_event.is_set():
+            print(f'\r{self.SPINNER_CHARS[i % len(self.SPINNER_CHARS)]} {message}', end='', flush=True, file=stream)
+            time.sleep(0.1)
+            i += 1
+        print(f'\r✅ {message} - Completado!', flush=True, file=stream)
+
+    def _start_spinner(self, message):
+        self._stop_spinner()
+        self._spinner_stop = threading.Event()
+        self._spinner_thread = threading.Thread(
+            target=self.show_progress_spinner,
+            args=(message, self._spinner_stop),
+            daemon=True
+        )
+        self._spinner_thread.start()
+
+    def _stop_spinner(self):
+        if self._spinner_thread is not None:
+            self._spinner_stop.set()
+            self._spinner_thread.join()
+            self._spinner_thread = None
+            self._spinner_stop = None
@@ -6,19 +6,146 @@ extrae audio, transcribe usando Replicate Whisper y genera formatos legibles
 """
 
 import re
-import html
+import bisect
 import subprocess
 import sys
 import os
 import json
+import shutil
+import argparse
 from pathlib import Path
 from urllib.parse import urlparse, parse_qs
-import replicate
-from dotenv import load_dotenv
-import threading
 import time
+from contextlib import contextmanager, ExitStack, nullcontext
 from datetime import datetime
 
+from events import EventBus, ConsoleSubscriber
+from results import DownloadResult, ExtractionResult, CompressionResult, TranscriptionResult, ClipResult, \
+    SubtitleResult
+from backends import ReplicateBackend, make_backend, seconds_to_srt_time
+from urls import canonical_video_url, prefer
+
+# NOTA: `replicate` (httpx + pydantic) y `dotenv` se importan de forma perezosa
+# dentro de los métodos que los necesitan, para que subcomandos como `format`
+# o `search` arranquen en milisegundos.
+
+
+def get_cache_dir():
+    """Directorio de caché del script (configurable con DESCARGA_VIDEOS_CACHE)"""
+    cache_dir = Path(os.environ.get('DESCARGA_VIDEOS_CACHE',
+                                    Path.home() / '.cache' / 'descarga_videos'))
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    return cache_dir
+
+
+def default_upload_manager():
+    """
+    Gestor de subidas con caché persistente en el directorio de caché.
+    Con DESCARGA_VIDEOS_UPLOAD_DIR y DESCARGA_VIDEOS_UPLOAD_URL (la URL pública de ese directorio)
+    usa un directorio local/almacén de objetos en lugar de la API de archivos de Replicate.
+    Sin la URL lanza ValueError (en una transcripción suelta, el audio se envía entonces con la predicción)
+    """
+    from uploads import UploadManager, UploadCache, ReplicateFilesBackend, LocalDirectoryBackend
+
+    upload_dir = os.environ.get('DESCARGA_VIDEOS_UPLOAD_DIR')
+    if upload_dir:
+        backend = LocalDirectoryBackend(upload_dir, os.environ.get('DESCARGA_VIDEOS_UPLOAD_URL'))
+    else:
+        backend = ReplicateFilesBackend()
+    return UploadManager(backend, UploadCache(get_cache_dir() / 'uploads.json'))
+
+
+_replicate_resilience = None
+
+
+def get_replicate_resilience():
+    """
+    Reintentos, circuit breaker y limitador adaptativo compartidos por todo el proceso
+    (la cuota de Replicate es por token, no por descargador)
+    """
+    global _replicate_resilience
+    if _replicate_resilience is None:
+        from resilience import Resilience
+        _replicate_resilience = Resilience()
+    return _replicate_resilience
+
+
+_upload_resilience = None
+
+
+def get_upload_resilience():
+    """
+    Reintentos y circuit breaker propios de la subida previa del audio: si la subida falla,
+    la predicción se crea con el audio dentro y no debe encontrarse el circuito abierto por ello
+    """
+    global _upload_resilience
+    if _upload_resilience is None:
+        from resilience import Resilience, RetryPolicy
+        _upload_resilience = Resilience(policy=RetryPolicy(max_attempts=3))
+    return _upload_resilience
+
+
+_metadata_service = None
+
+
+def get_metadata_service():
+    """
+    Duraciones y streams cacheados por (ruta, tamaño, mtime), compartidos por todo el proceso
+    (descarga, extracción y compresión consultan el mismo archivo varias veces)
+    """
+    global _metadata_service
+    if _metadata_service is None:
+        from metadata import MetadataService
+        _metadata_service = MetadataService(get_cache_dir() / 'media_info.json')
+    return _metadata_service
+
+
+def get_tool_version(tool):
+    """
+    Devuelve la versión de yt-dlp/ffmpeg cacheada por (ruta, tamaño, mtime) del ejecutable.
+    None si no está instalado, cadena vacía si no se pudo verificar.
+    """
+    tool_path = shutil.which(tool)
+    if not tool_path:
+        return None
+
+    stat = os.stat(tool_path)
+    cache_key = f"{tool_path}:{stat.st_size}:{int(stat.st_mtime)}"
+    cache_file = get_cache_dir() / 'tool_versions.json'
+
+    try:
+        cache = json.loads(cache_file.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        cache = {}
+
+    cached = cache.get(tool)
+    if cached and cached.get('key') == cache_key:
+        return cached['version']
+
+    version_flag = '--version' if tool == 'yt-dlp' else '-version'
+    try:
+        result = subprocess.run([tool_path, version_flag], capture_output=True, text=True)
+    except OSError:
+        return ''
+
+    if result.returncode != 0:
+        return ''
+
+    first_line = result.stdout.strip().split('\n')[0]
+    if tool == 'yt-dlp':
+        version = first_line
+    else:
+        parts = first_line.split(' ')
+        version = parts[2] if len(parts) > 2 else 'Instalado'
+
+    cache[tool] = {'key': cache_key, 'version': version}
+    try:
+        cache_file.write_text(json.dumps(cache, indent=2), encoding='utf-8')
+    except OSError:
+        pass
+
+    return version
+
 
 class TranscriptionFormatter:
     """
@@ -28,6 +155,15 @@ class TranscriptionFormatter:
     def __init__(self):
         self.segments = []
         self.total_duration = 0
+        # Índice por tiempo de inicio (para slice); se reconstruye al cargar segmentos
+        self.starts = []
+        self.max_segment_duration = 0
+        # Pausa que separa párrafos: segundos o percentil de las pausas ('p90')
+        self.paragraph_pause = 3
+        self._segmentation = None
+        # Idioma de la transcripción (detected_language); None = se estima a partir del texto
+        self.language = None
+        self._folded = None
 
     def parse_srt_content(self, srt_content):
         """Parsea contenido SRT y extrae segmentos"""
@@ -74,8 +210,58 @@ class TranscriptionFormatter:
         if self.segments:
             self.total_duration = max(seg['end'] for seg in self.segments)
 
+        self._build_index()
         return len(self.segments)
 
+    def load_segments(self, segments):
+        """Carga segmentos ya estructurados ({'start', 'end', 'text'}) sin pasar por SRT"""
+        self.segments = []
+        for number, segment in enumerate(segments, 1):
+            text = (segment.get('text') or '').strip()
+            if not text:
+                continue
+            start, end = segment['start'], segment['end']
+            self.segments.append({
+                'number': number,
+                'start': start,
+                'end': end,
+                'start_formatted': seconds_to_srt_time(start),
+                'end_formatted': seconds_to_srt_time(end),
+                'duration': end - start,
+                'text': text
+            })
+
+        self.total_duration = max((seg['end'] for seg in self.segments), default=0)
+        self._build_index()
+        return len(self.segments)
+
+    def _build_index(self):
+        """Ordena los segmentos por inicio y guarda el array de inicios para búsquedas binarias"""
+        if any(a['start'] > b['start'] for a, b in zip(self.segments, self.segments[1:])):
+            self.segments.sort(key=lambda seg: seg['start'])
+        self.starts = [seg['start'] for seg in self.segments]
+        self.max_segment_duration = max((seg['duration'] for seg in self.segments), default=0)
+        self._segmentation = None
+        self._folded = None
+
+    @property
+    def segmentation(self):
+        """Pausas y agrupaciones (párrafos, minutos, bloques) compartidas por todos los formatos"""
+        if self._segmentation is None:
+            from segmentation import Segmentation
+            self._segmentation = Segmentation(self.starts, [seg['end'] for seg in self.segments])
+        return self._segmentation
+
+    def slice(self, start, end):
+        """
+        Segmentos que se solapan con [start, end) segundos, en O(log n + k):
+        ningún segmento dura más que max_segment_duration, así que basta buscar desde
+        start - max_segment_duration en el array de inicios
+        """
+        last = bisect.bisect_left(self.starts, end)
+        first = bisect.bisect_left(self.starts, start - self.max_segment_duration, 0, last)
+        return [seg for seg in self.segments[first:last] if seg['end'] > start]
+
     def timestamp_to_seconds(self, timestamp):
         """Convierte timestamp SRT (HH:MM:SS,mmm) a segundos"""
         try:
@@ -98,6 +284,15 @@ class TranscriptionFormatter:
         else:
             return f"{minutes:02d}:{secs:02d}"
 
+    def search(self, query):
+        """Devuelve los segmentos cuyo texto contiene la consulta (sin distinguir mayúsculas ni acentos)"""
+        from tokenizer import fold_text
+
+        if self._folded is None:
+            self._folded = [fold_text(segment['text']) for segment in self.segments]
+        query = fold_text(query)
+        return [segment for segment, text in zip(self.segments, self._folded) if query in text]
+
     def generate_clean_transcript(self, output_path):
         """Genera transcripción limpia y legible"""
         content = []
@@ -110,21 +305,16 @@ class TranscriptionFormatter:
         content.append("=" * 80)
         content.append("")
 
-        current_minute = -1
-
-        for segment in self.segments:
-            # Agregar separador cada minuto
-            segment_minute = int(segment['start'] // 60)
-            if segment_minute != current_minute:
-                if current_minute >= 0:
-                    content.append("")
-                content.append(f"📍 MINUTO {segment_minute:02d}")
-                content.append("-" * 40)
-                current_minute = segment_minute
+        for index, (minute, first, last) in enumerate(self.segmentation.minutes()):
+            # Separador por cada minuto con segmentos
+            if index:
+                content.append("")
+            content.append(f"📍 MINUTO {minute:02d}")
+            content.append("-" * 40)
 
             # Formato: [MM:SS] Texto
-            time_mark = self.seconds_to_readable(segment['start'])
-            content.append(f"[{time_mark}] {segment['text']}")
+            for segment in self.segments[first:last]:
+                content.append(f"[{self.seconds_to_readable(segment['start'])}] {segment['text']}")
 
         # Guardar archivo
         with open(output_path, 'w', encoding='utf-8') as f:
@@ -143,36 +333,11 @@ class TranscriptionFormatter:
         content.append("=" * 80)
         content.append("")
 
-        # Agrupar texto por párrafos (pausas largas)
-        paragraphs = []
-        current_paragraph = []
-        last_end = 0
-
-        for segment in self.segments:
-            # Si hay una pausa larga (>3 segundos), empezar nuevo párrafo
-            pause = segment['start'] - last_end
-
-            if pause > 3 and current_paragraph:
-                paragraphs.append({
-                    'start': current_paragraph[0]['start'],
-                    'text': ' '.join([s['text'] for s in current_paragraph])
-                })
-                current_paragraph = []
-
-            current_paragraph.append(segment)
-            last_end = segment['end']
-
-        # Agregar último párrafo
-        if current_paragraph:
-            paragraphs.append({
-                'start': current_paragraph[0]['start'],
-                'text': ' '.join([s['text'] for s in current_paragraph])
-            })
-
-        # Escribir párrafos
-        for i, paragraph in enumerate(paragraphs, 1):
-            time_mark = self.seconds_to_readable(paragraph['start'])
-            content.append(f"[{time_mark}] {paragraph['text']}")
+        # Párrafos separados por pausas largas (paragraph_pause: 3 s por defecto o un percentil)
+        for first, last in self.segmentation.paragraphs(self.paragraph_pause):
+            time_mark = self.seconds_to_readable(self.segments[first]['start'])
+            text = ' '.join(segment['text'] for segment in self.segments[first:last])
+            content.append(f"[{time_mark}] {text}")
             content.append("")  # Línea vacía entre párrafos
 
         with open(output_path, 'w', encoding='utf-8') as f:
@@ -205,16 +370,8 @@ class TranscriptionFormatter:
         }
 
         # Detectar temas por bloques de 5 minutos
-        time_blocks = {}
-        for segment in self.segments:
-            block = int(segment['start'] // 300)  # Bloques de 5 minutos
-            if block not in time_blocks:
-                time_blocks[block] = []
-            time_blocks[block].append(segment)
-
-        # Analizar cada bloque
-        for block_num in sorted(time_blocks.keys()):
-            segments = time_blocks[block_num]
+        for block_num, first, last in self.segmentation.blocks(300):
+            segments = self.segments[first:last]
             start_time = block_num * 5
             end_time = min(start_time + 5, self.total_duration / 60)
 
@@ -252,49 +409,60 @@ class TranscriptionFormatter:
         return output_path
 
     def generate_searchable_index(self, output_path):
-        """Genera índice buscable con palabras clave"""
+        """
+        Genera índice buscable con palabras clave. Las palabras se agrupan sin acentos ni
+        mayúsculas y se descartan las palabras vacías del idioma de la transcripción
+        """
+        from tokenizer import Tokenizer
+
+        tokenizer = Tokenizer.for_texts([segment['text'] for segment in self.segments], self.language)
+
         content = []
         content.append("=" * 80)
         content.append("ÍNDICE BUSCABLE DE LA TRANSCRIPCIÓN")
         content.append("=" * 80)
+        content.append(f"Idioma: {tokenizer.language or 'desconocido'}")
         content.append("")
 
-        # Crear índice de palabras importantes
-        word_index = {}
-
-        for segment in self.segments:
-            words = re.findall(r'\b[a-záéíóúñüA-ZÁÉÍÓÚÑÜ]{4,}\b', segment['text'])
-            for word in words:
-                word_lower = word.lower()
-                if word_lower not in word_index:
-                    word_index[word_lower] = []
-                word_index[word_lower].append({
-                    'time': self.seconds_to_readable(segment['start']),
-                    'text': segment['text'][:100] + '...' if len(segment['text']) > 100 else segment['text']
-                })
+        # Crear índice de palabras importantes: clave plegada -> apariciones y segmentos
+        counts = {}
+        forms = {}
+        word_segments = {}
+
+        for index, segment in enumerate(self.segments):
+            for key, form in tokenizer.tokens(segment['text']):
+                if key in counts:
+                    counts[key] += 1
+                    if word_segments[key][-1] != index:
+                        word_segments[key].append(index)
+                else:
+                    counts[key] = 1
+                    forms[key] = form  # primera forma vista, con sus acentos
+                    word_segments[key] = [index]
 
         # Mostrar palabras más frecuentes
-        word_freq = {word: len(occurrences) for word, occurrences in word_index.items()}
-        top_words = sorted(word_freq.items(), key=lambda x: x[1], reverse=True)[:20]
+        top_words = sorted(counts.items(), key=lambda x: x[1], reverse=True)[:20]
 
         content.append("🔤 PALABRAS MÁS FRECUENTES:")
         content.append("-" * 30)
-        for word, freq in top_words:
-            content.append(f"{word}: {freq} veces")
+        for key, freq in top_words:
+            content.append(f"{forms[key]}: {freq} veces")
         content.append("")
 
         # Índice completo
         content.append("📚 ÍNDICE COMPLETO (A-Z):")
         content.append("-" * 30)
 
-        for word in sorted(word_index.keys()):
-            occurrences = word_index[word]
-            if len(occurrences) > 1:  # Solo palabras que aparecen más de una vez
-                content.append(f"\n🔍 {word.upper()} ({len(occurrences)} veces):")
-                for occ in occurrences[:3]:  # Mostrar máximo 3 ejemplos
-                    content.append(f"   [{occ['time']}] {occ['text']}")
-                if len(occurrences) > 3:
-                    content.append(f"   ... y {len(occurrences) - 3} más")
+        for key in sorted(counts):
+            if counts[key] > 1:  # Solo palabras que aparecen más de una vez
+                indexes = word_segments[key]
+                content.append(f"\n🔍 {forms[key].upper()} ({counts[key]} veces):")
+                for index in indexes[:3]:  # Mostrar máximo 3 ejemplos
+                    segment = self.segments[index]
+                    text = segment['text'][:100] + '...' if len(segment['text']) > 100 else segment['text']
+                    content.append(f"   [{self.seconds_to_readable(segment['start'])}] {text}")
+                if len(indexes) > 3:
+                    content.append(f"   ... y {len(indexes) - 3} más")
 
         with open(output_path, 'w', encoding='utf-8') as f:
             f.write('\n'.join(content))
@@ -302,9 +470,43 @@ class TranscriptionFormatter:
         return output_path
 
 class VideoDownloader:
-    def __init__(self):
-        # Cargar variables de entorno desde archivo .env
-        load_dotenv()
+    def __init__(self, events=None):
+        # Bus de eventos: por defecto con la consola como único suscriptor.
+        # Para uso como librería, pasar un EventBus propio (sin suscriptores = silencio total)
+        if events is None:
+            events = EventBus()
+            events.subscribe(ConsoleSubscriber())
+        self.events = events
+
+        # Límites de concurrencia opcionales por etapa ('download', 'extract_audio',
+        # 'compress', 'transcribe'): semáforos compartidos entre varios descargadores
+        self.stage_limits = {}
+
+        # El token de Replicate (y el .env) se cargan la primera vez que se necesitan
+        self._replicate_token = None
+
+        # Gestor de subidas (se crea al primer uso; el modo servicio comparte uno entre workers)
+        self.uploads = None
+
+        # Capa de resiliencia para Replicate (por defecto, la compartida del proceso)
+        self.resilience = None
+
+        # Registro de predicciones en curso (para reattach/cancel tras una interrupción)
+        self.predictions = None
+
+        # Motor de transcripción (por defecto DESCARGA_VIDEOS_BACKEND o Replicate)
+        self.backend = None
+
+        # Recorte de silencios antes de transcribir (SilenceTrimmer; None = desactivado)
+        self.trimmer = None
+
+        # Política de almacenamiento (StorageManager: retención por tipo, tope de disco,
+        # espacio libre mínimo; None = no se borra nada)
+        self.storage = None
+
+        # Organización de las descargas: 'platform' (<output_dir>/<plataforma>/) o 'video'
+        # (<output_dir>/<plataforma>/<video_id>/, el directorio que comparten los nodos del modo cluster)
+        self.layout = 'platform'
 
         # Múltiples patrones para encontrar URLs de Vimeo en diferentes contextos
         self.vimeo_patterns = [
@@ -346,48 +548,179 @@ class VideoDownloader:
             r'/share/([a-f0-9]{32})',
         ]
 
-        # Verificar configuración de Replicate
-        self.replicate_token = os.environ.get('REPLICATE_API_TOKEN')
-        if not self.replicate_token:
-            print("⚠️  Advertencia: REPLICATE_API_TOKEN no está configurado.")
-            print("   Crea un archivo .env con: REPLICATE_API_TOKEN=tu_token")
-            print("   O ejecuta: export REPLICATE_API_TOKEN=tu_token")
+    @property
+    def replicate_token(self):
+        """
+        Token de Replicate, cargado de forma perezosa desde el entorno/.env
+        """
+        if self._replicate_token is None:
+            # Cargar variables de entorno desde archivo .env
+            from dotenv import load_dotenv
+            load_dotenv()
+
+            self._replicate_token = os.environ.get('REPLICATE_API_TOKEN') or ''
+            if not self._replicate_token:
+                self._log("⚠️  Advertencia: REPLICATE_API_TOKEN no está configurado.")
+                self._log("   Crea un archivo .env con: REPLICATE_API_TOKEN=tu_token")
+                self._log("   O ejecuta: export REPLICATE_API_TOKEN=tu_token")
+
+        return self._replicate_token or None
+
+    @property
+    def upload_manager(self):
+        if self.uploads is None:
+            self.uploads = default_upload_manager()
+        return self.uploads
+
+    @property
+    def replicate_resilience(self):
+        if self.resilience is None:
+            self.resilience = get_replicate_resilience()
+        return self.resilience
+
+    @property
+    def transcription_backend(self):
+        if self.backend is None:
+            self.backend = make_backend()
+        return self.backend
+
+    def _backend_ready(self):
+        """Comprueba que el backend de transcripción se puede usar; si no, explica el motivo"""
+        reason = self.transcription_backend.unavailable_reason(self)
+        if reason:
+            self._log(f"❌ No se puede transcribir: {reason}")
+            return False
+        return True
+
+    @property
+    def prediction_store(self):
+        if self.predictions is None:
+            from predictions import PredictionStore
+            self.predictions = PredictionStore(get_cache_dir() / 'predictions.sqlite3')
+        return self.predictions
 
-    def show_progress_spinner(self, message, stop_event):
+    def _log_retry(self, attempt, delay, error):
+        self._log(f"   ⚠️  Error de la API ({error}); reintento {attempt} en {delay:.1f}s...")
+
+    def _upload_audio(self, audio_path):
         """
-        Muestra un spinner animado mientras se ejecuta una tarea
+        Sube el audio una sola vez por contenido y devuelve su URL (reutilizada mientras no caduque).
+        None si la subida previa falla: entonces el audio se envía dentro de predictions.create
         """
-        spinner_chars = ['⠋', '⠙', '⠹', '⠸', '⠼', '⠴', '⠦', '⠧', '⠇', '⠏']
-        i = 0
-        while not stop_event.is_set():
-            print(f'\r{spinner_chars[i % len(spinner_chars)]} {message}', end='', flush=True)
-            time.sleep(0.1)
-            i += 1
-        print(f'\r✅ {message} - Completado!', flush=True)
+        with self._stage('upload', bytes=0) as span:
+            try:
+                upload, reused = get_upload_resilience().call(
+                    lambda: self.upload_manager.url_for(audio_path), on_retry=self._log_retry)
+            except Exception as e:
+                span['ok'] = False
+                self._log(f"⚠️  No se pudo subir el audio por adelantado ({e}); se enviará con la predicción")
+                return None
 
-    def clean_video_url(self, raw_url, platform):
+            span['reused'] = reused
+            if reused:
+                self._log(f"♻️  Reutilizando audio ya subido (caduca {time.strftime('%H:%M', time.localtime(upload.expires_at))})")
+            else:
+                span['bytes'] = upload.size
+                self._log(f"📤 Audio subido: {upload.size / (1024 * 1024):.1f}MB")
+            return upload.url
+
+    def _emit(self, kind, message=None, **data):
+        """Publica un evento en el bus (la consola es un suscriptor más)"""
+        return self.events.emit(kind, message, **data)
+
+    def _log(self, message):
+        """Mensaje informativo para el usuario"""
+        self.events.emit('log', message)
+
+    @contextmanager
+    def _stage(self, name, **attrs):
         """
-        Convierte URL con entidades HTML a URL limpia según la plataforma
+        Delimita una etapa del pipeline: respeta su límite de concurrencia (si lo hay)
+        y al terminar emite un evento 'stage.end' con la duración y los atributos
+        (bytes, media_seconds, ok...) que el código de la etapa añada al dict devuelto
         """
-        # Decodificar entidades HTML (&amp; -> &)
-        clean_url = html.unescape(raw_url)
+        limit = self.stage_limits.get(name)
+        wait_start = time.perf_counter()
+        if limit is not None:
+            limit.acquire()
 
-        if platform == 'vimeo':
-            # Para Vimeo: eliminar parámetros (hasta el ?)
-            if '?' in clean_url:
-                clean_url = clean_url.split('?')[0]
-        elif platform == 'loom':
-            # Para Loom: mantener URL completa pero limpiar
-            # Loom necesita la URL embed completa
-            pass
+        start = time.perf_counter()
+        started_at = time.time()
+        try:
+            yield attrs
+        finally:
+            duration = time.perf_counter() - start
+            if limit is not None:
+                limit.release()
+            self._emit_span(name, duration, started_at, wait=start - wait_start, **attrs)
+
+    def _emit_span(self, name, duration, started_at=None, **attrs):
+        """Publica la duración de una etapa (también para etapas medidas externamente, como la cola de Replicate)"""
+        if self.events.has_subscribers:
+            self.events.emit('stage.end', stage=name, duration=duration,
+                             started_at=started_at if started_at is not None else time.time() - duration,
+                             **attrs)
+
+    @staticmethod
+    def _file_size(path):
+        try:
+            return os.path.getsize(path)
+        except (OSError, TypeError):
+            return None
 
-        return clean_url
+    def _ensure_space(self, path, needed=0, stage=''):
+        """Con política de almacenamiento, comprueba (y si hace falta libera) espacio antes de una etapa"""
+        if self.storage is None:
+            return True
+        return self.storage.ensure_space(path, needed, stage)
+
+    def _storage_after(self, event, *paths):
+        """Aplica la retención tras extraer el audio ('audio') o guardar la transcripción ('transcript')"""
+        if self.storage is not None:
+            for path in dict.fromkeys(str(path) for path in paths if path):
+                self.storage.after(event, path)
+
+    def _storage_pinned(self, *paths):
+        """Los artefactos de estos videos no se desalojan mientras dura el bloque"""
+        return self.storage.pinned(*paths) if self.storage is not None else nullcontext()
+
+    @staticmethod
+    def _media_duration(media_path):
+        """Duración (s) para las métricas: caché o .info.json de yt-dlp, sin lanzar ffprobe"""
+        if not media_path:
+            return None
+        return get_metadata_service().duration(media_path, probe=False)
 
-    def extract_audio_from_video(self, video_path, audio_path):
+    def clean_video_url(self, raw_url, platform):
         """
-        Extrae audio de un video usando ffmpeg con progreso visible
+        Convierte URL con entidades HTML a URL limpia según la plataforma: forma canónica
+        sin parámetros de reproductor ni de seguimiento, conservando el hash (h) de los
+        videos ocultos de Vimeo (ver urls.py)
+        """
+        return canonical_video_url(raw_url, platform).url
+
+    VIDEO_EXTENSIONS = ('.mp4', '.webm', '.mkv', '.avi', '.mov')
+
+    def extract_audio(self, video_path, audio_path, threads=None, niceness=None, spinner=True):
         """
-        print(f"\n🎵 Extrayendo audio de: {Path(video_path).name}")
+        Extrae audio de un video usando ffmpeg. Devuelve un ExtractionResult.
+        threads: hilos de ffmpeg (-threads); niceness: prioridad del proceso (nice, solo POSIX)
+        """
+        with self._stage('extract_audio', video_path=str(video_path)) as span, self._storage_pinned(video_path):
+            result = self._extract_audio(video_path, audio_path, threads, niceness, spinner)
+            span['ok'] = result.ok
+            span['bytes'] = self._file_size(result.audio_path)
+            span['media_seconds'] = self._media_duration(video_path)
+        if result.ok:
+            self._storage_after('audio', video_path)
+        return result
+
+    def _extract_audio(self, video_path, audio_path, threads=None, niceness=None, spinner=True):
+        self._log(f"\n🎵 Extrayendo audio de: {Path(video_path).name}")
+
+        # El audio (-q:a 0) ocupa como mucho una cuarta parte del video
+        if not self._ensure_space(Path(audio_path).parent, (self._file_size(video_path) or 0) // 4, 'extraer el audio'):
+            return ExtractionResult(False, str(video_path), error="Espacio en disco insuficiente")
 
         cmd = [
             "ffmpeg",
@@ -398,194 +731,441 @@ class VideoDownloader:
             "-progress", "pipe:1",  # Mostrar progreso
             str(audio_path)
         ]
+        if threads:
+            cmd[-1:-1] = ["-threads", str(threads)]
+        if niceness and shutil.which("nice"):
+            # nice en lugar de preexec_fn: seguro aunque se lance desde varios hilos
+            cmd = ["nice", "-n", str(niceness)] + cmd
 
         try:
-            # Crear evento para detener spinner
-            stop_event = threading.Event()
-
-            # Iniciar spinner en hilo separado
-            spinner_thread = threading.Thread(
-                target=self.show_progress_spinner,
-                args=("Extrayendo audio", stop_event)
-            )
-            spinner_thread.start()
-
-            # Ejecutar ffmpeg
-            result = subprocess.run(cmd, capture_output=True, text=True)
-
-            # Detener spinner
-            stop_event.set()
-            spinner_thread.join()
+            if spinner:
+                self._emit('spinner.start', "Extrayendo audio")
+            try:
+                # Ejecutar ffmpeg
+                result = subprocess.run(cmd, capture_output=True, text=True)
+            finally:
+                if spinner:
+                    self._emit('spinner.stop')
 
             if result.returncode == 0:
-                print(f"✅ Audio extraído: {Path(audio_path).name}")
-                return True
-            else:
-                print(f"❌ Error extrayendo audio:")
-                if result.stderr:
-                    # Mostrar solo errores importantes, no warnings
-                    error_lines = [line for line in result.stderr.split('\n')
-                                   if 'error' in line.lower() and line.strip()]
-                    if error_lines:
-                        for line in error_lines[:3]:  # Mostrar máximo 3 líneas de error
-                            print(f"   {line}")
-                return False
+                self._emit('audio.extracted', f"✅ Audio extraído: {Path(audio_path).name}",
+                           video_path=str(video_path), audio_path=str(audio_path))
+                return ExtractionResult(True, str(video_path), str(audio_path))
+
+            self._log(f"❌ Error extrayendo audio:")
+            # Mostrar solo errores importantes, no warnings
+            error_lines = [line for line in (result.stderr or '').split('\n')
+                           if 'error' in line.lower() and line.strip()]
+            for line in error_lines[:3]:  # Mostrar máximo 3 líneas de error
+                self._log(f"   {line}")
+            error = error_lines[0] if error_lines else f"ffmpeg terminó con código {result.returncode}"
+            return ExtractionResult(False, str(video_path), error=error)
 
         except FileNotFoundError:
-            print("❌ Error: ffmpeg no está instalado")
-            print("Instálalo desde: https://ffmpeg.org/download.html")
-            return False
+            self._log("❌ Error: ffmpeg no está instalado")
+            self._log("Instálalo desde: https://ffmpeg.org/download.html")
+            return ExtractionResult(False, str(video_path), error="ffmpeg no está instalado")
         except Exception as e:
-            print(f"❌ Error inesperado: {str(e)}")
+            self._log(f"❌ Error inesperado: {str(e)}")
+            return ExtractionResult(False, str(video_path), error=str(e))
+
+    @classmethod
+    def find_videos(cls, source):
+        """
+        Videos a procesar desde un directorio (recursivo) o un manifiesto (una ruta por línea,
+        relativas al manifiesto; # para comentarios)
+        """
+        source = Path(source)
+        if source.is_dir():
+            return sorted(path for path in source.rglob('*')
+                          if path.suffix.lower() in cls.VIDEO_EXTENSIONS and path.is_file())
+
+        videos = []
+        with open(source, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#'):
+                    path = Path(line)
+                    videos.append(path if path.is_absolute() else source.parent / path)
+        return videos
+
+    @staticmethod
+    def audio_is_current(video_path, audio_path):
+        """El audio existe, no está vacío y es posterior al video"""
+        try:
+            audio_stat = Path(audio_path).stat()
+            return audio_stat.st_size > 0 and audio_stat.st_mtime >= Path(video_path).stat().st_mtime
+        except OSError:
             return False
 
-    def compress_audio_for_transcription(self, audio_path, max_size_mb=45):
+    def extract_audio_batch(self, videos, workers=None, threads=1, niceness=None, force=False):
         """
-        Comprime un archivo de audio si es demasiado grande para Replicate
+        Extrae el audio de muchos videos con un pool de procesos ffmpeg en paralelo
+        (por defecto uno por núcleo, cada uno con `threads` hilos). Omite los videos cuyo
+        audio ya está al día salvo con force. Devuelve los ExtractionResult en el orden de entrada
         """
-        audio_path = Path(audio_path)
-        current_size_mb = audio_path.stat().st_size / (1024 * 1024)
+        from concurrent.futures import ThreadPoolExecutor, as_completed
+
+        videos = [Path(video) for video in videos]
+        workers = workers or max(1, (os.cpu_count() or 1) // max(1, threads or 1))
+        results = [None] * len(videos)
+
+        pending = []
+        for index, video in enumerate(videos):
+            audio = video.with_suffix('.mp3')
+            if not video.exists():
+                results[index] = ExtractionResult(False, str(video), error="Video no encontrado")
+            elif not force and self.audio_is_current(video, audio):
+                results[index] = ExtractionResult(True, str(video), str(audio), skipped=True)
+            else:
+                pending.append((index, video, audio))
+
+        skipped = sum(1 for result in results if result is not None and result.skipped)
+        self._log(f"🎵 {len(pending)} video(s) por extraer, {skipped} ya al día "
+                  f"({workers} workers × {threads or 'auto'} hilo(s) de ffmpeg)")
+
+        done = 0
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ffmpeg') as pool:
+            futures = {
+                pool.submit(self.extract_audio, video, audio, threads, niceness, False): index
+                for index, video, audio in pending
+            }
+            for future in as_completed(futures):
+                index = futures[future]
+                try:
+                    results[index] = future.result()
+                except Exception as e:
+                    results[index] = ExtractionResult(False, str(videos[index]), error=str(e))
+                done += 1
+                self._emit('extract.progress', f"   [{done}/{len(pending)}] "
+                           f"{'✅' if results[index].ok else '❌'} {videos[index].name}",
+                           done=done, total=len(pending), video_path=str(videos[index]), ok=results[index].ok)
 
-        if current_size_mb <= max_size_mb:
-            print(f"✅ Audio ya es del tamaño adecuado: {current_size_mb:.1f} MB")
-            return str(audio_path)
+        return results
 
-        print(f"📦 Audio demasiado grande: {current_size_mb:.1f} MB")
-        print(f"🔄 Comprimiendo para reducir a ~{max_size_mb} MB...")
+    def find_transcript(self, media_path):
+        """Transcripción guardada junto al archivo (<nombre>_transcription.bin/.json/.srt) o None"""
+        base = Path(media_path).with_suffix('')
+        for suffix in ('.bin', '.json', '.srt'):
+            candidate = Path(f"{base}_transcription{suffix}")
+            if candidate.exists():
+                return candidate
+        return None
 
-        # Crear nombre para archivo comprimido
-        compressed_path = audio_path.with_stem(f"{audio_path.stem}_compressed")
+    def export_clips(self, media_path, ranges, output_dir=None, padding=1.0, merge_gap=1.0):
+        """
+        Corta los rangos (ClipRange) del video/audio con copia de streams, sin recodificar.
+        Los rangos se amplían `padding` segundos y se fusionan si quedan a menos de `merge_gap`;
+        los inicios se ajustan al fotograma clave anterior y todos los clips de una tanda se
+        cortan en una sola ejecución de ffmpeg. Devuelve un ClipResult
+        """
+        from clips import CLIPS_PER_RUN, merge_ranges, probe_keyframes, snap_to_keyframe, clip_command, clip_filename
+
+        media_path = Path(media_path)
+        if not media_path.exists():
+            self._log(f"❌ Archivo no encontrado: {media_path}")
+            return ClipResult(False, str(media_path), error="Archivo no encontrado")
+
+        info = get_metadata_service().get(media_path)
+        duration = info.duration if info else None
+        clips = merge_ranges(ranges, padding, merge_gap, duration)
+        if not clips:
+            self._log("⚠️ No hay rangos que exportar")
+            return ClipResult(False, str(media_path), error="Sin rangos")
+
+        has_video = (any(stream.get('codec_type') == 'video' for stream in info.streams) if info and info.streams
+                     else media_path.suffix.lower() in self.VIDEO_EXTENSIONS)
+        if has_video:
+            with self._stage('keyframes', path=str(media_path)):
+                keyframes = probe_keyframes(media_path)
+            if keyframes is None:
+                self._log("⚠️ No se pudieron leer los fotogramas clave; ffmpeg ajustará los cortes")
+            for clip in clips:
+                clip.start = snap_to_keyframe(clip.start, keyframes)
+            # Dos clips pueden acabar en el mismo keyframe: se vuelven a fusionar
+            clips = merge_ranges(clips, 0.0, merge_gap, duration)
+
+        output_dir = Path(output_dir) if output_dir else media_path.with_name(f"{media_path.stem}_clips")
+        output_dir.mkdir(parents=True, exist_ok=True)
+        jobs = [(clip, output_dir / clip_filename(media_path, i, clip)) for i, clip in enumerate(clips, 1)]
+
+        self._log(f"\n✂️  Exportando {len(jobs)} clip(s) de {media_path.name} → {output_dir}")
+        result = ClipResult(True, str(media_path))
+        for first in range(0, len(jobs), CLIPS_PER_RUN):
+            batch = jobs[first:first + CLIPS_PER_RUN]
+            with self._stage('clips', path=str(media_path), clips=len(batch)) as span:
+                completed = subprocess.run(clip_command(media_path, batch), capture_output=True, text=True)
+                span['ok'] = completed.returncode == 0
+            result.ffmpeg_runs += 1
+            if completed.returncode != 0:
+                result.ok = False
+                stderr_lines = (completed.stderr or '').strip().splitlines()
+                result.error = stderr_lines[-1] if stderr_lines else "ffmpeg falló"
+                self._log(f"❌ Error cortando clips: {result.error}")
+                break
+            for clip, output_path in batch:
+                result.clip_paths.append(str(output_path))
+                self._log(f"   ✅ {output_path.name} ({clip.end - clip.start:.1f}s)"
+                          + (f" — {clip.label[:60]}" if clip.label else ""))
+
+        return result
+
+    @classmethod
+    def find_transcripts(cls, source):
+        """
+        Transcripciones de un directorio (recursivo) o la indicada; una por video, prefiriendo
+        la versión compacta (.bin) a la JSON y esta al SRT
+        """
+        source = Path(source)
+        if not source.is_dir():
+            return [source]
+
+        preference = {'.bin': 0, '.json': 1, '.srt': 2}
+        chosen = {}
+        for path in source.rglob('*_transcription.*'):
+            if path.suffix in preference and path.stem.endswith('_transcription'):
+                key = path.with_suffix('')
+                if key not in chosen or preference[path.suffix] < preference[chosen[key].suffix]:
+                    chosen[key] = path
+        return sorted(chosen.values())
+
+    def export_subtitles(self, transcript_path, formats=('srt', 'vtt', 'ass'), mux=False, max_chars=42,
+                         max_lines=2, max_duration=7.0, language=None):
+        """
+        Genera <video>.srt/.vtt/.ass a partir de una transcripción (los segmentos se leen y se
+        reparten en cues una sola vez para todos los formatos). Con mux, añade los subtítulos
+        al video descargado (copia de vídeo y audio) en <video>_subtitulado.<ext>.
+        Devuelve un SubtitleResult
+        """
+        from subtitles import MUX_CODECS, MUX_SOURCE, build_cues, mux_command, subtitle_base, write_subtitles
+
+        transcript_path = Path(transcript_path)
+        result = SubtitleResult(False, str(transcript_path))
+
+        formatter = self.load_transcription(transcript_path)
+        if formatter is None or not formatter.segments:
+            result.error = "No se pudieron leer segmentos"
+            self._log(f"❌ {transcript_path.name}: {result.error}")
+            return result
+
+        base = subtitle_base(transcript_path)
+        video_path = None
+        if mux:
+            video_path = next((base.with_suffix(ext) for ext in self.VIDEO_EXTENSIONS
+                               if base.with_suffix(ext).exists()), None)
+            if video_path is None:
+                result.error = "No se encontró el video para añadir los subtítulos"
+                self._log(f"❌ {transcript_path.name}: {result.error}")
+                return result
+            # El contenedor decide qué formato se incrusta (SRT → mov_text en MP4, ASS en MKV...)
+            mux_format = MUX_SOURCE[MUX_CODECS.get(video_path.suffix.lower(), 'mov_text')]
+            formats = tuple(formats) + ((mux_format,) if mux_format not in formats else ())
+
+        with self._stage('subtitles', path=str(transcript_path), formats=','.join(formats)) as span:
+            cues = build_cues(formatter.segments, max_chars, max_lines, max_duration)
+            paths = write_subtitles(cues, base, formats)
+            span['cues'] = len(cues)
+        result.subtitle_paths = [str(path) for path in paths.values()]
+        self._log(f"💬 {transcript_path.name}: {len(cues)} subtítulos → "
+                  f"{', '.join(path.name for path in paths.values())}")
+
+        if video_path is not None:
+            output_path = video_path.with_name(f"{video_path.stem}_subtitulado{video_path.suffix}")
+            with self._stage('mux', path=str(video_path)) as span:
+                completed = subprocess.run(mux_command(video_path, paths[mux_format], output_path, language),
+                                           capture_output=True, text=True)
+                span['ok'] = completed.returncode == 0
+            if completed.returncode != 0:
+                stderr_lines = (completed.stderr or '').strip().splitlines()
+                result.error = stderr_lines[-1] if stderr_lines else "ffmpeg falló"
+                self._log(f"❌ Error incrustando subtítulos en {video_path.name}: {result.error}")
+                return result
+            result.muxed_path = str(output_path)
+            self._log(f"   🎬 Subtítulos incrustados: {output_path.name}")
+
+        result.ok = True
+        return result
 
-        # Calcular bitrate necesario para el tamaño objetivo
-        # Estimación aproximada: MB = (bitrate * duration_seconds) / 8000
-        try:
-            # Obtener duración del audio
-            probe_cmd = [
-                "ffprobe", "-v", "quiet", "-show_entries", "format=duration",
-                "-of", "csv=p=0", str(audio_path)
-            ]
-            result = subprocess.run(probe_cmd, capture_output=True, text=True)
-            duration_seconds = float(result.stdout.strip())
+    def extract_audio_from_video(self, video_path, audio_path):
+        """
+        Extrae audio de un video usando ffmpeg con progreso visible
+        """
+        return self.extract_audio(video_path, audio_path).ok
 
-            # Calcular bitrate objetivo (con margen de seguridad)
-            target_bitrate = int((max_size_mb * 8000 * 0.9) / duration_seconds)  # 90% del límite
-            target_bitrate = max(32, min(128, target_bitrate))  # Entre 32k y 128k
+    def trim_silence(self, audio_path):
+        """
+        Recorta los silencios largos del audio (ffmpeg silencedetect) antes de transcribir.
+        Devuelve (ruta del audio compactado, OffsetMap) o None si está desactivado o no compensa
+        """
+        if self.trimmer is None:
+            return None
+
+        audio_path = Path(audio_path)
+        output_path = audio_path.with_name(f"{audio_path.stem}_voz{audio_path.suffix}")
 
-            print(f"   📊 Duración: {duration_seconds / 60:.1f} minutos")
-            print(f"   🎚️  Bitrate objetivo: {target_bitrate}k")
+        with self._stage('vad', audio_path=str(audio_path), bytes_in=self._file_size(audio_path)) as span:
+            self._emit('spinner.start', "Detectando silencios")
+            try:
+                trimmed = self.trimmer.trim(audio_path, output_path)
+            except FileNotFoundError:
+                trimmed = None
+            finally:
+                self._emit('spinner.stop')
+
+            if trimmed is None:
+                span['ok'] = False
+                self._log("ℹ️  Sin silencios suficientes para recortar: se transcribe el audio completo")
+                return None
 
-        except Exception as e:
-            print(f"   ⚠️ No se pudo calcular duración, usando bitrate conservador")
-            target_bitrate = 64  # Bitrate conservador por defecto
+            path, offset_map, removed = trimmed
+            span['ok'] = True
+            span['bytes'] = self._file_size(path)
+            span['media_seconds'] = offset_map.compact_duration
+            span['removed_seconds'] = removed
+
+        self._log(f"✂️  Silencios recortados: {removed / 60:.1f} min menos "
+                  f"({offset_map.compact_duration / 60:.1f} min de voz)")
+        return Path(path), offset_map
+
+    def _audio_tail(self, audio_path, start):
+        """
+        Copia del audio desde `start` segundos (sin recodificar) para reanudar una transcripción.
+        Devuelve (ruta, OffsetMap hacia el original) o None si no se puede cortar
+        """
+        from silence import OffsetMap
+
+        audio_path = Path(audio_path)
+        duration = get_metadata_service().duration(audio_path)
+        if not duration or start >= duration:
+            return None
 
-        # Comando de compresión
+        output_path = audio_path.with_name(f"{audio_path.stem}_resto{audio_path.suffix}")
         cmd = [
-            "ffmpeg",
+            "ffmpeg", "-hide_banner", "-nostats", "-y",
+            "-ss", f"{start:.3f}",
             "-i", str(audio_path),
-            "-acodec", "mp3",  # Codec MP3 eficiente
-            "-ab", f"{target_bitrate}k",  # Bitrate específico
-            "-ac", "1",  # Mono (reduce tamaño significativamente)
-            "-ar", "16000",  # Sample rate reducido (suficiente para voz)
-            "-y",  # Sobrescribir si existe
-            str(compressed_path)
+            "-map", "a",
+            "-c", "copy",
+            str(output_path),
         ]
-
         try:
-            # Crear evento para spinner
-            stop_event = threading.Event()
-            spinner_thread = threading.Thread(
-                target=self.show_progress_spinner,
-                args=("Comprimiendo audio", stop_event)
-            )
-            spinner_thread.start()
-
-            # Ejecutar compresión
             result = subprocess.run(cmd, capture_output=True, text=True)
+        except FileNotFoundError:
+            return None
+        if result.returncode != 0 or not output_path.exists():
+            output_path.unlink(missing_ok=True)
+            return None
+        return output_path, OffsetMap([(start, duration)])
 
-            # Detener spinner
-            stop_event.set()
-            spinner_thread.join()
+    def compress_audio(self, audio_path, max_size_mb=45, formats=('mp3',)):
+        """
+        Comprime un archivo de audio si es demasiado grande para Replicate. Devuelve un CompressionResult.
+        formats: códecs que acepta el backend, por orden de preferencia (p. ej. ('opus', 'mp3'))
+        """
+        with self._stage('compress', audio_path=str(audio_path)) as span:
+            result = self._compress_audio(audio_path, max_size_mb, formats)
+            span['ok'] = result.ok
+            span['bytes_in'] = int(result.original_size_mb * 1024 * 1024)
+            span['bytes'] = int(result.final_size_mb * 1024 * 1024)
+            return result
 
-            if result.returncode == 0 and compressed_path.exists():
-                new_size_mb = compressed_path.stat().st_size / (1024 * 1024)
-                reduction = ((current_size_mb - new_size_mb) / current_size_mb) * 100
+    def _compress_audio(self, audio_path, max_size_mb, formats=('mp3',)):
+        from compression import plan_compression
 
-                print(f"✅ Audio comprimido exitosamente:")
-                print(f"   📏 Tamaño original: {current_size_mb:.1f} MB")
-                print(f"   📏 Tamaño nuevo: {new_size_mb:.1f} MB")
-                print(f"   📉 Reducción: {reduction:.1f}%")
+        audio_path = Path(audio_path)
+        current_size_mb = audio_path.stat().st_size / (1024 * 1024)
 
-                if new_size_mb <= max_size_mb:
-                    return str(compressed_path)
-                else:
-                    print(f"⚠️ Aún demasiado grande, intentando más compresión...")
-                    # Intentar compresión más agresiva
-                    return self.compress_audio_aggressive(compressed_path, max_size_mb)
-            else:
-                print(f"❌ Error en compresión:")
-                if result.stderr:
-                    print(f"   {result.stderr[:200]}...")
-                return None
+        if current_size_mb <= max_size_mb:
+            self._log(f"✅ Audio ya es del tamaño adecuado: {current_size_mb:.1f} MB")
+            return CompressionResult(True, str(audio_path), str(audio_path), False,
+                                     current_size_mb, current_size_mb)
+
+        self._log(f"📦 Audio demasiado grande: {current_size_mb:.1f} MB")
+        self._log(f"🔄 Comprimiendo para reducir a ~{max_size_mb} MB...")
+
+        # Obtener duración del audio para planificar códec, bitrate y frecuencia de muestreo
+        with self._stage('probe', path=str(audio_path)) as span:
+            info = get_metadata_service().get(audio_path)
+            duration_seconds = info.duration if info else None
+            span['media_seconds'] = duration_seconds
+            span['source'] = info.source if info else None
+        if duration_seconds:
+            self._log(f"   📊 Duración: {duration_seconds / 60:.1f} minutos")
+        else:
+            self._log(f"   ⚠️ No se pudo calcular duración, usando bitrate conservador")
 
-        except Exception as e:
-            if 'stop_event' in locals():
-                stop_event.set()
-            if 'spinner_thread' in locals():
-                spinner_thread.join()
-            print(f"❌ Error comprimiendo audio: {str(e)}")
-            return None
+        plan = plan_compression(duration_seconds, max_size_mb, formats)
+        if plan is None:
+            self._log(f"❌ El audio es demasiado largo para caber en {max_size_mb} MB a una calidad inteligible")
+            return CompressionResult(False, str(audio_path), original_size_mb=current_size_mb,
+                                     error=f"No cabe en {max_size_mb} MB ni al bitrate mínimo")
 
-    def compress_audio_aggressive(self, audio_path, max_size_mb=45):
-        """
-        Compresión más agresiva para archivos muy grandes
-        """
-        audio_path = Path(audio_path)
-        aggressive_path = audio_path.with_stem(f"{audio_path.stem}_ultra")
+        self._log(f"   🎚️  Plan: {plan.codec} {plan.bitrate_kbps}k, {plan.sample_rate} Hz mono"
+                  + (f" (~{plan.expected_mb:.1f} MB)" if plan.expected_mb else ""))
 
-        print(f"🔥 Aplicando compresión ultra-agresiva...")
+        # Crear nombre para archivo comprimido (la extensión depende del códec)
+        compressed_path = audio_path.with_name(f"{audio_path.stem}_compressed{plan.extension}")
+        if not self._ensure_space(audio_path.parent, int((plan.expected_mb or max_size_mb) * 1024 * 1024),
+                                  'comprimir el audio'):
+            return CompressionResult(False, str(audio_path), original_size_mb=current_size_mb,
+                                     error="Espacio en disco insuficiente")
 
-        cmd = [
-            "ffmpeg",
-            "-i", str(audio_path),
-            "-acodec", "mp3",
-            "-ab", "32k",  # Bitrate muy bajo pero audible
-            "-ac", "1",  # Mono
-            "-ar", "11025",  # Sample rate muy bajo
-            "-af", "highpass=f=100,lowpass=f=3000",  # Filtrar frecuencias innecesarias
-            "-y",
-            str(aggressive_path)
-        ]
+        # Una sola codificación con el plan calculado
+        cmd = ["ffmpeg", "-i", str(audio_path), *plan.ffmpeg_args(), "-y", str(compressed_path)]
 
         try:
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            self._emit('spinner.start', "Comprimiendo audio")
+            try:
+                result = subprocess.run(cmd, capture_output=True, text=True)
+            finally:
+                self._emit('spinner.stop')
 
-            if result.returncode == 0 and aggressive_path.exists():
-                new_size_mb = aggressive_path.stat().st_size / (1024 * 1024)
+            if result.returncode == 0 and compressed_path.exists():
+                new_size_mb = compressed_path.stat().st_size / (1024 * 1024)
+                reduction = ((current_size_mb - new_size_mb) / current_size_mb) * 100
 
-                print(f"✅ Compresión ultra-agresiva completada:")
-                print(f"   📏 Tamaño final: {new_size_mb:.1f} MB")
+                self._log(f"✅ Audio comprimido exitosamente:")
+                self._log(f"   📏 Tamaño original: {current_size_mb:.1f} MB")
+                self._log(f"   📏 Tamaño nuevo: {new_size_mb:.1f} MB")
+                self._log(f"   📉 Reducción: {reduction:.1f}%")
 
                 if new_size_mb <= max_size_mb:
-                    print(f"   🎉 ¡Archivo listo para transcripción!")
-                    return str(aggressive_path)
-                else:
-                    print(f"   ❌ Aún demasiado grande para Replicate")
-                    return None
-            else:
-                print(f"❌ Falló la compresión agresiva")
-                return None
+                    return CompressionResult(True, str(audio_path), str(compressed_path), True,
+                                             current_size_mb, new_size_mb, plan.bitrate_kbps, codec=plan.codec)
+
+                compressed_path.unlink(missing_ok=True)
+                return CompressionResult(False, str(audio_path), compressed=True,
+                                         original_size_mb=current_size_mb, final_size_mb=new_size_mb,
+                                         bitrate_kbps=plan.bitrate_kbps, codec=plan.codec,
+                                         error="El audio sigue siendo demasiado grande tras comprimir")
+
+            self._log(f"❌ Error en compresión:")
+            if result.stderr:
+                self._log(f"   {result.stderr[:200]}...")
+            return CompressionResult(False, str(audio_path), original_size_mb=current_size_mb,
+                                     error=(result.stderr or '')[:200] or "ffmpeg no generó el archivo")
 
         except Exception as e:
-            print(f"❌ Error en compresión agresiva: {str(e)}")
-            return None
+            self._log(f"❌ Error comprimiendo audio: {str(e)}")
+            return CompressionResult(False, str(audio_path), original_size_mb=current_size_mb, error=str(e))
 
-    def poll_prediction_progress(self, prediction_id):
+    def compress_audio_for_transcription(self, audio_path, max_size_mb=45):
+        """
+        Comprime un archivo de audio si es demasiado grande para Replicate
+        """
+        result = self.compress_audio(audio_path, max_size_mb)
+        return result.output_path if result.ok else None
+
+    def poll_prediction_progress(self, prediction_id, on_output=None):
         """
-        Hace polling de la predicción mostrando progreso detallado
+        Hace polling de la predicción mostrando progreso detallado.
+        on_output: se llama con la salida parcial si la predicción la va rellenando mientras procesa
         """
-        print(f"\n🔄 MONITOREANDO PROGRESO DE TRANSCRIPCIÓN")
-        print("=" * 50)
-        print(f"🆔 Prediction ID: {prediction_id}")
+        self._log(f"\n🔄 MONITOREANDO PROGRESO DE TRANSCRIPCIÓN")
+        self._log("=" * 50)
+        self._log(f"🆔 Prediction ID: {prediction_id}")
+
+        import replicate
 
         start_time = time.time()
         last_log_lines = 0
@@ -593,13 +1173,15 @@ class VideoDownloader:
 
         while True:
             try:
-                # Obtener estado actual
-                prediction = replicate.predictions.get(prediction_id)
+                # Obtener estado actual (con reintentos acotados ante errores de red/API)
+                prediction = self.replicate_resilience.call(
+                    lambda: replicate.predictions.get(prediction_id), on_retry=self._log_retry)
                 current_time = time.time()
                 elapsed = current_time - start_time
 
-                print(f"\n⏰ Tiempo transcurrido: {elapsed / 60:.1f} minutos")
-                print(f"📊 Estado: {prediction.status}")
+                self._emit('transcription.status',
+                           f"\n⏰ Tiempo transcurrido: {elapsed / 60:.1f} minutos\n📊 Estado: {prediction.status}",
+                           prediction_id=prediction_id, status=prediction.status, elapsed=elapsed)
 
                 # Mostrar logs si hay nuevos
                 if prediction.logs:
@@ -607,7 +1189,7 @@ class VideoDownloader:
                     new_lines = log_lines[last_log_lines:]
 
                     if new_lines and any(line.strip() for line in new_lines):
-                        print("📝 Nuevos logs:")
+                        self._log("📝 Nuevos logs:")
                         for line in new_lines:
                             if line.strip():
                                 # Formatear líneas de progreso
@@ -618,198 +1200,455 @@ class VideoDownloader:
                                         if percent_start > 0:
                                             percent_part = line[:percent_start]
                                             percent_num = percent_part.split()[-1]
-                                            print(f"   📈 Progreso: {percent_num}% - {line.split(']')[-1].strip()}")
+                                            self._log(f"   📈 Progreso: {percent_num}% - {line.split(']')[-1].strip()}")
                                         else:
-                                            print(f"   📝 {line.strip()}")
+                                            self._log(f"   📝 {line.strip()}")
                                     except:
-                                        print(f"   📝 {line.strip()}")
+                                        self._log(f"   📝 {line.strip()}")
                                 else:
-                                    print(f"   📝 {line.strip()}")
+                                    self._log(f"   📝 {line.strip()}")
 
                     last_log_lines = len(log_lines)
 
                 # Verificar si terminó
                 if prediction.status == "succeeded":
                     total_time = (current_time - start_time) / 60
-                    print(f"\n🎉 ¡TRANSCRIPCIÓN COMPLETADA!")
-                    print(f"   ⏱️  Tiempo total: {total_time:.1f} minutos")
-                    print(f"   📊 Estado final: {prediction.status}")
+                    self._log(f"\n🎉 ¡TRANSCRIPCIÓN COMPLETADA!")
+                    self._log(f"   ⏱️  Tiempo total: {total_time:.1f} minutos")
+                    self._log(f"   📊 Estado final: {prediction.status}")
                     return prediction
 
                 elif prediction.status == "failed":
-                    print(f"\n❌ TRANSCRIPCIÓN FALLÓ")
-                    print(f"   📊 Estado: {prediction.status}")
+                    self._log(f"\n❌ TRANSCRIPCIÓN FALLÓ")
+                    self._log(f"   📊 Estado: {prediction.status}")
                     if prediction.error:
-                        print(f"   🚨 Error: {prediction.error}")
+                        self._log(f"   🚨 Error: {prediction.error}")
                     return prediction
 
                 elif prediction.status == "canceled":
-                    print(f"\n⚠️  TRANSCRIPCIÓN CANCELADA")
+                    self._log(f"\n⚠️  TRANSCRIPCIÓN CANCELADA")
                     return prediction
 
                 # Si sigue procesando, esperar antes del próximo check
                 elif prediction.status in ["starting", "processing"]:
-                    print(f"   🔄 Sigue procesando... próxima verificación en {check_interval}s")
+                    if on_output is not None and prediction.output:
+                        try:
+                            on_output(prediction.output)
+                        except Exception as e:
+                            self._log(f"   ⚠️ No se pudo guardar la transcripción parcial: {e}")
+                    self._log(f"   🔄 Sigue procesando... próxima verificación en {check_interval}s")
                     time.sleep(check_interval)
 
                 else:
-                    print(f"   ❓ Estado desconocido: {prediction.status}")
+                    self._log(f"   ❓ Estado desconocido: {prediction.status}")
                     time.sleep(check_interval)
 
             except KeyboardInterrupt:
-                print(f"\n⚠️  INTERRUMPIDO POR USUARIO")
-                print(f"   La transcripción sigue ejecutándose en: https://replicate.com/p/{prediction_id}")
-                print(f"   Puedes reanudar el monitoreo manualmente")
+                self._log(f"\n⚠️  INTERRUMPIDO POR USUARIO")
+                self._log(f"   La transcripción sigue ejecutándose en: https://replicate.com/p/{prediction_id}")
+                self._log(f"   Recoge el resultado más tarde con: python main.py reattach {prediction_id}")
                 return None
 
             except Exception as e:
-                print(f"\n❌ Error obteniendo estado: {str(e)}")
-                print(f"   Reintentando en {check_interval}s...")
-                time.sleep(check_interval)
+                self._log(f"\n❌ Error obteniendo estado: {str(e)}")
+                self._log(f"   La transcripción puede seguir ejecutándose en: https://replicate.com/p/{prediction_id}")
+                return None
 
-    def transcribe_audio_with_replicate(self, audio_path):
+    def transcribe_with_replicate(self, audio_path, output_base=None, backend=None, writer=None):
         """
-        Transcribe audio usando Replicate Whisper con POLLING (para archivos grandes)
+        Transcribe audio usando Replicate Whisper con POLLING. Devuelve un TranscriptionResult
+        (sin rutas de salida: la transcripción aún no se ha guardado).
+        Con output_base, la predicción queda pendiente en el registro hasta que el llamador
+        guarde el resultado; si se interrumpe, `reattach` lo guardará ahí.
+        writer: PartialTranscriptWriter que recibe los segmentos que la predicción vaya publicando
         """
+        with self._stage('transcribe', audio_path=str(audio_path)) as span, \
+                self.replicate_resilience.limiter.slot():
+            result = self._transcribe_with_replicate(audio_path, output_base, backend or ReplicateBackend(), writer)
+            span['ok'] = result.ok
+            span['bytes'] = self._file_size(audio_path)
+            span['prediction_id'] = result.prediction_id
+            return result
+
+    def _transcribe_with_replicate(self, audio_path, output_base, backend, writer=None):
         if not self.replicate_token:
-            print("❌ No se puede transcribir: falta REPLICATE_API_TOKEN en .env")
-            return None
+            self._log("❌ No se puede transcribir: falta REPLICATE_API_TOKEN en .env")
+            return TranscriptionResult(False, str(audio_path), error="Falta REPLICATE_API_TOKEN")
 
-        print(f"\n🎤 Transcribiendo audio: {Path(audio_path).name}")
+        self._log(f"\n🎤 Transcribiendo audio: {Path(audio_path).name}")
 
-        model_version = "8099696689d249cf8b122d833c36ac3f75505c666a395ca40ef26f68e7d3d16e"
+        model_version = backend.model_version
+        prediction_id = None
 
         try:
-            # Crear evento para detener spinner durante la subida
-            stop_event = threading.Event()
-
-            # Iniciar spinner para subida
-            spinner_thread = threading.Thread(
-                target=self.show_progress_spinner,
-                args=("Subiendo archivo de audio", stop_event)
-            )
-            spinner_thread.start()
-
-            with open(audio_path, "rb") as audio_file:
-                input_data = {
-                    "audio": audio_file,
-                    "model": "large-v3",  # Modelo más preciso
-                    "transcription": "srt",  # Formato SRT con timestamps
-                    "language": "auto",  # Detección automática de idioma
-                    "translate": False,  # No traducir, mantener idioma original
-                    "temperature": 0,  # Más determinístico
-                    "suppress_tokens": "-1",  # Tokens a suprimir
-                    "condition_on_previous_text": True,  # Usar contexto previo
-                    "compression_ratio_threshold": 2.4,
-                    "logprob_threshold": -1.0,
-                    "no_speech_threshold": 0.6,
-                    "temperature_increment_on_fallback": 0.2
-                }
+            import replicate
+
+            # Spinner durante la subida
+            self._emit('spinner.start', "Subiendo archivo de audio")
+
+            with ExitStack() as stack:
+                audio_input = self._upload_audio(audio_path)
+                if audio_input is None:
+                    audio_input = stack.enter_context(open(audio_path, "rb"))
+
+                input_data = backend.build_input(audio_input)
 
                 # Detener spinner de subida
-                stop_event.set()
-                spinner_thread.join()
+                self._emit('spinner.stop')
 
-                print(f"📤 Creando predicción para archivo grande...")
-                print(f"⏰ Inicio: {time.strftime('%H:%M:%S')}")
+                self._log(f"📤 Creando predicción para archivo grande...")
+                self._log(f"⏰ Inicio: {time.strftime('%H:%M:%S')}")
 
                 # ✅ USAR predictions.create EN LUGAR DE run() ✅
-                prediction = replicate.predictions.create(
-                    version=model_version,
-                    input=input_data
-                )
-
-                print(f"✅ Predicción creada exitosamente!")
-                print(f"   🆔 ID: {prediction.id}")
-                print(f"   📊 Estado inicial: {prediction.status}")
-                print(f"   🌐 URL: https://replicate.com/p/{prediction.id}")
+                # (sin URL previa, la subida del audio ocurre dentro de esta llamada)
+                uploading = not isinstance(audio_input, str)
+
+                def create_prediction():
+                    if uploading:
+                        audio_input.seek(0)  # cada reintento vuelve a enviar el archivo completo
+                    return replicate.predictions.create(version=model_version, input=input_data)
+
+                with self._stage('upload' if uploading else 'create',
+                                 bytes=self._file_size(audio_path) if uploading else None):
+                    prediction = self.replicate_resilience.call(create_prediction, on_retry=self._log_retry)
+                prediction_id = prediction.id
+                self._record_prediction(prediction_id, audio_path, output_base, model_version)
+
+                self._emit('transcription.created',
+                           f"✅ Predicción creada exitosamente!\n"
+                           f"   🆔 ID: {prediction.id}\n"
+                           f"   📊 Estado inicial: {prediction.status}\n"
+                           f"   🌐 URL: https://replicate.com/p/{prediction.id}",
+                           prediction_id=prediction.id, status=prediction.status)
 
                 # ✅ HACER POLLING EN LUGAR DE ESPERAR ✅
-                final_prediction = self.poll_prediction_progress(prediction.id)
+                final_prediction = self.poll_prediction_progress(
+                    prediction.id, on_output=writer.sync_output if writer is not None else None)
+
+                if final_prediction:
+                    self._emit_prediction_spans(final_prediction)
 
                 if final_prediction and final_prediction.status == "succeeded":
-                    print("✅ Transcripción completada")
-                    return final_prediction.output
-                else:
-                    print("❌ Transcripción falló o fue cancelada")
-                    return None
+                    self.replicate_resilience.limiter.on_success()
+                    if output_base is None:
+                        # El llamador se queda con la salida: nada pendiente de guardar
+                        self._update_prediction(prediction_id, 'done')
+                    self._log("✅ Transcripción completada")
+                    return TranscriptionResult(True, str(audio_path), final_prediction.output, prediction_id)
+
+                if final_prediction:
+                    self._update_prediction(prediction_id, final_prediction.status,
+                                            str(getattr(final_prediction, 'error', None) or '') or None)
+
+                self._log("❌ Transcripción falló o fue cancelada")
+                error = getattr(final_prediction, 'error', None) if final_prediction else "Interrumpida"
+                return TranscriptionResult(False, str(audio_path), prediction_id=prediction_id,
+                                           error=str(error or "Transcripción fallida o cancelada"))
 
         except Exception as e:
             # Asegurar que se detenga el spinner en caso de error
-            if 'stop_event' in locals():
-                stop_event.set()
-            if 'spinner_thread' in locals():
-                spinner_thread.join()
+            self._emit('spinner.stop')
 
-            print(f"❌ Error en transcripción: {str(e)}")
+            self._log(f"❌ Error en transcripción: {str(e)}")
 
             # Proporcionar ayuda específica según el tipo de error
-            if "authentication" in str(e).lower():
-                print("   💡 Verifica que tu REPLICATE_API_TOKEN sea correcto en el archivo .env")
-            elif "quota" in str(e).lower() or "billing" in str(e).lower():
-                print("   💡 Verifica tu saldo en Replicate o métodos de pago")
-            elif "network" in str(e).lower() or "connection" in str(e).lower():
-                print("   💡 Verifica tu conexión a internet")
+            from resilience import status_code, classify, CircuitOpenError, TRANSIENT
+            status = status_code(e)
+            if status in (401, 403) or "authentication" in str(e).lower():
+                self._log("   💡 Verifica que tu REPLICATE_API_TOKEN sea correcto en el archivo .env")
+            elif status == 402 or "quota" in str(e).lower() or "billing" in str(e).lower():
+                self._log("   💡 Verifica tu saldo en Replicate o métodos de pago")
+            elif isinstance(e, CircuitOpenError):
+                self._log("   💡 La API de Replicate está fallando de forma continuada; se pausan las llamadas")
+            elif status is None and classify(e) == TRANSIENT:
+                self._log("   💡 Verifica tu conexión a internet")
+
+            return TranscriptionResult(False, str(audio_path), prediction_id=prediction_id, error=str(e))
+
+    def _record_prediction(self, prediction_id, audio_path, output_base, model_version):
+        """Anota la predicción en cuanto existe: si el proceso muere, `reattach` puede recoger el resultado"""
+        try:
+            base = output_base if output_base is not None else Path(audio_path).with_suffix('')
+            self.prediction_store.record(prediction_id, audio_path, base, model_version)
+        except Exception as e:
+            self._log(f"⚠️  No se pudo registrar la predicción {prediction_id}: {e}")
 
-            return None
+    def _update_prediction(self, prediction_id, status, error=None):
+        if status not in ('done', 'failed', 'canceled'):
+            return
+        try:
+            self.prediction_store.update(prediction_id, status, error)
+        except Exception as e:
+            self._log(f"⚠️  No se pudo actualizar la predicción {prediction_id}: {e}")
 
-    def transcribe_audio_with_compression_check(self, audio_path, output_base):
+    def reattach_predictions(self, prediction_ids=None):
         """
-        Transcribe audio con verificación y compresión automática si es necesario
-        Esta función unifica la lógica para todas las opciones del script
+        Retoma las predicciones pendientes (o las indicadas): sigue el polling de las que
+        siguen en curso, recoge las terminadas y guarda la transcripción donde se esperaba.
+        Devuelve una lista de TranscriptionResult
         """
-        audio_path = Path(audio_path)
+        if prediction_ids:
+            entries = []
+            for prediction_id in prediction_ids:
+                entry = self.prediction_store.get(prediction_id)
+                if entry is None:
+                    # Predicción creada fuera de este registro: se guarda en el directorio actual
+                    entry = {'id': prediction_id, 'audio_path': '', 'output_base': prediction_id}
+                entries.append(entry)
+        else:
+            entries = self.prediction_store.outstanding()
+
+        if not entries:
+            self._log("✅ No hay predicciones pendientes")
+            return []
+
+        from partial import PartialTranscriptWriter, load_partial_segments, merge_resumed
+        from silence import OffsetMap, offsets_path
+
+        self._log(f"🔁 Retomando {len(entries)} predicción(es)...")
+        results = []
+        for entry in entries:
+            prediction_id = entry['id']
+            result = TranscriptionResult(False, entry['audio_path'], prediction_id=prediction_id)
+
+            prediction = self.poll_prediction_progress(prediction_id)
+            if prediction is None:
+                result.error = "Interrumpida o sin respuesta de la API"
+                results.append(result)
+                continue
+
+            self._emit_prediction_spans(prediction)
+            if prediction.status != "succeeded":
+                result.error = str(getattr(prediction, 'error', None) or prediction.status)
+                self._update_prediction(prediction_id, prediction.status, result.error)
+                results.append(result)
+                continue
+
+            # Si se transcribió un audio con silencios recortados, devolver los tiempos al original
+            offsets_file = offsets_path(entry['audio_path']) if entry['audio_path'] else None
+            offset_map = OffsetMap.load(offsets_file) if offsets_file else None
+            result.output = offset_map.remap_output(prediction.output) if offset_map else prediction.output
+
+            # Una predicción de una transcripción reanudada solo cubre el resto del audio:
+            # se le anteponen los segmentos guardados antes de la interrupción
+            segments = result.output.get('segments') if isinstance(result.output, dict) else None
+            if segments and isinstance(segments[0].get('start'), (int, float)):
+                resumed = load_partial_segments(entry['output_base'])
+                result.output = merge_resumed(result.output, resumed, segments[0]['start'])
+
+            saved = self.save_transcription_files(result.output, entry['output_base'])
+            if saved:
+                result.ok = True
+                result.srt_path, result.json_path, result.readable_paths = saved
+                PartialTranscriptWriter(entry['output_base']).discard()
+                self._update_prediction(prediction_id, 'done')
+                if offset_map:
+                    offsets_file.unlink(missing_ok=True)
+            else:
+                result.error = "No se pudo guardar la transcripción"
+            results.append(result)
 
-        if not audio_path.exists():
-            print(f"❌ Audio no encontrado: {audio_path}")
+        return results
+
+    def cancel_prediction(self, prediction_id):
+        """Cancela una predicción en Replicate (deja de consumir inferencia) y la marca en el registro"""
+        if not self.replicate_token:
+            self._log("❌ No se puede cancelar: falta REPLICATE_API_TOKEN en .env")
             return False
 
-        original_size_mb = audio_path.stat().st_size / (1024 * 1024)
-        max_size_replicate = 45  # MB
+        import replicate
 
-        print(f"📏 Tamaño del audio: {original_size_mb:.1f} MB")
+        try:
+            prediction = self.replicate_resilience.call(lambda: replicate.predictions.cancel(prediction_id),
+                                                        on_retry=self._log_retry)
+        except Exception as e:
+            self._log(f"❌ No se pudo cancelar {prediction_id}: {e}")
+            return False
 
-        # Verificar si necesita compresión
-        audio_to_transcribe = audio_path
-        compressed_file = None
+        status = getattr(prediction, 'status', None) or 'canceled'
+        if status in ('succeeded', 'failed'):
+            # Ya había terminado: el resultado sigue disponible para reattach
+            self._log(f"ℹ️  La predicción {prediction_id} ya había terminado ({status})")
+            return True
 
-        if original_size_mb > max_size_replicate:
-            print(f"\n⚠️ AUDIO DEMASIADO GRANDE PARA REPLICATE")
-            print(f"   Límite: ~{max_size_replicate} MB")
-            print(f"   Archivo actual: {original_size_mb:.1f} MB")
-            print(f"🔄 Comprimiendo automáticamente...")
+        self._update_prediction(prediction_id, 'canceled')
+        self._log(f"🛑 Predicción {prediction_id} cancelada")
+        return True
 
-            compressed_audio = self.compress_audio_for_transcription(audio_path, max_size_replicate)
+    def _emit_prediction_spans(self, prediction):
+        """
+        Separa el tiempo en cola de Replicate (created → started) del de inferencia (started → completed)
+        """
+        def parse(value):
+            if not value:
+                return None
+            try:
+                return datetime.fromisoformat(str(value).replace('Z', '+00:00')).timestamp()
+            except ValueError:
+                return None
 
-            if compressed_audio:
-                audio_to_transcribe = Path(compressed_audio)
-                compressed_file = audio_to_transcribe  # Para limpiar después
-                print(f"✅ Usando archivo comprimido para transcripción")
-            else:
-                print(f"❌ No se pudo comprimir el archivo lo suficiente")
-                print(f"💡 El video se descargó correctamente, pero no se pudo transcribir")
-                print(f"   Puedes intentar comprimir manualmente el audio a < {max_size_replicate} MB")
-                return False
+        created = parse(getattr(prediction, 'created_at', None))
+        started = parse(getattr(prediction, 'started_at', None))
+        completed = parse(getattr(prediction, 'completed_at', None))
 
-        # Transcribir usando Replicate
-        transcription = self.transcribe_audio_with_replicate(audio_to_transcribe)
+        if created and started:
+            self._emit_span('queue', started - created, created, prediction_id=prediction.id)
+        if started and completed:
+            predict_time = (getattr(prediction, 'metrics', None) or {}).get('predict_time')
+            self._emit_span('inference', completed - started, started, prediction_id=prediction.id,
+                            predict_time=predict_time, ok=prediction.status == "succeeded")
 
-        # Limpiar archivo comprimido temporal si se creó
-        if compressed_file and compressed_file != audio_path and compressed_file.exists():
-            try:
-                compressed_file.unlink()
-                print(f"🗑️ Archivo temporal comprimido eliminado")
-            except:
-                pass
+    def transcribe_audio_with_replicate(self, audio_path):
+        """
+        Transcribe audio usando Replicate Whisper con POLLING (para archivos grandes)
+        """
+        result = self.transcribe_with_replicate(audio_path)
+        return result.output if result.ok else None
+
+    def transcribe(self, audio_path, output_base):
+        """
+        Transcribe audio con verificación y compresión automática si es necesario,
+        guarda la transcripción y devuelve un TranscriptionResult con las rutas generadas
+        """
+        audio_path = Path(audio_path)
+
+        if not audio_path.exists():
+            self._log(f"❌ Audio no encontrado: {audio_path}")
+            return TranscriptionResult(False, str(audio_path), error="Audio no encontrado")
+
+        # Recorte y compresión escriben copias del audio de como mucho su tamaño
+        if not self._ensure_space(audio_path.parent, self._file_size(audio_path) or 0, 'transcribir'):
+            return TranscriptionResult(False, str(audio_path), error="Espacio en disco insuficiente")
+
+        # Los artefactos se identifican por nombre base: se usa el de la transcripción
+        transcript_path = f"{Path(output_base).with_suffix('')}_transcription.json"
+        with self._storage_pinned(audio_path, transcript_path):
+            result = self._transcribe(audio_path, output_base)
+        if result.ok:
+            self._storage_after('transcript', audio_path, transcript_path)
+        return result
+
+    def _transcribe(self, audio_path, output_base):
+        from partial import PartialTranscriptWriter, load_partial_segments, merge_resumed
+        from silence import offsets_path
+
+        backend = self.transcription_backend
+        audio_to_transcribe = audio_path
+        # Audios intermedios (resto, compactado, comprimido) que se eliminan al terminar
+        temporary_files = []
+
+        # Reanudar una transcripción interrumpida: lo ya guardado en .partial.jsonl no se repite
+        resumed, resume_at, offset_map = [], 0.0, None
+        recovered = load_partial_segments(output_base)
+        tail = self._audio_tail(audio_path, recovered[-1]['end']) if recovered else None
+        if tail:
+            audio_to_transcribe, offset_map = tail
+            resumed, resume_at = recovered, recovered[-1]['end']
+            temporary_files.append(audio_to_transcribe)
+            self._log(f"⏩ Reanudando tras {len(resumed)} segmento(s) ya transcritos "
+                      f"(desde {seconds_to_srt_time(resume_at)})")
+
+        # Recortar silencios (opcional): menos audio que subir y que transcribir
+        trimmed = self.trim_silence(audio_to_transcribe)
+        if trimmed:
+            audio_to_transcribe, offset_map = trimmed
+            temporary_files.append(audio_to_transcribe)
+            if resumed:
+                offset_map = offset_map.shifted(resume_at)
+        if resumed:
+            offset_map.save(offsets_path(audio_to_transcribe))
+
+        original_size_mb = audio_to_transcribe.stat().st_size / (1024 * 1024)
+        max_size_replicate = backend.max_size_mb  # MB (None: el backend no tiene límite)
+
+        self._log(f"📏 Tamaño del audio: {original_size_mb:.1f} MB")
 
-        if transcription:
+        # Verificar si necesita compresión
+
+        if max_size_replicate and original_size_mb > max_size_replicate:
+            self._log(f"\n⚠️ AUDIO DEMASIADO GRANDE PARA {backend.name.upper()}")
+            self._log(f"   Límite: ~{max_size_replicate} MB")
+            self._log(f"   Archivo actual: {original_size_mb:.1f} MB")
+            self._log(f"🔄 Comprimiendo automáticamente...")
+
+            compression = self.compress_audio(audio_to_transcribe, max_size_replicate,
+                                              backend.compression_formats)
+
+            if compression.ok:
+                compressed_file = Path(compression.output_path)
+                if compressed_file != audio_path and compressed_file not in temporary_files:
+                    temporary_files.append(compressed_file)
+                    if offset_map is not None:
+                        offset_map.save(offsets_path(compressed_file))
+                audio_to_transcribe = compressed_file
+                self._log(f"✅ Usando archivo comprimido para transcripción")
+            else:
+                self._log(f"❌ No se pudo comprimir el archivo lo suficiente")
+                self._log(f"💡 El video se descargó correctamente, pero no se pudo transcribir")
+                self._log(f"   Puedes intentar comprimir manualmente el audio a < {max_size_replicate} MB")
+                self._remove_temporary(temporary_files, keep_offsets=False)
+                return TranscriptionResult(False, str(audio_path), error=compression.error)
+
+        # Transcribir con el backend configurado (Replicate o local); los segmentos que vayan
+        # llegando se guardan en archivos .partial para poder leerlos antes de que termine
+        writer = PartialTranscriptWriter(output_base, offset_map)
+        try:
+            writer.restore(resumed)
+            result = backend.transcribe(self, audio_to_transcribe, output_base, writer)
+        finally:
+            writer.close()
+        result.audio_path = str(audio_path)
+
+        # Los mapas de desplazamiento se conservan si el resultado sigue pendiente (para reattach)
+        self._remove_temporary(temporary_files, keep_offsets=not result.ok and result.prediction_id is not None)
+
+        if result.ok and result.output and offset_map is not None:
+            # Timestamps del audio compactado → línea temporal del audio original
+            result.output = offset_map.remap_output(result.output)
+        if result.ok and result.output and resumed:
+            result.output = merge_resumed(result.output, resumed, resume_at)
+
+        if result.ok and result.output:
             # Guardar transcripción usando el nombre base original
-            if self.save_transcription(transcription, output_base):
-                print(f"✅ Transcripción completada para: {audio_path.name}")
-                return True
+            saved = self.save_transcription_files(result.output, output_base)
+            if saved:
+                result.srt_path, result.json_path, result.readable_paths = saved
+                writer.discard()
+                # Solo las transcripciones de Replicate tienen predicción registrada (no las locales)
+                if result.prediction_id:
+                    self._update_prediction(result.prediction_id, 'done')
+                self._emit('transcription.saved', f"✅ Transcripción completada para: {audio_path.name}",
+                           audio_path=str(audio_path), srt_path=result.srt_path)
+                return result
+            result.error = "No se pudo guardar la transcripción"
+        elif result.ok:
+            result.error = "La transcripción llegó vacía"
+
+        self._log(f"❌ Falló la transcripción de: {audio_path.name}")
+        if writer.count:
+            self._log(f"   💾 {writer.count} segmento(s) ya transcritos en: {writer.paths['srt'].name}")
+        result.ok = False
+        return result
+
+    def _remove_temporary(self, paths, keep_offsets=False):
+        """Elimina audios intermedios (compactado, comprimido) y, salvo keep_offsets, sus mapas"""
+        from silence import offsets_path
+
+        for path in paths:
+            for candidate in ([path] if keep_offsets else [path, offsets_path(path)]):
+                try:
+                    Path(candidate).unlink()
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    self._log(f"⚠️  No se pudo eliminar {Path(candidate).name}: {e}")
 
-        print(f"❌ Falló la transcripción de: {audio_path.name}")
-        return False
+    def transcribe_audio_with_compression_check(self, audio_path, output_base):
+        """
+        Transcribe audio con verificación y compresión automática si es necesario
+        Esta función unifica la lógica para todas las opciones del script
+        """
+        return self.transcribe(audio_path, output_base).ok
 
     def transcribe_audio_file(self, audio_path, output_dir=None):
         """
@@ -819,23 +1658,22 @@ class VideoDownloader:
         audio_path = Path(audio_path)
 
         if not audio_path.exists():
-            print(f"❌ Archivo de audio no encontrado: {audio_path}")
+            self._log(f"❌ Archivo de audio no encontrado: {audio_path}")
             return False
 
         # Verificar que sea un archivo de audio válido
         valid_extensions = ['.mp3', '.wav', '.m4a', '.aac', '.ogg', '.flac']
         if audio_path.suffix.lower() not in valid_extensions:
-            print(f"❌ Formato de audio no válido: {audio_path.suffix}")
-            print(f"   Formatos soportados: {', '.join(valid_extensions)}")
+            self._log(f"❌ Formato de audio no válido: {audio_path.suffix}")
+            self._log(f"   Formatos soportados: {', '.join(valid_extensions)}")
             return False
 
-        print(f"\n🎤 TRANSCRIBIENDO ARCHIVO DE AUDIO")
-        print("=" * 50)
-        print(f"📁 Archivo: {audio_path.name}")
+        self._log(f"\n🎤 TRANSCRIBIENDO ARCHIVO DE AUDIO")
+        self._log("=" * 50)
+        self._log(f"📁 Archivo: {audio_path.name}")
 
-        # Verificar Replicate API
-        if not self.replicate_token:
-            print("❌ No se puede transcribir: falta REPLICATE_API_TOKEN en .env")
+        # Verificar el backend de transcripción (token de Replicate o faster-whisper instalado)
+        if not self._backend_ready():
             return False
 
         # Definir directorio de salida
@@ -850,21 +1688,27 @@ class VideoDownloader:
         success = self.transcribe_audio_with_compression_check(audio_path, output_base)
 
         if success:
-            print(f"\n✅ TRANSCRIPCIÓN COMPLETADA")
-            print(f"   📝 Transcripción SRT: {output_base}_transcription.srt")
-            print(f"   📋 Metadatos JSON: {output_base}_transcription.json")
-            print(f"   📖 Formatos legibles: {output_base}_*.txt")
+            self._log(f"\n✅ TRANSCRIPCIÓN COMPLETADA")
+            self._log(f"   📝 Transcripción SRT: {output_base}_transcription.srt")
+            self._log(f"   📋 Metadatos JSON: {output_base}_transcription.json")
+            self._log(f"   📖 Formatos legibles: {output_base}_*.txt")
             return True
 
-        print("❌ Falló la transcripción del audio")
+        self._log("❌ Falló la transcripción del audio")
         return False
 
     def save_transcription(self, transcription_data, output_path):
         """
         Guarda la transcripción en diferentes formatos y genera versiones legibles
         """
+        return self.save_transcription_files(transcription_data, output_path) is not None
+
+    def save_transcription_files(self, transcription_data, output_path):
+        """
+        Igual que save_transcription, pero devuelve (srt_path, json_path, rutas_legibles) o None
+        """
         if not transcription_data:
-            return False
+            return None
 
         base_path = Path(output_path).with_suffix('')
 
@@ -882,24 +1726,36 @@ class VideoDownloader:
             with open(json_path, 'w', encoding='utf-8') as f:
                 json.dump(transcription_data, f, ensure_ascii=False, indent=2)
 
-            print(f"📄 Transcripción guardada:")
-            print(f"   🎬 SRT: {Path(srt_path).name}")
-            print(f"   📋 JSON: {Path(json_path).name}")
+            self._log(f"📄 Transcripción guardada:")
+            self._log(f"   🎬 SRT: {Path(srt_path).name}")
+            self._log(f"   📋 JSON: {Path(json_path).name}")
+
+            # Copia columnar (mmap, consultas por rango de tiempo sin parsear el JSON)
+            try:
+                from compact import compact_path, write_compact
+                bin_path = compact_path(base_path)
+                write_compact(bin_path, transcription_data)
+                self._log(f"   🗜️  Compacta: {bin_path.name}")
+            except Exception as e:
+                self._log(f"   ⚠️ No se pudo generar la versión compacta: {e}")
 
             # NUEVA FUNCIONALIDAD: Generar formatos legibles automáticamente
-            self.generate_readable_formats(transcription_data, base_path)
+            with self._stage('format', path=str(base_path)) as span:
+                readable_paths = self.generate_readable_formats(transcription_data, base_path)
+                span['bytes'] = sum(self._file_size(path) or 0 for path in readable_paths)
 
-            return True
+            return srt_path, json_path, [str(path) for path in readable_paths]
 
         except Exception as e:
-            print(f"❌ Error guardando transcripción: {str(e)}")
-            return False
+            self._log(f"❌ Error guardando transcripción: {str(e)}")
+            return None
 
     def generate_readable_formats(self, transcription_data, base_path):
         """
         Genera formatos legibles de la transcripción usando el formateador integrado
+        Devuelve la lista de archivos generados (vacía si no se pudo formatear)
         """
-        print(f"\n🔄 GENERANDO FORMATOS LEGIBLES...")
+        self._log(f"\n🔄 GENERANDO FORMATOS LEGIBLES...")
 
         try:
             # Extraer contenido SRT de los datos de transcripción
@@ -931,18 +1787,20 @@ class VideoDownloader:
                     srt_content = '\n'.join(srt_lines)
 
             if not srt_content:
-                print("⚠️ No se pudo extraer contenido SRT para formatear")
-                return False
+                self._log("⚠️ No se pudo extraer contenido SRT para formatear")
+                return []
 
             # Procesar con el formateador
             formatter = TranscriptionFormatter()
             segments_count = formatter.parse_srt_content(srt_content)
+            if isinstance(transcription_data, dict):
+                formatter.language = transcription_data.get('detected_language')
 
             if segments_count == 0:
-                print("⚠️ No se pudieron procesar segmentos para formatear")
-                return False
+                self._log("⚠️ No se pudieron procesar segmentos para formatear")
+                return []
 
-            print(f"✅ Procesados {segments_count} segmentos")
+            self._log(f"✅ Procesados {segments_count} segmentos")
 
             # Generar formatos
             base_name = Path(base_path).name
@@ -962,23 +1820,23 @@ class VideoDownloader:
                     method(output_path)
                     if output_path.exists() and output_path.stat().st_size > 500:
                         size_kb = output_path.stat().st_size / 1024
-                        print(f"   ✅ {description}: {output_path.name} ({size_kb:.1f} KB)")
+                        self._log(f"   ✅ {description}: {output_path.name} ({size_kb:.1f} KB)")
                         generated_files.append(output_path)
                     else:
-                        print(f"   ⚠️ {format_name}: Archivo muy pequeño o vacío")
+                        self._log(f"   ⚠️ {format_name}: Archivo muy pequeño o vacío")
                 except Exception as e:
-                    print(f"   ❌ Error en {format_name}: {str(e)}")
+                    self._log(f"   ❌ Error en {format_name}: {str(e)}")
 
             if generated_files:
-                print(f"🎉 Generados {len(generated_files)} formatos legibles adicionales!")
-                print(f"⏱️ Duración total: {formatter.seconds_to_readable(formatter.total_duration)}")
+                self._log(f"🎉 Generados {len(generated_files)} formatos legibles adicionales!")
+                self._log(f"⏱️ Duración total: {formatter.seconds_to_readable(formatter.total_duration)}")
 
-            return len(generated_files) > 0
+            return generated_files
 
         except Exception as e:
-            print(f"⚠️ Error generando formatos legibles: {str(e)}")
-            print("   La transcripción básica sigue disponible")
-            return False
+            self._log(f"⚠️ Error generando formatos legibles: {str(e)}")
+            self._log("   La transcripción básica sigue disponible")
+            return []
 
     def process_downloaded_video(self, video_path, extract_audio=True, transcribe=True):
         """
@@ -988,10 +1846,10 @@ class VideoDownloader:
         video_path = Path(video_path)
 
         if not video_path.exists():
-            print(f"❌ Video no encontrado: {video_path}")
+            self._log(f"❌ Video no encontrado: {video_path}")
             return False
 
-        print(f"\n🔄 Procesando video: {video_path.name}")
+        self._log(f"\n🔄 Procesando video: {video_path.name}")
 
         results = {
             'video_path': str(video_path),
@@ -1005,17 +1863,18 @@ class VideoDownloader:
         if extract_audio:
             audio_path = video_path.with_suffix('.mp3')
 
-            if self.extract_audio_from_video(video_path, audio_path):
+            extraction = self.extract_audio(video_path, audio_path)
+            if extraction.ok:
                 results['audio_extracted'] = True
-                results['audio_path'] = str(audio_path)
+                results['audio_path'] = extraction.audio_path
 
                 # ✨ NUEVA LÓGICA: Transcribir con compresión automática si es necesario ✨
-                if transcribe and self.replicate_token:
-                    success = self.transcribe_audio_with_compression_check(audio_path, video_path.with_suffix(''))
+                if transcribe and self._backend_ready():
+                    transcription = self.transcribe(audio_path, video_path.with_suffix(''))
 
-                    if success:
+                    if transcription.ok:
                         results['transcribed'] = True
-                        results['transcription_path'] = f"{video_path.with_suffix('')}_transcription.srt"
+                        results['transcription_path'] = transcription.srt_path
 
         return results
 
@@ -1025,41 +1884,45 @@ class VideoDownloader:
         """
         found_videos = []
 
-        print(f"🔍 Analizando texto de {len(text)} caracteres...")
+        self._log(f"🔍 Analizando texto de {len(text)} caracteres...")
 
         # === BUSCAR VIDEOS DE VIMEO ===
-        print("\n🎬 Buscando videos de VIMEO...")
-        found_vimeo_urls = set()
-        found_vimeo_ids = set()
+        self._log("\n🎬 Buscando videos de VIMEO...")
+        found_vimeo_urls = {}
+        found_vimeo_ids = {}
 
         for i, pattern in enumerate(self.vimeo_patterns):
             matches = re.findall(pattern, text, re.IGNORECASE)
-            print(f"   Patrón Vimeo {i + 1}: {len(matches)} coincidencias")
+            self._log(f"   Patrón Vimeo {i + 1}: {len(matches)} coincidencias")
 
             for match in matches:
                 if match.startswith('http'):
-                    found_vimeo_urls.add(match)
+                    found_vimeo_urls[match] = None
                 elif match.isdigit() and len(match) >= 8:
-                    found_vimeo_ids.add(match)
+                    found_vimeo_ids[match] = None
 
-        # Procesar URLs de Vimeo
+        # Procesar URLs de Vimeo: las distintas formas de un mismo video (player, vimeo.com/ID/HASH,
+        # con o sin parámetros) se agrupan por su clave canónica, prefiriendo la que trae el hash
+        canonical_vimeo = {}
         for raw_url in found_vimeo_urls:
-            video_id_match = re.search(r'/video/(\d+)', raw_url)
-            if video_id_match:
-                video_id = video_id_match.group(1)
-                clean_url = self.clean_video_url(raw_url, 'vimeo')
-
-                found_videos.append({
-                    'platform': 'vimeo',
-                    'original': raw_url,
-                    'clean': clean_url,
-                    'video_id': video_id,
-                    'source': 'URL completa'
-                })
+            canonical = canonical_video_url(raw_url, 'vimeo')
+            if canonical.video_id:
+                current = canonical_vimeo.get(canonical.key)
+                if prefer(current and current[1], canonical) is canonical:
+                    canonical_vimeo[canonical.key] = (raw_url, canonical)
+
+        for raw_url, canonical in canonical_vimeo.values():
+            found_videos.append({
+                'platform': 'vimeo',
+                'original': raw_url,
+                'clean': canonical.url,
+                'video_id': canonical.video_id,
+                'source': 'URL completa'
+            })
 
         # Procesar IDs sueltos de Vimeo
         for video_id in found_vimeo_ids:
-            if not any(v['video_id'] == video_id and v['platform'] == 'vimeo' for v in found_videos):
+            if ('vimeo', video_id) not in canonical_vimeo:
                 clean_url = f"https://player.vimeo.com/video/{video_id}"
 
                 found_videos.append({
@@ -1071,38 +1934,39 @@ class VideoDownloader:
                 })
 
         # === BUSCAR VIDEOS DE LOOM ===
-        print("\n📹 Buscando videos de LOOM...")
-        found_loom_urls = set()
-        found_loom_ids = set()
+        self._log("\n📹 Buscando videos de LOOM...")
+        found_loom_urls = {}
+        found_loom_ids = {}
 
         for i, pattern in enumerate(self.loom_patterns):
             matches = re.findall(pattern, text, re.IGNORECASE)
-            print(f"   Patrón Loom {i + 1}: {len(matches)} coincidencias")
+            self._log(f"   Patrón Loom {i + 1}: {len(matches)} coincidencias")
 
             for match in matches:
                 if match.startswith('http'):
-                    found_loom_urls.add(match)
+                    found_loom_urls[match] = None
                 elif re.match(r'^[a-f0-9]{32}$', match):  # ID de Loom (32 hex chars)
-                    found_loom_ids.add(match)
+                    found_loom_ids[match] = None
 
-        # Procesar URLs de Loom
+        # Procesar URLs de Loom (embed/share del mismo video con distintos parámetros → una sola)
+        canonical_loom = {}
         for raw_url in found_loom_urls:
-            loom_id_match = re.search(r'/(?:embed|share)/([a-f0-9]{32})', raw_url)
-            if loom_id_match:
-                loom_id = loom_id_match.group(1)
-                clean_url = self.clean_video_url(raw_url, 'loom')
-
-                found_videos.append({
-                    'platform': 'loom',
-                    'original': raw_url,
-                    'clean': clean_url,
-                    'video_id': loom_id,
-                    'source': 'URL completa'
-                })
+            canonical = canonical_video_url(raw_url, 'loom')
+            if canonical.video_id and canonical.key not in canonical_loom:
+                canonical_loom[canonical.key] = (raw_url, canonical)
+
+        for raw_url, canonical in canonical_loom.values():
+            found_videos.append({
+                'platform': 'loom',
+                'original': raw_url,
+                'clean': canonical.url,
+                'video_id': canonical.video_id,
+                'source': 'URL completa'
+            })
 
         # Procesar IDs sueltos de Loom
         for loom_id in found_loom_ids:
-            if not any(v['video_id'] == loom_id and v['platform'] == 'loom' for v in found_videos):
+            if ('loom', loom_id) not in canonical_loom:
                 clean_url = f"https://www.loom.com/embed/{loom_id}"
 
                 found_videos.append({
@@ -1115,6 +1979,34 @@ class VideoDownloader:
 
         return found_videos
 
+    def extract_video_urls_from_capture(self, file_path):
+        """
+        Extrae los videos de una captura de red (HAR o log exportado) con el mismo formato que
+        extract_video_urls_from_text, más 'referer' (la página que cargó el embed) si se conoce
+        """
+        from capture import harvest_capture
+
+        self._log(f"🛰️  Analizando captura de red: {Path(file_path).name}")
+        with self._stage('harvest_capture', path=str(file_path)) as span:
+            text, pages = harvest_capture(file_path, self.vimeo_patterns, self.loom_patterns)
+            span['bytes'] = self._file_size(file_path)
+        # Un mismo video puede aparecer con y sin hash: extract_video_urls_from_text ya agrupa
+        # por clave canónica y conserva la forma con hash
+        videos = self.extract_video_urls_from_text(text)
+        for video in videos:
+            video['source'] = f"Captura de red ({video['source']})"
+            if pages.get(video['video_id']):
+                video['referer'] = pages[video['video_id']]
+        return videos
+
+    def extract_videos_from_file(self, file_path):
+        """Videos de un HTML/TXT guardado o de una captura de red (HAR/log), según el archivo"""
+        from capture import is_network_capture
+
+        if is_network_capture(file_path):
+            return self.extract_video_urls_from_capture(file_path)
+        return self.extract_video_urls_from_text(self.read_html_file(file_path))
+
     def read_html_file(self, file_path):
         """
         Lee un archivo HTML/TXT
@@ -1130,137 +2022,179 @@ class VideoDownloader:
     def download_with_ytdlp(self, url, platform, output_dir="./downloads", referer=None):
         """
         Descarga el video usando yt-dlp según la plataforma con progreso visible
+        Devuelve la ruta del video, True si no se localizó el archivo o False si falló
         """
-        # Crear directorio de descarga si no existe
-        Path(output_dir).mkdir(exist_ok=True)
+        result = self.download(url, platform, output_dir, referer)
+        if not result.ok:
+            return False
+        return result.video_path or True
 
-        # Crear subdirectorio por plataforma
-        platform_dir = Path(output_dir) / platform
-        platform_dir.mkdir(exist_ok=True)
+    def download(self, url, platform, output_dir="./downloads", referer=None):
+        """
+        Descarga el video usando yt-dlp según la plataforma. Devuelve un DownloadResult
+        """
+        with self._stage('download', url=url, platform=platform) as span:
+            result = self._download(url, platform, output_dir, referer)
+            span['ok'] = result.ok
+            span['bytes'] = self._file_size(result.video_path)
+            span['media_seconds'] = self._media_duration(result.video_path)
+            return result
+
+    def _download(self, url, platform, output_dir, referer):
+        from ytdlp import DownloadJob, YtDlpSupervisor, build_command
+
+        platform_dir = self._platform_dir(output_dir, platform, url)
+        cmd = build_command(url, platform, platform_dir, referer)
+        if not self._ensure_space(platform_dir, stage='descargar'):
+            return DownloadResult(False, url, platform, error="Espacio en disco insuficiente")
+
+        self._log(f"🔄 Iniciando descarga de {platform.upper()}")
+        self._log(f"🔗 URL: {url}")
+        self._log(f"📁 Directorio: {platform_dir}")
+        self._log("⏳ Descargando...")
+        self._log("-" * 50)
 
-        # Construir comando base con progreso visible
-        cmd = [
-            "yt-dlp",
-            url,
-            "-o", f"{platform_dir}/%(title)s.%(ext)s",
-            "--write-description",
-            "--write-info-json",
-            "--progress",  # Mostrar progreso
-            "--no-warnings",  # Reducir ruido
-            "--console-title"  # Actualizar título de consola
-        ]
+        try:
+            job = DownloadJob(url, platform, cmd)
+            YtDlpSupervisor(1, on_event=self._on_ytdlp_line).run([job])
+        except Exception as e:
+            self._log(f"❌ Error inesperado durante la descarga: {str(e)}")
+            return DownloadResult(False, url, platform, error=str(e))
 
-        # Configuraciones específicas por plataforma
-        if platform == 'loom':
-            # Loom a veces necesita configuraciones especiales
-            cmd.extend([
-                "--user-agent",
-                "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-            ])
+        self._log("-" * 50)
 
-        # Añadir referer si se proporciona
-        if referer:
-            cmd.extend(["--referer", referer])
+        if job.returncode is None:
+            self._log("❌ Error: yt-dlp no está instalado o no está en el PATH")
+            self._log("Instálalo con: pip install yt-dlp")
+            return DownloadResult(False, url, platform, error=job.error)
 
-        print(f"🔄 Iniciando descarga de {platform.upper()}")
-        print(f"🔗 URL: {url}")
-        print(f"📁 Directorio: {platform_dir}")
-        print("⏳ Descargando...")
-        print("-" * 50)
+        if job.ok:
+            self._log("✅ Descarga completada exitosamente")
+            # Con una sola descarga en curso, el archivo más reciente sirve de respaldo
+            video_path = self._downloaded_path(job, platform_dir, allow_latest=True)
+            if video_path:
+                self._emit('download.finished', f"📁 Archivo guardado: {Path(video_path).name}",
+                           url=url, platform=platform, video_path=video_path)
+            return DownloadResult(True, url, platform, video_path, job.returncode)
 
-        try:
-            # Ejecutar con salida en tiempo real
-            process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
-                                       text=True, universal_newlines=True, bufsize=1)
-
-            # Mostrar progreso en tiempo real
-            while True:
-                output = process.stdout.readline()
-                if output == '' and process.poll() is not None:
-                    break
-                if output:
-                    line = output.strip()
-
-                    # Filtrar y mostrar líneas de progreso importantes
-                    if any(keyword in line.lower() for keyword in [
-                        'downloading', 'progress', '%', 'eta', 'speed',
-                        'fragment', 'merging', 'writing', 'completed'
-                    ]):
-                        # Limpiar y formatear la línea de progreso
-                        if '[download]' in line:
-                            # Extraer información de progreso
-                            if '%' in line and 'ETA' in line:
-                                # Línea típica: [download] 45.2% of 123.45MiB at 1.23MiB/s ETA 00:32
-                                parts = line.split()
-                                percentage = next((p for p in parts if '%' in p), 'N/A')
-                                size_info = ''
-                                speed_info = ''
-                                eta_info = ''
-
-                                for i, part in enumerate(parts):
-                                    if 'of' in part and i + 1 < len(parts):
-                                        size_info = f" ({parts[i + 1]})"
-                                    elif 'at' in part and i + 1 < len(parts):
-                                        speed_info = f" | Velocidad: {parts[i + 1]}"
-                                    elif 'ETA' in part and i + 1 < len(parts):
-                                        eta_info = f" | ETA: {parts[i + 1]}"
-
-                                print(f"📥 Progreso: {percentage}{size_info}{speed_info}{eta_info}")
-                            else:
-                                # Otras líneas de descarga importantes
-                                if 'downloading' in line.lower():
-                                    print(f"📥 {line.replace('[download]', '').strip()}")
-
-                        elif any(word in line.lower() for word in ['merging', 'writing']):
-                            print(f"🔄 {line}")
-
-                        elif 'completed' in line.lower():
-                            print(f"✅ {line}")
-
-            # Esperar a que termine
-            return_code = process.poll()
-
-            print("-" * 50)
-
-            if return_code == 0:
-                print("✅ Descarga completada exitosamente")
-
-                # Buscar el archivo descargado más reciente
-                video_files = []
-                for ext in ['*.mp4', '*.webm', '*.mkv', '*.avi', '*.mov']:
-                    video_files.extend(platform_dir.glob(ext))
-
-                if video_files:
-                    # Ordenar por fecha de modificación (más reciente primero)
-                    latest_video = max(video_files, key=lambda x: x.stat().st_mtime)
-                    print(f"📁 Archivo guardado: {latest_video.name}")
-                    return str(latest_video)
-
-                return True
-            else:
-                print(f"❌ Error en la descarga (código: {return_code})")
+        self._log(f"❌ Error en la descarga (código: {job.returncode})")
 
-                # Si falla Loom, intentar con la URL de share
-                if platform == 'loom' and '/embed/' in url:
-                    print("🔄 Intentando con URL de share de Loom...")
-                    share_url = url.replace('/embed/', '/share/')
-                    return self.download_with_ytdlp(share_url, platform, output_dir, referer)
+        # Si falla Loom, intentar con la URL de share
+        if platform == 'loom' and '/embed/' in url:
+            self._log("🔄 Intentando con URL de share de Loom...")
+            share_url = url.replace('/embed/', '/share/')
+            return self._download(share_url, platform, output_dir, referer)
 
-                return False
+        return DownloadResult(False, url, platform, return_code=job.returncode, error=job.error)
 
-        except FileNotFoundError:
-            print("❌ Error: yt-dlp no está instalado o no está en el PATH")
-            print("Instálalo con: pip install yt-dlp")
-            return False
-        except Exception as e:
-            print(f"❌ Error inesperado durante la descarga: {str(e)}")
-            return False
+    def _platform_dir(self, output_dir, platform, url=None):
+        """
+        Directorio de descarga por plataforma (<output_dir>/<plataforma>), creado si no existe.
+        Con layout 'video', uno por video: <output_dir>/<plataforma>/<video_id>
+        """
+        if self.layout == 'video' and url:
+            from cluster import video_dir, video_key
+            platform_dir = video_dir(output_dir, *video_key(url, platform))
+        else:
+            platform_dir = Path(output_dir) / platform
+        platform_dir.mkdir(parents=True, exist_ok=True)
+        return platform_dir
+
+    def _downloaded_path(self, job, platform_dir, allow_latest=False):
+        """
+        Ruta del video descargado según la salida de yt-dlp (destino o fusión de formatos).
+        allow_latest: si no aparece, el video más reciente del directorio (solo es fiable
+        cuando no hay otras descargas escribiendo en él)
+        """
+        if job.path and Path(job.path).suffix.lower() in self.VIDEO_EXTENSIONS and Path(job.path).exists():
+            return str(job.path)
+        if not allow_latest:
+            return None
+        video_files = [path for ext in self.VIDEO_EXTENSIONS for path in platform_dir.glob(f"*{ext}")]
+        if not video_files:
+            return None
+        return str(max(video_files, key=lambda x: x.stat().st_mtime))
+
+    def _on_ytdlp_line(self, job, event):
+        """Salida de una descarga individual: progreso como evento estructurado, el resto al log"""
+        if event.kind == 'progress':
+            # La consola lo presenta como "📥 Progreso: ..."
+            if event.eta:
+                self._emit('download.progress', url=job.url, percent=f"{event.percent:g}%",
+                           size=event.size, speed=event.speed, eta=event.eta)
+        elif event.kind == 'step':
+            self._log(f"📥 {event.message}")
+        elif event.kind == 'note' or (event.kind == 'path' and event.message.startswith('[Merger]')):
+            self._log(f"🔄 {event.message}")
+        elif event.kind == 'error':
+            self._log(f"❌ {event.message}")
+
+    def download_many(self, items, output_dir="./downloads", max_parallel=8):
+        """
+        Descarga varios videos a la vez: items = [(url, plataforma, referer)]. Un solo hilo
+        supervisa hasta max_parallel procesos yt-dlp y la consola muestra una línea por
+        descarga. Devuelve los DownloadResult en el orden de entrada
+        """
+        from ytdlp import DownloadJob, YtDlpSupervisor, build_command
+
+        items = list(items)
+        jobs = []
+        for url, platform, referer in items:
+            cmd = build_command(url, platform, self._platform_dir(output_dir, platform, url), referer)
+            label = canonical_video_url(url, platform).video_id or url
+            jobs.append(DownloadJob(url, platform, cmd, label=f"{platform} {label}"))
+
+        if not self._ensure_space(output_dir, stage='descargar'):
+            return [DownloadResult(False, job.url, job.platform, error="Espacio en disco insuficiente") for job in jobs]
+
+        self._log(f"📥 Descargando {len(jobs)} video(s), hasta {max_parallel} a la vez")
+        self._emit('downloads.start', total=len(jobs), labels=[job.label for job in jobs])
+
+        def on_line(job, event):
+            if event.kind in ('progress', 'path'):
+                self._emit('download.progress', url=job.url, slot=job.slot, percent=f"{job.percent:g}%",
+                           percent_value=job.percent, size=job.size, speed=job.speed, eta=job.eta)
+
+        def on_finish(job):
+            self._emit('download.progress', url=job.url, slot=job.slot, percent=f"{job.percent:g}%",
+                       percent_value=100.0 if job.ok else job.percent, status='✅' if job.ok else '❌')
+            video_path = self._downloaded_path(job, self._platform_dir(output_dir, job.platform, job.url))
+            self._emit_span('download', job.duration, job.started_at, url=job.url, platform=job.platform,
+                            ok=job.ok, bytes=self._file_size(video_path),
+                            media_seconds=self._media_duration(video_path))
+
+        try:
+            YtDlpSupervisor(max_parallel, on_event=on_line, on_finish=on_finish).run(jobs)
+        finally:
+            self._emit('downloads.end')
+
+        # Loom: las embed que fallan se reintentan una vez con la URL de share
+        retry = [i for i, job in enumerate(jobs)
+                 if not job.ok and job.returncode is not None and job.platform == 'loom' and '/embed/' in job.url]
+        if retry:
+            self._log(f"🔄 Reintentando {len(retry)} video(s) de Loom con la URL de share...")
+            again = self.download_many([(jobs[i].url.replace('/embed/', '/share/'), 'loom', items[i][2])
+                                        for i in retry], output_dir, max_parallel)
+
+        results = []
+        for job in jobs:
+            video_path = self._downloaded_path(job, self._platform_dir(output_dir, job.platform, job.url))
+            if job.ok and video_path:
+                self._emit('download.finished', f"📁 Archivo guardado: {Path(video_path).name}",
+                           url=job.url, platform=job.platform, video_path=video_path)
+            elif not job.ok:
+                self._log(f"❌ {job.url}: {job.error}")
+            results.append(DownloadResult(job.ok, job.url, job.platform, video_path, job.returncode,
+                                          None if job.ok else job.error))
+        for index, result in zip(retry, again if retry else []):
+            results[index] = result
+        return results
 
     def process_single_url(self, raw_url, output_dir="./downloads", referer=None, extract_audio=True, transcribe=True):
         """
         Procesa una URL individual (Vimeo o Loom)
         """
-        print(f"🔗 URL Original: {raw_url}")
+        self._log(f"🔗 URL Original: {raw_url}")
 
         # Detectar plataforma
         if 'vimeo.com' in raw_url.lower():
@@ -1268,29 +2202,29 @@ class VideoDownloader:
         elif 'loom.com' in raw_url.lower():
             platform = 'loom'
         else:
-            print("❌ Error: URL no reconocida. Solo se admiten Vimeo y Loom")
+            self._log("❌ Error: URL no reconocida. Solo se admiten Vimeo y Loom")
             return False
 
         clean_url = self.clean_video_url(raw_url, platform)
-        print(f"🧹 URL Limpia: {clean_url}")
-        print(f"🎬 Plataforma: {platform.upper()}")
+        self._log(f"🧹 URL Limpia: {clean_url}")
+        self._log(f"🎬 Plataforma: {platform.upper()}")
 
         # Descargar video
         downloaded_path = self.download_with_ytdlp(clean_url, platform, output_dir, referer)
 
         # Si la descarga fue exitosa y tenemos la ruta del archivo
         if downloaded_path and isinstance(downloaded_path, str):
-            print(f"\n🎯 Video descargado: {downloaded_path}")
+            self._log(f"\n🎯 Video descargado: {downloaded_path}")
 
             # Procesar el video (extraer audio y transcribir)
             if extract_audio or transcribe:
                 results = self.process_downloaded_video(downloaded_path, extract_audio, transcribe)
 
                 if results['audio_extracted']:
-                    print(f"🎵 Audio disponible en: {results['audio_path']}")
+                    self._log(f"🎵 Audio disponible en: {results['audio_path']}")
 
                 if results['transcribed']:
-                    print(f"📝 Transcripción disponible en: {results['transcription_path']}")
+                    self._log(f"📝 Transcripción disponible en: {results['transcription_path']}")
 
                 return results
 
@@ -1298,50 +2232,60 @@ class VideoDownloader:
 
         return downloaded_path
 
-    def process_html_file(self, file_path, output_dir="./downloads", referer=None, extract_audio=True, transcribe=True):
+    def process_html_file(self, file_path, output_dir="./downloads", referer=None, extract_audio=True, transcribe=True,
+                          jobs=1):
         """
-        Procesa un archivo HTML completo buscando Vimeo y Loom
+        Procesa un archivo HTML completo buscando Vimeo y Loom.
+        jobs > 1: descarga primero todos los videos en paralelo (download_many) y después los procesa
         """
-        print(f"📄 Leyendo archivo: {file_path}")
+        self._log(f"📄 Leyendo archivo: {file_path}")
 
         if not os.path.exists(file_path):
-            print(f"❌ Error: El archivo {file_path} no existe")
+            self._log(f"❌ Error: El archivo {file_path} no existe")
             return
 
-        html_content = self.read_html_file(file_path)
-        video_urls = self.extract_video_urls_from_text(html_content)
+        video_urls = self.extract_videos_from_file(file_path)
 
         if not video_urls:
-            print("❌ No se encontraron videos (Vimeo/Loom) en el archivo")
+            self._log("❌ No se encontraron videos (Vimeo/Loom) en el archivo")
             return
 
         # Agrupar por plataforma
         vimeo_count = len([v for v in video_urls if v['platform'] == 'vimeo'])
         loom_count = len([v for v in video_urls if v['platform'] == 'loom'])
 
-        print(f"\n🎯 Se encontraron {len(video_urls)} video(s) total:")
-        print(f"   🎬 Vimeo: {vimeo_count}")
-        print(f"   📹 Loom: {loom_count}")
+        self._log(f"\n🎯 Se encontraron {len(video_urls)} video(s) total:")
+        self._log(f"   🎬 Vimeo: {vimeo_count}")
+        self._log(f"   📹 Loom: {loom_count}")
 
         processed_videos = []
 
+        downloads = None
+        if jobs > 1 and len(video_urls) > 1:
+            downloads = self.download_many(
+                [(v['clean'], v['platform'], referer or v.get('referer')) for v in video_urls],
+                output_dir, jobs)
+
         for i, video_info in enumerate(video_urls, 1):
-            print(f"\n📹 Video {i} [{video_info['platform'].upper()}]:")
-            print(f"   ID: {video_info['video_id']}")
-            print(f"   Fuente: {video_info['source']}")
-            print(f"   Original: {video_info['original'][:100]}...")
-            print(f"   Limpia: {video_info['clean']}")
-
-            # Descargar
-            downloaded_path = self.download_with_ytdlp(
-                video_info['clean'],
-                video_info['platform'],
-                output_dir,
-                referer
-            )
+            self._log(f"\n📹 Video {i} [{video_info['platform'].upper()}]:")
+            self._log(f"   ID: {video_info['video_id']}")
+            self._log(f"   Fuente: {video_info['source']}")
+            self._log(f"   Original: {video_info['original'][:100]}...")
+            self._log(f"   Limpia: {video_info['clean']}")
+
+            # Descargar (con captura de red, la página que cargó el embed sirve de referer)
+            if downloads is not None:
+                downloaded_path = downloads[i - 1].ok and (downloads[i - 1].video_path or True)
+            else:
+                downloaded_path = self.download_with_ytdlp(
+                    video_info['clean'],
+                    video_info['platform'],
+                    output_dir,
+                    referer or video_info.get('referer')
+                )
 
             if downloaded_path and isinstance(downloaded_path, str):
-                print(f"✅ Video {i} descargado: {downloaded_path}")
+                self._log(f"✅ Video {i} descargado: {downloaded_path}")
 
                 # Procesar el video (extraer audio y transcribir)
                 if extract_audio or transcribe:
@@ -1350,21 +2294,21 @@ class VideoDownloader:
                     processed_videos.append(results)
 
                     if results['audio_extracted']:
-                        print(f"   🎵 Audio: {results['audio_path']}")
+                        self._log(f"   🎵 Audio: {results['audio_path']}")
 
                     if results['transcribed']:
-                        print(f"   📝 Transcripción: {results['transcription_path']}")
+                        self._log(f"   📝 Transcripción: {results['transcription_path']}")
             else:
-                print(f"   ⚠️  Falló la descarga del video {i}")
+                self._log(f"   ⚠️  Falló la descarga del video {i}")
 
         # Resumen final
         if processed_videos:
-            print(f"\n📊 RESUMEN DE PROCESAMIENTO:")
-            print(f"   Videos descargados: {len(processed_videos)}")
+            self._log(f"\n📊 RESUMEN DE PROCESAMIENTO:")
+            self._log(f"   Videos descargados: {len(processed_videos)}")
             audio_count = sum(1 for r in processed_videos if r['audio_extracted'])
             transcript_count = sum(1 for r in processed_videos if r['transcribed'])
-            print(f"   Audios extraídos: {audio_count}")
-            print(f"   Transcripciones: {transcript_count}")
+            self._log(f"   Audios extraídos: {audio_count}")
+            self._log(f"   Transcripciones: {transcript_count}")
 
         return processed_videos
 
@@ -1373,14 +2317,14 @@ class VideoDownloader:
         Función de debug para analizar detalladamente un archivo HTML
         """
         if not os.path.exists(file_path):
-            print(f"❌ Error: El archivo {file_path} no existe")
+            self._log(f"❌ Error: El archivo {file_path} no existe")
             return
 
         html_content = self.read_html_file(file_path)
 
-        print(f"🔍 ANÁLISIS DETALLADO DE: {file_path}")
-        print(f"📏 Tamaño del archivo: {len(html_content)} caracteres")
-        print("=" * 60)
+        self._log(f"🔍 ANÁLISIS DETALLADO DE: {file_path}")
+        self._log(f"📏 Tamaño del archivo: {len(html_content)} caracteres")
+        self._log("=" * 60)
 
         # Buscar palabras clave relacionadas con video platforms
         vimeo_mentions = html_content.lower().count('vimeo')
@@ -1389,41 +2333,41 @@ class VideoDownloader:
         embed_mentions = html_content.lower().count('embed')
         video_mentions = html_content.lower().count('video')
 
-        print(f"🔤 Menciones de 'vimeo': {vimeo_mentions}")
-        print(f"🔤 Menciones de 'loom': {loom_mentions}")
-        print(f"🔤 Menciones de 'player.vimeo': {player_mentions}")
-        print(f"🔤 Menciones de 'embed': {embed_mentions}")
-        print(f"🔤 Menciones de 'video': {video_mentions}")
-        print("-" * 40)
+        self._log(f"🔤 Menciones de 'vimeo': {vimeo_mentions}")
+        self._log(f"🔤 Menciones de 'loom': {loom_mentions}")
+        self._log(f"🔤 Menciones de 'player.vimeo': {player_mentions}")
+        self._log(f"🔤 Menciones de 'embed': {embed_mentions}")
+        self._log(f"🔤 Menciones de 'video': {video_mentions}")
+        self._log("-" * 40)
 
         # Buscar con cada patrón de Vimeo
-        print("🎬 PATRONES DE VIMEO:")
+        self._log("🎬 PATRONES DE VIMEO:")
         for i, pattern in enumerate(self.vimeo_patterns):
             matches = re.findall(pattern, html_content, re.IGNORECASE)
-            print(f"Patrón Vimeo {i + 1}: {pattern}")
-            print(f"   Encontrados: {len(matches)}")
+            self._log(f"Patrón Vimeo {i + 1}: {pattern}")
+            self._log(f"   Encontrados: {len(matches)}")
             if matches:
                 for j, match in enumerate(matches[:2]):  # Mostrar solo primeros 2
-                    print(f"     {j + 1}. {match}")
+                    self._log(f"     {j + 1}. {match}")
                 if len(matches) > 2:
-                    print(f"     ... y {len(matches) - 2} más")
-            print()
+                    self._log(f"     ... y {len(matches) - 2} más")
+            self._log("")
 
         # Buscar con cada patrón de Loom
-        print("📹 PATRONES DE LOOM:")
+        self._log("📹 PATRONES DE LOOM:")
         for i, pattern in enumerate(self.loom_patterns):
             matches = re.findall(pattern, html_content, re.IGNORECASE)
-            print(f"Patrón Loom {i + 1}: {pattern}")
-            print(f"   Encontrados: {len(matches)}")
+            self._log(f"Patrón Loom {i + 1}: {pattern}")
+            self._log(f"   Encontrados: {len(matches)}")
             if matches:
                 for j, match in enumerate(matches[:2]):  # Mostrar solo primeros 2
-                    print(f"     {j + 1}. {match}")
+                    self._log(f"     {j + 1}. {match}")
                 if len(matches) > 2:
-                    print(f"     ... y {len(matches) - 2} más")
-            print()
+                    self._log(f"     ... y {len(matches) - 2} más")
+            self._log("")
 
         # Buscar fragmentos que contengan "vimeo" o "loom"
-        print("🔍 FRAGMENTOS QUE CONTIENEN PLATAFORMAS DE VIDEO:")
+        self._log("🔍 FRAGMENTOS QUE CONTIENEN PLATAFORMAS DE VIDEO:")
 
         # Contextos de Vimeo
         vimeo_contexts = []
@@ -1439,82 +2383,47 @@ class VideoDownloader:
 
         # Mostrar algunos contextos únicos de Vimeo
         if vimeo_contexts:
-            print("   VIMEO contextos:")
+            self._log("   VIMEO contextos:")
             unique_vimeo = list(set(vimeo_contexts))[:3]
             for i, context in enumerate(unique_vimeo):
-                print(f"     {i + 1}. ...{context}...")
+                self._log(f"     {i + 1}. ...{context}...")
 
         # Mostrar algunos contextos únicos de Loom
         if loom_contexts:
-            print("   LOOM contextos:")
+            self._log("   LOOM contextos:")
             unique_loom = list(set(loom_contexts))[:3]
             for i, context in enumerate(unique_loom):
-                print(f"     {i + 1}. ...{context}...")
+                self._log(f"     {i + 1}. ...{context}...")
 
-        print(f"\n💡 Total contextos únicos con 'vimeo': {len(set(vimeo_contexts))}")
-        print(f"💡 Total contextos únicos con 'loom': {len(set(loom_contexts))}")
+        self._log(f"\n💡 Total contextos únicos con 'vimeo': {len(set(vimeo_contexts))}")
+        self._log(f"💡 Total contextos únicos con 'loom': {len(set(loom_contexts))}")
 
-    def format_existing_transcription(self, file_path):
+    def format_existing_transcription(self, file_path, paragraph_pause=None):
         """
-        Formatea una transcripción existente en archivos legibles
+        Formatea una transcripción existente en archivos legibles.
+        paragraph_pause: pausa que separa párrafos (segundos o percentil, p. ej. 'p90')
         """
         file_path = Path(file_path)
 
-        print(f"🔄 FORMATEANDO TRANSCRIPCIÓN EXISTENTE")
-        print("=" * 50)
-        print(f"📁 Archivo: {file_path.name}")
+        self._log(f"🔄 FORMATEANDO TRANSCRIPCIÓN EXISTENTE")
+        self._log("=" * 50)
+        self._log(f"📁 Archivo: {file_path.name}")
 
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-
-            print(f"📏 Tamaño del archivo: {len(content):,} caracteres")
-
-            # Extraer contenido SRT
-            srt_content = None
-
-            # Caso 1: Archivo TXT con JSON embebido (formato de nuestro script)
-            if not content.strip().startswith('{') and '{' in content:
-                print("📋 Formato detectado: TXT con JSON embebido")
-                json_start = content.find('{')
-                if json_start != -1:
-                    json_content = content[json_start:]
-                    try:
-                        data = json.loads(json_content)
-                        srt_content = self.extract_srt_from_json_data(data)
-                    except json.JSONDecodeError:
-                        print("⚠️ Error parseando JSON embebido")
-
-            # Caso 2: JSON puro
-            elif content.strip().startswith('{'):
-                print("📋 Formato detectado: JSON puro")
-                try:
-                    data = json.loads(content)
-                    srt_content = self.extract_srt_from_json_data(data)
-                except json.JSONDecodeError:
-                    print("⚠️ Error parseando JSON")
-
-            # Caso 3: SRT directo
-            else:
-                print("📋 Formato detectado: SRT directo")
-                srt_content = content
-
-            if not srt_content:
-                print("❌ No se pudo extraer contenido SRT válido")
+            formatter = self.load_transcription(file_path)
+            if formatter is None:
+                self._log("❌ No se pudo extraer contenido SRT válido")
                 return False
+            if paragraph_pause is not None:
+                formatter.paragraph_pause = paragraph_pause
 
-            print(f"📏 Contenido SRT extraído: {len(srt_content):,} caracteres")
-
-            # Procesar con el formateador
-            formatter = TranscriptionFormatter()
-            segments_count = formatter.parse_srt_content(srt_content)
-
+            segments_count = len(formatter.segments)
             if segments_count == 0:
-                print("❌ No se pudieron procesar segmentos válidos")
+                self._log("❌ No se pudieron procesar segmentos válidos")
                 return False
 
-            print(f"✅ Procesados {segments_count} segmentos")
-            print(f"⏱️ Duración total: {formatter.seconds_to_readable(formatter.total_duration)}")
+            self._log(f"✅ Procesados {segments_count} segmentos")
+            self._log(f"⏱️ Duración total: {formatter.seconds_to_readable(formatter.total_duration)}")
 
             # Generar formatos legibles
             base_name = file_path.stem
@@ -1527,7 +2436,7 @@ class VideoDownloader:
                 ("INDICE", "Índice buscable por palabras", formatter.generate_searchable_index)
             ]
 
-            print(f"\n📝 GENERANDO FORMATOS LEGIBLES:")
+            self._log(f"\n📝 GENERANDO FORMATOS LEGIBLES:")
             generated_files = []
 
             for format_name, description, method in formats:
@@ -1536,25 +2445,122 @@ class VideoDownloader:
                     method(output_path)
                     if output_path.exists() and output_path.stat().st_size > 500:
                         size_kb = output_path.stat().st_size / 1024
-                        print(f"   ✅ {description}: {output_path.name} ({size_kb:.1f} KB)")
+                        self._log(f"   ✅ {description}: {output_path.name} ({size_kb:.1f} KB)")
                         generated_files.append(output_path)
                     else:
-                        print(f"   ⚠️ {format_name}: Archivo muy pequeño o vacío")
+                        self._log(f"   ⚠️ {format_name}: Archivo muy pequeño o vacío")
                 except Exception as e:
-                    print(f"   ❌ Error en {format_name}: {str(e)}")
+                    self._log(f"   ❌ Error en {format_name}: {str(e)}")
 
-            print(f"\n🎉 FORMATEO COMPLETADO")
-            print(f"   📁 Archivos generados: {len(generated_files)}")
+            self._log(f"\n🎉 FORMATEO COMPLETADO")
+            self._log(f"   📁 Archivos generados: {len(generated_files)}")
             for file in generated_files:
                 size_kb = file.stat().st_size / 1024
-                print(f"      📄 {file.name} ({size_kb:.1f} KB)")
+                self._log(f"      📄 {file.name} ({size_kb:.1f} KB)")
 
             return len(generated_files) > 0
 
         except Exception as e:
-            print(f"❌ Error formateando transcripción: {str(e)}")
+            self._log(f"❌ Error formateando transcripción: {str(e)}")
             return False
 
+    @staticmethod
+    def compact_source(file_path):
+        """El propio archivo si es un .bin, o su .bin hermano si existe y no es más antiguo; si no, None"""
+        from compact import is_compact
+
+        file_path = Path(file_path)
+        if is_compact(file_path):
+            return file_path
+        compact_file = file_path.with_suffix('.bin')
+        try:
+            if compact_file.stat().st_mtime >= file_path.stat().st_mtime and is_compact(compact_file):
+                return compact_file
+        except OSError:
+            pass
+        return None
+
+    def load_transcription(self, file_path):
+        """
+        Devuelve un TranscriptionFormatter con los segmentos del archivo, o None.
+        Si existe la versión compacta (.bin) al lado y está al día, se lee esa en lugar del JSON/SRT
+        """
+        from compact import CompactTranscript
+
+        file_path = Path(file_path)
+        compact_file = self.compact_source(file_path)
+
+        formatter = TranscriptionFormatter()
+        if compact_file is not None:
+            self._log(f"📋 Formato detectado: transcripción compacta ({compact_file.name})")
+            with CompactTranscript(compact_file) as transcript:
+                formatter.load_segments(transcript.segments())
+                formatter.language = transcript.meta.get('detected_language')
+            return formatter
+
+        meta = {}
+        srt_content = self.read_transcription_source(file_path, meta)
+        if not srt_content:
+            return None
+        self._log(f"📏 Contenido SRT extraído: {len(srt_content):,} caracteres")
+        formatter.parse_srt_content(srt_content)
+        formatter.language = meta.get('detected_language')
+        return formatter
+
+    def read_transcription_source(self, file_path, meta=None):
+        """
+        Lee un archivo de transcripción (JSON, TXT con JSON embebido o SRT) y devuelve el contenido SRT.
+        meta: dict que recibe los metadatos del JSON (p. ej. detected_language), si los hay
+        """
+        with open(file_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+
+        self._log(f"📏 Tamaño del archivo: {len(content):,} caracteres")
+
+        # Extraer contenido SRT
+        srt_content = None
+
+        # Caso 1: Archivo TXT con JSON embebido (formato de nuestro script)
+        if not content.strip().startswith('{') and '{' in content:
+            self._log("📋 Formato detectado: TXT con JSON embebido")
+            json_start = content.find('{')
+            if json_start != -1:
+                json_content = content[json_start:]
+                try:
+                    data = json.loads(json_content)
+                    srt_content = self.extract_srt_from_json_data(data)
+                    self._read_json_meta(data, meta)
+                except json.JSONDecodeError:
+                    self._log("⚠️ Error parseando JSON embebido")
+
+        # Caso 2: JSON puro
+        elif content.strip().startswith('{'):
+            self._log("📋 Formato detectado: JSON puro")
+            try:
+                data = json.loads(content)
+                srt_content = self.extract_srt_from_json_data(data)
+                self._read_json_meta(data, meta)
+            except json.JSONDecodeError:
+                self._log("⚠️ Error parseando JSON")
+
+        # Caso 3: SRT directo
+        else:
+            self._log("📋 Formato detectado: SRT directo")
+            srt_content = content
+
+        return srt_content
+
+    @staticmethod
+    def _read_json_meta(data, meta):
+        """Copia a meta el idioma detectado (en la raíz o dentro de transcription_output)"""
+        if meta is None or not isinstance(data, dict):
+            return
+        output = data.get('transcription_output')
+        language = data.get('detected_language') or (
+            output.get('detected_language') if isinstance(output, dict) else None)
+        if language:
+            meta['detected_language'] = language
+
     def extract_srt_from_json_data(self, data):
         """
         Extrae contenido SRT de diferentes estructuras JSON
@@ -1602,37 +2608,29 @@ class VideoDownloader:
         return None
 
 
-def main():
-    downloader = VideoDownloader()
-
-    print("🎬 Descargador de Videos de Vimeo y Loom con Transcripción y Formateo")
-    print("=" * 70)
-
-    # Verificar configuración
+def check_configuration(downloader):
+    """
+    Muestra el estado de yt-dlp, ffmpeg, Replicate y el archivo .env
+    """
     print("\n🔧 VERIFICANDO CONFIGURACIÓN:")
 
-    # Verificar yt-dlp
-    try:
-        result = subprocess.run(['yt-dlp', '--version'], capture_output=True, text=True)
-        if result.returncode == 0:
-            version = result.stdout.strip().split('\n')[0]
-            print(f"   yt-dlp: ✅ {version}")
-        else:
-            print("   yt-dlp: ❌ Error al verificar versión")
-    except FileNotFoundError:
+    # Verificar yt-dlp (versión cacheada)
+    version = get_tool_version('yt-dlp')
+    if version:
+        print(f"   yt-dlp: ✅ {version}")
+    elif version is None:
         print("   yt-dlp: ❌ No instalado")
+    else:
+        print("   yt-dlp: ❌ Error al verificar versión")
 
-    # Verificar ffmpeg
-    try:
-        result = subprocess.run(['ffmpeg', '-version'], capture_output=True, text=True)
-        if result.returncode == 0:
-            version_line = result.stdout.split('\n')[0]
-            version = version_line.split(' ')[2] if len(version_line.split(' ')) > 2 else 'Instalado'
-            print(f"   ffmpeg: ✅ {version}")
-        else:
-            print("   ffmpeg: ❌ Error al verificar versión")
-    except FileNotFoundError:
+    # Verificar ffmpeg (versión cacheada)
+    version = get_tool_version('ffmpeg')
+    if version:
+        print(f"   ffmpeg: ✅ {version}")
+    elif version is None:
         print("   ffmpeg: ❌ No instalado")
+    else:
+        print("   ffmpeg: ❌ Error al verificar versión")
 
     # Verificar Replicate API
     if downloader.replicate_token:
@@ -1641,6 +2639,12 @@ def main():
         print("   Replicate API: ❌ Token no configurado")
         print("                   💡 Crea archivo .env con: REPLICATE_API_TOKEN=tu_token")
 
+    # Verificar backend de transcripción
+    backend = downloader.transcription_backend
+    reason = backend.unavailable_reason(downloader)
+    print(f"   Transcripción: {'✅' if reason is None else '❌'} backend {backend.name}"
+          + (f" ({reason})" if reason else ""))
+
     # Verificar archivo .env
     env_file = Path('.env')
     if env_file.exists():
@@ -1648,6 +2652,19 @@ def main():
     else:
         print(f"   Archivo .env: ⚠️  No encontrado (recomendado)")
 
+
+def interactive_menu():
+    """
+    Menú interactivo original (se usa cuando no se pasa ningún subcomando)
+    """
+    downloader = VideoDownloader()
+
+    print("🎬 Descargador de Videos de Vimeo y Loom con Transcripción y Formateo")
+    print("=" * 70)
+
+    # Verificar configuración
+    check_configuration(downloader)
+
     while True:
         print("\n¿Qué quieres hacer?")
         print("1. Descargar una URL específica (Vimeo o Loom)")
@@ -1766,5 +2783,877 @@ def main():
             print("❌ Opción inválida. Elige 1, 2, 3, 4, 5, 6 o 7.")
 
 
+def make_downloader(args, events=None):
+    """
+    Crea un VideoDownloader con la consola como suscriptor (o el bus indicado)
+    y, si la ejecución se está instrumentando, con el RunRecorder suscrito
+    """
+    if events is None:
+        events = EventBus()
+        events.subscribe(ConsoleSubscriber())
+
+    recorder = getattr(args, 'recorder', None)
+    if recorder is not None:
+        events.subscribe(recorder)
+
+    downloader = VideoDownloader(events=events)
+    downloader.backend = make_backend_from_args(args)
+    downloader.trimmer = make_trimmer_from_args(args)
+    downloader.storage = make_storage_from_args(args, downloader._log)
+    return downloader
+
+
+def make_storage_from_args(args, log=None):
+    """StorageManager con --retention/--max-disk/--min-free (o sus variables de entorno) sobre --output-dir"""
+    from storage import StorageManager, StoragePolicy
+
+    policy = StoragePolicy.from_env(getattr(args, 'retention', None), getattr(args, 'max_disk', None),
+                                    getattr(args, 'min_free', None))
+    root = getattr(args, 'output_dir', None) or './downloads'
+    return StorageManager(policy, root, log=log or print)
+
+
+def make_trimmer_from_args(args):
+    """SilenceTrimmer si se pidió --trim-silence (o DESCARGA_VIDEOS_TRIM_SILENCE=1)"""
+    enabled = getattr(args, 'trim_silence', False) or os.environ.get('DESCARGA_VIDEOS_TRIM_SILENCE') == '1'
+    if not enabled:
+        return None
+    from silence import SilenceTrimmer
+    return SilenceTrimmer(noise_db=getattr(args, 'silence_db', -35.0),
+                          min_silence=getattr(args, 'min_silence', 1.0))
+
+
+def make_backend_from_args(args):
+    """Backend de transcripción según --backend/--local-model/--threads/--batch-size"""
+    return make_backend(getattr(args, 'backend', None), model=getattr(args, 'local_model', None),
+                        threads=getattr(args, 'threads', None), batch_size=getattr(args, 'batch_size', None))
+
+
+def cmd_download(args):
+    downloader = make_downloader(args)
+    extract_audio = args.audio or args.transcribe
+    if args.jobs > 1 and len(args.urls) > 1:
+        return cmd_download_parallel(downloader, args, extract_audio)
+    ok = True
+    for url in args.urls:
+        result = downloader.process_single_url(url, args.output_dir, args.referer, extract_audio, args.transcribe)
+        ok = ok and bool(result)
+    return 0 if ok else 1
+
+
+def cmd_download_parallel(downloader, args, extract_audio):
+    """download -j N: todas las descargas a la vez y después audio/transcripción de cada video"""
+    items = []
+    for url in args.urls:
+        canonical = canonical_video_url(url)
+        if canonical.platform not in ('vimeo', 'loom'):
+            print(f"❌ URL no reconocida (solo Vimeo y Loom): {url}")
+            continue
+        items.append((canonical.url, canonical.platform, args.referer))
+
+    results = downloader.download_many(items, args.output_dir, args.jobs)
+    ok = len(items) == len(args.urls) and all(result.ok for result in results)
+    if extract_audio:
+        for result in results:
+            if result.ok and result.video_path:
+                processed = downloader.process_downloaded_video(result.video_path, True, args.transcribe)
+                ok = ok and bool(processed and processed['audio_extracted'])
+    return 0 if ok else 1
+
+
+def cmd_harvest(args):
+    if args.download:
+        downloader = make_downloader(args)
+        extract_audio = args.audio or args.transcribe
+        results = downloader.process_html_file(args.file, args.output_dir, args.referer, extract_audio,
+                                               args.transcribe, args.jobs)
+        return 0 if results is not None else 1
+
+    # Los mensajes de diagnóstico van a stderr para que stdout sea apto para scripts
+    events = EventBus()
+    events.subscribe(ConsoleSubscriber(stream=sys.stderr))
+    downloader = make_downloader(args, events)
+
+    if not os.path.exists(args.file):
+        print(f"❌ Error: El archivo {args.file} no existe", file=sys.stderr)
+        return 1
+
+    video_urls = downloader.extract_videos_from_file(args.file)
+
+    if args.json:
+        print(json.dumps(video_urls, ensure_ascii=False, indent=2))
+    else:
+        for video_info in video_urls:
+            print(f"{video_info['platform']}\t{video_info['video_id']}\t{video_info['clean']}")
+
+    return 0 if video_urls else 1
+
+
+def cmd_extract_audio(args):
+    downloader = make_downloader(args)
+    results = downloader.process_downloaded_video(args.video, True, args.transcribe)
+    return 0 if results and results['audio_extracted'] else 1
+
+
+def cmd_extract_batch(args):
+    downloader = make_downloader(args)
+
+    videos = []
+    for source in args.sources:
+        if not os.path.exists(source):
+            print(f"❌ Error: {source} no existe", file=sys.stderr)
+            return 1
+        videos.extend(downloader.find_videos(source))
+
+    if not videos:
+        print("❌ No se encontraron videos", file=sys.stderr)
+        return 1
+
+    results = downloader.extract_audio_batch(videos, args.workers, args.ffmpeg_threads, args.nice, args.force)
+    failed = [result for result in results if not result.ok]
+    extracted = sum(1 for result in results if result.ok and not result.skipped)
+    print(f"\n📊 {extracted} extraído(s), {sum(1 for r in results if r.skipped)} al día, {len(failed)} fallido(s)")
+    for result in failed:
+        print(f"   ❌ {result.video_path}: {result.error}")
+    return 0 if not failed else 1
+
+
+def cmd_transcribe(args):
+    downloader = make_downloader(args)
+    return 0 if downloader.transcribe_audio_file(args.audio, args.output_dir) else 1
+
+
+def cmd_reattach(args):
+    downloader = make_downloader(args)
+
+    if args.list:
+        for entry in downloader.prediction_store.list(args.status, args.limit):
+            created = datetime.fromtimestamp(entry['created_at']).strftime('%Y-%m-%d %H:%M')
+            print(f"{entry['id']}  {entry['status']:<8} {created}  {entry['audio_path']}")
+        return 0
+
+    results = downloader.reattach_predictions(args.prediction_ids)
+    return 0 if all(result.ok for result in results) else 1
+
+
+def cmd_cancel(args):
+    downloader = make_downloader(args)
+
+    prediction_ids = list(args.prediction_ids)
+    if args.all:
+        prediction_ids += [entry['id'] for entry in downloader.prediction_store.outstanding()]
+    if not prediction_ids:
+        if args.all:
+            print("✅ No hay predicciones pendientes")
+            return 0
+        print("❌ Indica uno o más IDs de predicción, o --all", file=sys.stderr)
+        return 1
+
+    canceled = [downloader.cancel_prediction(prediction_id) for prediction_id in dict.fromkeys(prediction_ids)]
+    return 0 if all(canceled) else 1
+
+
+def cmd_format(args):
+    if not os.path.exists(args.file):
+        print(f"❌ Error: El archivo {args.file} no existe", file=sys.stderr)
+        return 1
+
+    downloader = VideoDownloader()
+    return 0 if downloader.format_existing_transcription(args.file, args.pause) else 1
+
+
+def cmd_compact(args):
+    from compact import CompactTranscript, is_compact, write_compact
+
+    downloader = VideoDownloader(events=EventBus())
+    failures = 0
+    for file in args.files:
+        source = Path(file)
+        if not source.exists():
+            print(f"❌ Error: El archivo {file} no existe", file=sys.stderr)
+            failures += 1
+            continue
+
+        try:
+            if is_compact(source):
+                # Exportar a JSON (misma forma que el _transcription.json original)
+                target = source.with_suffix('.json')
+                with CompactTranscript(source) as transcript:
+                    transcript.export_json(target)
+            else:
+                target = source.with_suffix('.bin')
+                if source.suffix == '.json':
+                    with open(source, 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                    output = data if isinstance(data, dict) and ('segments' in data or 'transcription' in data) \
+                        else downloader.extract_srt_from_json_data(data)
+                else:
+                    output = downloader.read_transcription_source(source)
+                if not output or not write_compact(target, output):
+                    print(f"❌ {source.name}: no se encontraron segmentos", file=sys.stderr)
+                    failures += 1
+                    continue
+        except (OSError, ValueError) as e:
+            print(f"❌ {source.name}: {e}", file=sys.stderr)
+            failures += 1
+            continue
+
+        print(f"✅ {source.name} ({source.stat().st_size / 1024:.1f} KB) → "
+              f"{target.name} ({target.stat().st_size / 1024:.1f} KB)")
+
+    return 1 if failures else 0
+
+
+def cmd_search(args):
+    if not os.path.exists(args.file):
+        print(f"❌ Error: El archivo {args.file} no existe", file=sys.stderr)
+        return 1
+
+    # Sin suscriptores: ningún mensaje de diagnóstico en stdout
+    downloader = VideoDownloader(events=EventBus())
+    formatter = downloader.load_transcription(args.file)
+    if formatter is None:
+        print("❌ No se pudo extraer contenido SRT válido", file=sys.stderr)
+        return 1
+
+    matches = formatter.search(args.query)
+
+    if args.json:
+        print(json.dumps(matches, ensure_ascii=False, indent=2))
+    else:
+        for segment in matches:
+            print(f"[{formatter.seconds_to_readable(segment['start'])}] {segment['text']}")
+
+    return 0 if matches else 1
+
+
+def pause_arg(value):
+    """'3', '2.5' o 'p90' (percentil de las pausas) para --pause"""
+    if re.fullmatch(r'[pP]\d+(\.\d+)?', value) and float(value[1:]) <= 100:
+        return value.lower()
+    try:
+        return float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"pausa no válida: {value} (usa segundos o pNN)")
+
+
+def retention_arg(value):
+    """'video=after_audio' (o varias separadas por comas) para --retention"""
+    from storage import parse_retention
+    try:
+        parse_retention(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+    return value
+
+
+def size_arg(value):
+    """'50G', '512M'... para --max-disk/--min-free"""
+    from storage import parse_size
+    try:
+        return parse_size(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def parse_time_arg(value):
+    """'2530', '42:10', '1:02:03' o '42:10.5' → segundos"""
+    seconds = 0.0
+    for part in str(value).strip().split(':'):
+        seconds = seconds * 60 + float(part.replace(',', '.'))
+    return seconds
+
+
+def transcript_window(downloader, file_path, start, end):
+    """
+    Segmentos {'start', 'end', 'text'} que se solapan con [start, end), o None si no se pudo leer.
+    Con versión compacta solo se decodifican los segmentos de la ventana
+    """
+    compact_file = downloader.compact_source(file_path)
+    if compact_file is not None:
+        from compact import CompactTranscript
+        with CompactTranscript(compact_file) as transcript:
+            return [{'start': seg['start'], 'end': seg['end'], 'text': seg['text']}
+                    for seg in transcript.slice(start, end)]
+
+    formatter = downloader.load_transcription(file_path)
+    if formatter is None:
+        return None
+    return [{'start': seg['start'], 'end': seg['end'], 'text': seg['text']} for seg in formatter.slice(start, end)]
+
+
+def cmd_slice(args):
+    from backends import segments_to_srt
+
+    if not os.path.exists(args.file):
+        print(f"❌ Error: El archivo {args.file} no existe", file=sys.stderr)
+        return 1
+    try:
+        start, end = parse_time_arg(args.start), parse_time_arg(args.end)
+    except ValueError:
+        print("❌ Error: tiempos no válidos (usa segundos, MM:SS o HH:MM:SS)", file=sys.stderr)
+        return 1
+
+    downloader = VideoDownloader(events=EventBus())
+    segments = transcript_window(downloader, args.file, start, end)
+    if segments is None:
+        print("❌ No se pudo extraer contenido SRT válido", file=sys.stderr)
+        return 1
+
+    if args.format == 'json':
+        content = json.dumps(segments, ensure_ascii=False, indent=2)
+    elif args.format == 'srt':
+        content = segments_to_srt(segments)
+    else:
+        readable = TranscriptionFormatter().seconds_to_readable
+        content = '\n'.join(f"[{readable(seg['start'])}] {seg['text']}" for seg in segments)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(content + '\n')
+        print(f"✅ {len(segments)} segmento(s) guardados en {args.output}", file=sys.stderr)
+    else:
+        print(content)
+
+    return 0 if segments else 1
+
+
+def cmd_clip(args):
+    from clips import ClipRange
+
+    if not os.path.exists(args.media):
+        print(f"❌ Error: El archivo {args.media} no existe", file=sys.stderr)
+        return 1
+
+    downloader = make_downloader(args)
+    ranges = []
+    for value in args.range or []:
+        try:
+            start, end = value.split('-', 1)
+            ranges.append(ClipRange(parse_time_arg(start), parse_time_arg(end)))
+        except ValueError:
+            print(f"❌ Error: rango no válido '{value}' (usa INICIO-FIN, p. ej. 42:10-42:45)", file=sys.stderr)
+            return 1
+
+    if args.query:
+        transcript = args.transcript or downloader.find_transcript(args.media)
+        if not transcript:
+            print("❌ Error: no se encontró la transcripción del archivo (usa --transcript)", file=sys.stderr)
+            return 1
+        formatter = downloader.load_transcription(transcript)
+        if formatter is None:
+            print("❌ No se pudo extraer contenido SRT válido", file=sys.stderr)
+            return 1
+        for query in args.query:
+            hits = formatter.search(query)
+            print(f"🔍 '{query}': {len(hits)} coincidencia(s)")
+            ranges.extend(ClipRange(seg['start'], seg['end'], seg['text']) for seg in hits)
+
+    if not ranges:
+        print("❌ Nada que exportar: indica --query o --range", file=sys.stderr)
+        return 1
+
+    result = downloader.export_clips(args.media, ranges, args.output_dir, args.padding, args.gap)
+    if result.ok:
+        print(f"\n✅ {len(result.clip_paths)} clip(s) en {result.ffmpeg_runs} ejecución(es) de ffmpeg")
+    return 0 if result.ok else 1
+
+
+def cmd_subtitles(args):
+    downloader = make_downloader(args)
+
+    transcripts = []
+    for source in args.sources:
+        if not os.path.exists(source):
+            print(f"❌ Error: {source} no existe", file=sys.stderr)
+            return 1
+        transcripts.extend(downloader.find_transcripts(source))
+
+    if not transcripts:
+        print("❌ No se encontraron transcripciones", file=sys.stderr)
+        return 1
+
+    formats = tuple(dict.fromkeys(args.format or ('srt', 'vtt', 'ass')))
+    results = [downloader.export_subtitles(path, formats, args.mux, args.max_chars, args.max_lines,
+                                           args.max_duration, args.language)
+               for path in transcripts]
+    failed = [result for result in results if not result.ok]
+    print(f"\n📊 {len(results) - len(failed)} transcripción(es) exportadas, {len(failed)} fallida(s)")
+    return 0 if not failed else 1
+
+
+def cmd_storage(args):
+    """Uso de disco por tipo de artefacto y, con --apply, aplicar la política a lo ya descargado"""
+    from storage import KINDS, format_size
+
+    manager = make_storage_from_args(args)
+    root = Path(args.output_dir)
+    if not root.exists():
+        print(f"❌ El directorio {root} no existe")
+        return 1
+
+    if args.apply:
+        freed = manager.sweep(root)
+        print(f"🧹 Liberado: {format_size(freed)}")
+
+    usage = manager.usage(root)
+    total = sum(size for _, size in usage.values())
+    print(f"\n💾 {root}: {format_size(total)}"
+          + (f" (tope {format_size(manager.policy.max_bytes)})" if manager.policy.max_bytes else ''))
+    for kind in KINDS:
+        count, size = usage[kind]
+        if count:
+            print(f"   {kind:<13} {count:>6} archivo(s) {format_size(size):>12}   regla: {manager.policy.rule(kind)}")
+    print(f"   libre en disco: {format_size(manager.free_space(root))}")
+    return 0
+
+
+def cmd_check(args):
+    check_configuration(make_downloader(args))
+    return 0
+
+
+def cmd_serve(args):
+    from service import JobStore, JobService, make_server
+    from telemetry import RunRecorder
+
+    try:
+        uploads = default_upload_manager()
+    except ValueError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+
+    store = JobStore(args.db)
+    recorder = RunRecorder()
+    service = JobService(
+        store,
+        VideoDownloader,
+        recorder=recorder,
+        workers=args.workers,
+        stage_limits={
+            'download': args.download_concurrency,
+            'extract_audio': args.extract_concurrency,
+            'compress': args.extract_concurrency,
+            'transcribe': args.transcribe_concurrency,
+        },
+        retry_delay=args.retry_delay,
+        uploads=uploads,
+        backend=make_backend_from_args(args),
+        trimmer=make_trimmer_from_args(args),
+        storage=make_storage_from_args(args),
+    )
+    server = make_server(store, args.host, args.port, args.socket, args.max_attempts, recorder)
+
+    service.start()
+    where = f"unix:{args.socket}" if args.socket else f"http://{args.host}:{args.port}"
+    print(f"🚀 Servicio escuchando en {where} ({args.workers} workers, base de datos: {args.db})")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Deteniendo servicio (los trabajos en curso se reanudarán al reiniciar)")
+    finally:
+        server.server_close()
+    return 0
+
+
+def _service_client(args):
+    from service import ServiceClient
+    return ServiceClient(args.server, args.socket)
+
+
+def cmd_submit(args):
+    kind = 'html' if os.path.exists(args.target) else 'url'
+    options = {
+        'output_dir': os.path.abspath(args.output_dir),
+        'referer': args.referer,
+        'extract_audio': args.audio or args.transcribe,
+        'transcribe': args.transcribe,
+    }
+    target = os.path.abspath(args.target) if kind == 'html' else args.target
+
+    job = _service_client(args).submit(kind, target, options, args.priority, args.max_attempts,
+                                       os.environ.get('USER'))
+    print(f"📥 Trabajo {job['id']} encolado ({kind}, prioridad {job['priority']})")
+    return 0
+
+
+def cmd_jobs(args):
+    client = _service_client(args)
+
+    if args.cancel is not None:
+        job = client.cancel(args.cancel)
+        print(f"🛑 Trabajo {job['id']} cancelado")
+        return 0
+
+    if args.stats:
+        print(json.dumps(client.stats(), ensure_ascii=False, indent=2))
+        return 0
+
+    if args.job_id is not None:
+        print(json.dumps(client.get(args.job_id), ensure_ascii=False, indent=2))
+        return 0
+
+    for job in client.list(args.status, args.limit):
+        print(f"{job['id']:>6}  {job['status']:<9} p={job['priority']:<3} "
+              f"intentos={job['attempts']}/{job['max_attempts']}  {job['kind']}  {job['target']}")
+    return 0
+
+
+
+def default_queue():
+    """Cola del modo cluster: DESCARGA_VIDEOS_QUEUE o un SQLite en la caché (solo sirve para un nodo)"""
+    return os.environ.get('DESCARGA_VIDEOS_QUEUE') or str(get_cache_dir() / 'cluster.sqlite3')
+
+
+def cmd_cluster_enqueue(args):
+    """Vuelca a la cola compartida los videos de archivos HTML/HAR y URLs sueltas"""
+    from cluster import open_work_store
+    from urls import detect_platform
+
+    downloader = make_downloader(args)
+    videos = []
+    for source in args.sources:
+        if os.path.exists(source):
+            found = downloader.extract_videos_from_file(source)
+            videos.extend({'url': v['clean'], 'platform': v['platform'], 'referer': args.referer or v.get('referer'),
+                           'source': f"{source}: {v['source']}"} for v in found)
+        elif detect_platform(source):
+            videos.append({'url': downloader.clean_video_url(source, detect_platform(source)),
+                           'platform': detect_platform(source), 'referer': args.referer, 'source': 'URL'})
+        else:
+            print(f"⚠️  Ignorado (ni archivo ni URL de Vimeo/Loom): {source}")
+
+    added = open_work_store(args.queue).enqueue(videos, args.max_attempts)
+    print(f"📥 {added} video(s) nuevo(s) en la cola, {len(videos) - added} ya indexado(s) ({args.queue})")
+    return 0
+
+
+def cmd_cluster_work(args):
+    """Worker de un nodo: procesa videos de la cola compartida hasta Ctrl+C (o hasta vaciarla con --drain)"""
+    from cluster import ClusterWorker, default_worker_id, open_work_store
+
+    try:
+        uploads = default_upload_manager()
+    except ValueError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+    backend = make_backend_from_args(args)
+    trimmer = make_trimmer_from_args(args)
+    storage = make_storage_from_args(args)
+
+    def configure(downloader):
+        downloader.uploads = uploads
+        downloader.backend = backend
+        downloader.trimmer = trimmer
+        downloader.storage = storage
+
+    worker = ClusterWorker(
+        open_work_store(args.queue),
+        VideoDownloader,
+        args.output_dir,
+        workers=args.workers,
+        lease_seconds=args.lease,
+        heartbeat_interval=args.heartbeat,
+        poll_interval=args.poll_interval,
+        retry_delay=args.retry_delay,
+        extract_audio=args.audio or args.transcribe,
+        transcribe=args.transcribe,
+        worker_id=args.worker_id or default_worker_id(),
+        configure=configure,
+    )
+    print(f"🚀 Nodo {worker.worker_id}: {args.workers} worker(s), cola {args.queue}, salida {args.output_dir}")
+    try:
+        processed = worker.run(drain=args.drain)
+    except KeyboardInterrupt:
+        print("\n👋 Deteniendo nodo (los videos en curso volverán a la cola al caducar su lease)")
+        return 130
+    print(f"🏁 {processed} video(s) procesado(s) en este nodo")
+    return 0
+
+
+def cmd_cluster_status(args):
+    from cluster import open_work_store
+
+    store = open_work_store(args.queue)
+    if args.json:
+        print(json.dumps({'stats': store.stats(), 'videos': store.list(args.status, args.limit)},
+                         ensure_ascii=False, indent=2, default=str))
+        return 0
+
+    stats = store.stats()
+    print(f"📊 Cola {args.queue}: " + ", ".join(f"{status} {count}" for status, count in stats['by_status'].items()))
+    print(f"   Nodos activos: {stats['active_nodes']}  ·  {stats['throughput_per_hour']:.1f} video(s)/h"
+          + (f"  ·  {stats['avg_video_seconds']}s por video" if stats['avg_video_seconds'] else ''))
+    now = time.time()
+    for item in store.list(args.status, args.limit):
+        detail = item['owner'] if item['status'] == 'running' else (item['error'] or '')
+        if item['status'] == 'running':
+            detail += f" (lease {item['lease_expires_at'] - now:+.0f}s)"
+        print(f"   {item['status']:<8} {item['platform']}/{item['video_id']:<34} "
+              f"intentos={item['attempts']}/{item['max_attempts']}  {detail}")
+    return 0
+
+def build_parser():
+    """
+    Construye el parser de la CLI con sus subcomandos
+    """
+    parser = argparse.ArgumentParser(
+        description="Descargador de Videos de Vimeo y Loom con Transcripción y Formateo. "
+                    "Sin subcomando se abre el menú interactivo."
+    )
+    parser.add_argument('--report', default=None,
+                        help="Informe de tiempos por etapa (.json o .csv). Por defecto se guarda en "
+                             "la caché para download/harvest/extract-audio/transcribe")
+    parser.add_argument('--no-report', action='store_true', help="No escribir informe de tiempos")
+    parser.add_argument('--otlp', default=None, help="Exportar los spans en OTLP/JSON a este archivo")
+    parser.add_argument('--metrics-port', type=int, default=None,
+                        help="Exponer /metrics (Prometheus) en este puerto durante la ejecución")
+    parser.add_argument('--backend', choices=['replicate', 'local'], default=None,
+                        help="Motor de transcripción (por defecto DESCARGA_VIDEOS_BACKEND o replicate)")
+    parser.add_argument('--local-model', default=None, help="Modelo de faster-whisper (por defecto large-v3)")
+    parser.add_argument('--threads', type=int, default=None, help="Hilos de CPU para el backend local")
+    parser.add_argument('--batch-size', type=int, default=None,
+                        help="Tamaño de lote de la decodificación local (1 = sin lotes)")
+    parser.add_argument('--trim-silence', action='store_true',
+                        help="Recortar silencios largos antes de transcribir (los tiempos se reajustan)")
+    parser.add_argument('--silence-db', type=float, default=-35.0, help="Umbral de silencio en dB")
+    parser.add_argument('--min-silence', type=float, default=1.0,
+                        help="Duración mínima (s) de un silencio para recortarlo")
+    parser.add_argument('--retention', action='append', metavar='TIPO=REGLA', type=retention_arg,
+                        help="Retención por tipo de artefacto, p. ej. video=after_audio, audio=after_transcript "
+                             "(repetible; también DESCARGA_VIDEOS_RETENTION)")
+    parser.add_argument('--max-disk', default=None, type=size_arg,
+                        help="Tope de la carpeta de descargas (p. ej. 50G); se desaloja el medio menos usado")
+    parser.add_argument('--min-free', default=None, type=size_arg,
+                        help="Espacio libre mínimo antes de cada etapa (p. ej. 5G)")
+    subparsers = parser.add_subparsers(dest='command', metavar='COMANDO')
+
+    def add_download_options(subparser):
+        subparser.add_argument('-o', '--output-dir', default='./downloads',
+                               help="Directorio de descarga (por defecto: ./downloads)")
+        subparser.add_argument('--referer', default=None, help="Referer para yt-dlp")
+        subparser.add_argument('--audio', action='store_true', help="Extraer audio de los videos")
+        subparser.add_argument('--transcribe', action='store_true',
+                               help="Transcribir el audio (implica --audio)")
+        subparser.add_argument('-j', '--jobs', type=int, default=1,
+                               help="Descargas simultáneas de yt-dlp (por defecto: 1; 8-16 para muchos videos)")
+
+    download = subparsers.add_parser('download', help="Descargar una o varias URLs (Vimeo o Loom)")
+    download.add_argument('urls', nargs='+', metavar='URL')
+    add_download_options(download)
+    download.set_defaults(func=cmd_download, pipeline=True)
+
+    harvest = subparsers.add_parser('harvest', help="Buscar videos en un archivo HTML/TXT o una captura de red (HAR)")
+    harvest.add_argument('file', help="Archivo HTML/TXT, captura .har o log de red .jsonl a analizar")
+    harvest.add_argument('--json', action='store_true', help="Imprimir los videos encontrados en JSON")
+    harvest.add_argument('--download', action='store_true', help="Descargar los videos encontrados")
+    add_download_options(harvest)
+    harvest.set_defaults(func=cmd_harvest, pipeline=True)
+
+    extract_audio = subparsers.add_parser('extract-audio', help="Extraer audio de un video descargado")
+    extract_audio.add_argument('video', help="Ruta del video")
+    extract_audio.add_argument('--transcribe', action='store_true', help="Transcribir el audio extraído")
+    extract_audio.set_defaults(func=cmd_extract_audio, pipeline=True)
+
+    extract_batch = subparsers.add_parser('extract-batch',
+                                          help="Extraer el audio de muchos videos en paralelo")
+    extract_batch.add_argument('sources', nargs='+', metavar='RUTA',
+                               help="Directorio (se recorre recursivamente) o manifiesto con una ruta por línea")
+    extract_batch.add_argument('-j', '--workers', type=int, default=None,
+                               help="Procesos ffmpeg simultáneos (por defecto: núcleos / hilos por proceso)")
+    extract_batch.add_argument('--ffmpeg-threads', type=int, default=1, help="Hilos por proceso ffmpeg")
+    extract_batch.add_argument('--nice', type=int, default=10, help="Prioridad de ffmpeg (nice; 0 = normal)")
+    extract_batch.add_argument('--force', action='store_true', help="Extraer aunque el audio esté al día")
+    extract_batch.set_defaults(func=cmd_extract_batch, pipeline=True)
+
+    transcribe = subparsers.add_parser('transcribe', help="Transcribir un archivo de audio existente")
+    transcribe.add_argument('audio', help="Ruta del audio (MP3, WAV, M4A, etc.)")
+    transcribe.add_argument('-o', '--output-dir', default=None, help="Directorio de salida")
+    transcribe.set_defaults(func=cmd_transcribe, pipeline=True)
+
+    reattach = subparsers.add_parser('reattach',
+                                     help="Recoger predicciones de Replicate interrumpidas y guardar su transcripción")
+    reattach.add_argument('prediction_ids', nargs='*', metavar='ID',
+                          help="Predicciones concretas (por defecto, todas las pendientes)")
+    reattach.add_argument('--list', action='store_true', help="Listar el registro de predicciones")
+    reattach.add_argument('--status', choices=['pending', 'done', 'failed', 'canceled'])
+    reattach.add_argument('--limit', type=int, default=50)
+    reattach.set_defaults(func=cmd_reattach)
+
+    cancel = subparsers.add_parser('cancel', help="Cancelar predicciones en curso en Replicate")
+    cancel.add_argument('prediction_ids', nargs='*', metavar='ID')
+    cancel.add_argument('--all', action='store_true', help="Cancelar todas las predicciones pendientes")
+    cancel.set_defaults(func=cmd_cancel)
+
+    format_parser = subparsers.add_parser('format', help="Generar formatos legibles de una transcripción")
+    format_parser.add_argument('file', help="Transcripción (JSON, TXT, SRT o .bin)")
+    format_parser.add_argument('--pause', type=pause_arg, metavar='SEGUNDOS|pNN',
+                               help="Pausa que separa párrafos: segundos (por defecto 3) o percentil "
+                                    "de las pausas de la grabación, p. ej. p90")
+    format_parser.set_defaults(func=cmd_format)
+
+    compact = subparsers.add_parser('compact',
+                                    help="Convertir transcripciones JSON/SRT a formato compacto (.bin) o exportar un .bin a JSON")
+    compact.add_argument('files', nargs='+', help="Transcripciones (JSON, TXT, SRT o .bin)")
+    compact.set_defaults(func=cmd_compact)
+
+    search = subparsers.add_parser('search', help="Buscar un texto en una transcripción")
+    search.add_argument('file', help="Transcripción (JSON, TXT, SRT o .bin)")
+    search.add_argument('query', help="Texto a buscar")
+    search.add_argument('--json', action='store_true', help="Imprimir los segmentos en JSON")
+    search.set_defaults(func=cmd_search)
+
+    slice_parser = subparsers.add_parser('slice', help="Mostrar o exportar lo dicho entre dos instantes")
+    slice_parser.add_argument('file', help="Transcripción (JSON, TXT, SRT o .bin)")
+    slice_parser.add_argument('start', help="Inicio (segundos, MM:SS o HH:MM:SS)")
+    slice_parser.add_argument('end', help="Fin (segundos, MM:SS o HH:MM:SS)")
+    slice_parser.add_argument('--format', choices=('text', 'srt', 'json'), default='text',
+                              help="Formato de salida (por defecto texto con marcas de tiempo)")
+    slice_parser.add_argument('-o', '--output', help="Guardar en un archivo en lugar de imprimir")
+    slice_parser.set_defaults(func=cmd_slice)
+
+    clip = subparsers.add_parser('clip', help="Cortar clips de un video por búsqueda en la transcripción o por rangos")
+    clip.add_argument('media', help="Video o audio descargado")
+    clip.add_argument('-q', '--query', action='append', help="Texto a buscar en la transcripción (repetible)")
+    clip.add_argument('-r', '--range', action='append', metavar='INICIO-FIN',
+                      help="Rango explícito, p. ej. 42:10-42:45 (repetible)")
+    clip.add_argument('--transcript', help="Transcripción a usar (por defecto <nombre>_transcription.*)")
+    clip.add_argument('--padding', type=float, default=1.0, help="Segundos extra a cada lado (por defecto 1)")
+    clip.add_argument('--gap', type=float, default=1.0,
+                      help="Fusionar clips separados por menos de estos segundos (por defecto 1)")
+    clip.add_argument('-o', '--output-dir', help="Directorio de salida (por defecto <nombre>_clips/)")
+    clip.set_defaults(func=cmd_clip)
+
+    subtitles = subparsers.add_parser('subtitles',
+                                      help="Exportar subtítulos SRT/VTT/ASS (y opcionalmente incrustarlos en el video)")
+    subtitles.add_argument('sources', nargs='+', help="Transcripciones o directorios (recursivos)")
+    subtitles.add_argument('-f', '--format', action='append', choices=('srt', 'vtt', 'ass'),
+                           help="Formato a generar (repetible; por defecto los tres)")
+    subtitles.add_argument('--mux', action='store_true',
+                           help="Incrustar los subtítulos en el video descargado (<nombre>_subtitulado.<ext>)")
+    subtitles.add_argument('--max-chars', type=int, default=42, help="Caracteres por línea (por defecto 42)")
+    subtitles.add_argument('--max-lines', type=int, default=2, help="Líneas por subtítulo (por defecto 2)")
+    subtitles.add_argument('--max-duration', type=float, default=7.0,
+                           help="Duración máxima de un subtítulo en segundos (por defecto 7)")
+    subtitles.add_argument('--language', help="Código de idioma de la pista incrustada (p. ej. spa)")
+    subtitles.set_defaults(func=cmd_subtitles)
+
+    storage = subparsers.add_parser('storage', help="Uso de disco de las descargas y limpieza según la política")
+    storage.add_argument('output_dir', nargs='?', default='./downloads',
+                         help="Directorio de descargas (por defecto: ./downloads)")
+    storage.add_argument('--apply', action='store_true',
+                         help="Aplicar la retención (--retention) y el tope (--max-disk) a lo ya descargado")
+    storage.set_defaults(func=cmd_storage)
+
+    check = subparsers.add_parser('check', help="Verificar yt-dlp, ffmpeg y Replicate")
+    check.set_defaults(func=cmd_check)
+
+    def add_server_options(subparser):
+        subparser.add_argument('--server', default='http://127.0.0.1:8765', help="URL del servicio")
+        subparser.add_argument('--socket', default=None, help="Socket Unix del servicio (en lugar de TCP)")
+
+    serve = subparsers.add_parser('serve', help="Daemon con cola de trabajos persistente")
+    serve.add_argument('--db', default=str(get_cache_dir() / 'jobs.sqlite3'), help="Base de datos SQLite")
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=8765)
+    serve.add_argument('--socket', default=None, help="Escuchar en un socket Unix en lugar de TCP")
+    serve.add_argument('--workers', type=int, default=4, help="Trabajos simultáneos")
+    serve.add_argument('--download-concurrency', type=int, default=2, help="Descargas simultáneas")
+    serve.add_argument('--extract-concurrency', type=int, default=os.cpu_count() or 2,
+                       help="Procesos ffmpeg simultáneos")
+    serve.add_argument('--transcribe-concurrency', type=int, default=2,
+                       help="Transcripciones simultáneas en Replicate")
+    serve.add_argument('--max-attempts', type=int, default=3, help="Intentos por trabajo")
+    serve.add_argument('--retry-delay', type=int, default=30, help="Espera base entre reintentos (s)")
+    serve.set_defaults(func=cmd_serve)
+
+    submit = subparsers.add_parser('submit', help="Encolar una URL o archivo HTML en el servicio")
+    submit.add_argument('target', help="URL de Vimeo/Loom o archivo HTML/TXT")
+    submit.add_argument('--priority', type=int, default=0, help="Mayor número = antes")
+    submit.add_argument('--max-attempts', type=int, default=None)
+    add_download_options(submit)
+    add_server_options(submit)
+    submit.set_defaults(func=cmd_submit)
+
+    jobs = subparsers.add_parser('jobs', help="Consultar trabajos del servicio")
+    jobs.add_argument('job_id', nargs='?', type=int, help="Mostrar un trabajo concreto")
+    jobs.add_argument('--status', choices=['queued', 'running', 'done', 'failed', 'canceled'])
+    jobs.add_argument('--limit', type=int, default=50)
+    jobs.add_argument('--stats', action='store_true', help="Profundidad de cola y throughput")
+    jobs.add_argument('--cancel', type=int, metavar='ID', help="Cancelar un trabajo en cola")
+    add_server_options(jobs)
+    jobs.set_defaults(func=cmd_jobs)
+
+    def add_queue_option(subparser):
+        subparser.add_argument('--queue', default=default_queue(),
+                               help="Cola compartida: ruta SQLite en un disco común o sqlite:///ruta "
+                                    "(por defecto DESCARGA_VIDEOS_QUEUE)")
+
+    cluster_enqueue = subparsers.add_parser('cluster-enqueue',
+                                            help="Encolar en la cola compartida los videos de HTML/HAR o URLs")
+    cluster_enqueue.add_argument('sources', nargs='+', metavar='ARCHIVO|URL')
+    cluster_enqueue.add_argument('--referer', default=None, help="Referer para yt-dlp")
+    cluster_enqueue.add_argument('--max-attempts', type=int, default=3, help="Intentos por video")
+    add_queue_option(cluster_enqueue)
+    cluster_enqueue.set_defaults(func=cmd_cluster_enqueue)
+
+    cluster_work = subparsers.add_parser('cluster-work', help="Procesar videos de la cola compartida en este nodo")
+    cluster_work.add_argument('-o', '--output-dir', default='./downloads',
+                              help="Raíz compartida: cada video va a <raíz>/<plataforma>/<id>/")
+    cluster_work.add_argument('--audio', action='store_true', help="Extraer audio de los videos")
+    cluster_work.add_argument('--transcribe', action='store_true', help="Transcribir el audio (implica --audio)")
+    cluster_work.add_argument('--workers', type=int, default=2, help="Videos simultáneos en este nodo")
+    cluster_work.add_argument('--lease', type=int, default=300,
+                              help="Segundos sin latido tras los que otro nodo retoma un video")
+    cluster_work.add_argument('--heartbeat', type=int, default=60, help="Intervalo de renovación del lease (s)")
+    cluster_work.add_argument('--poll-interval', type=float, default=5, help="Espera cuando la cola está vacía (s)")
+    cluster_work.add_argument('--retry-delay', type=int, default=30, help="Espera base entre reintentos (s)")
+    cluster_work.add_argument('--worker-id', default=None, help="Identificador del nodo (por defecto host:pid)")
+    cluster_work.add_argument('--drain', action='store_true', help="Terminar cuando no quede nada que reclamar")
+    add_queue_option(cluster_work)
+    cluster_work.set_defaults(func=cmd_cluster_work)
+
+    cluster_status = subparsers.add_parser('cluster-status', help="Estado de la cola compartida")
+    cluster_status.add_argument('--status', choices=['queued', 'running', 'done', 'failed'])
+    cluster_status.add_argument('--limit', type=int, default=50)
+    cluster_status.add_argument('--json', action='store_true')
+    add_queue_option(cluster_status)
+    cluster_status.set_defaults(func=cmd_cluster_status)
+
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if not args.command:
+        interactive_menu()
+        return 0
+
+    instrumented = getattr(args, 'pipeline', False) and not args.no_report
+    if not (instrumented or args.report or args.otlp or args.metrics_port):
+        return args.func(args)
+
+    from telemetry import RunRecorder, serve_metrics
+
+    args.recorder = RunRecorder()
+    if args.metrics_port:
+        serve_metrics(args.recorder, args.metrics_port)
+
+    try:
+        return args.func(args)
+    finally:
+        if args.recorder.spans:
+            report_path = args.report
+            if not report_path and not args.no_report:
+                report_path = get_cache_dir() / 'runs' / f"run-{datetime.now():%Y%m%d-%H%M%S}.json"
+            if report_path:
+                print(f"📊 Informe de tiempos: {args.recorder.write_report(report_path)}", file=sys.stderr)
+            if args.otlp:
+                args.recorder.write_otlp(args.otlp)
+
+
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,152 @@
+"""
+Metadatos de media (duración y streams)
+Primero se consulta el .info.json que yt-dlp escribe junto al video (--write-info-json) y
+solo si no existe se lanza ffprobe. Los resultados se cachean por (ruta, tamaño, mtime)
+en memoria y en disco, así que cada archivo se inspecciona una sola vez
+"""
+
+import json
+import os
+import subprocess
+import threading
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+@dataclass(slots=True)
+class MediaInfo:
+    """Duración (s) y streams de un archivo de audio/video"""
+    duration: Optional[float]
+    streams: List[Dict[str, Any]] = field(default_factory=list)
+    source: str = 'ffprobe'  # 'info.json' o 'ffprobe'
+
+    @property
+    def has_audio(self) -> bool:
+        return any(stream.get('codec_type') == 'audio' for stream in self.streams)
+
+
+def _info_json_streams(info):
+    """Streams a partir de los campos de formato de yt-dlp (requested_formats o de nivel superior)"""
+    formats = info.get('requested_formats') or [info]
+    streams = []
+    for fmt in formats:
+        vcodec, acodec = fmt.get('vcodec'), fmt.get('acodec')
+        if vcodec and vcodec != 'none':
+            streams.append({'codec_type': 'video', 'codec_name': vcodec,
+                            'width': fmt.get('width'), 'height': fmt.get('height')})
+        if acodec and acodec != 'none':
+            streams.append({'codec_type': 'audio', 'codec_name': acodec,
+                            'sample_rate': fmt.get('asr'), 'channels': fmt.get('audio_channels')})
+    return streams
+
+
+def read_info_json(media_path) -> Optional[MediaInfo]:
+    """MediaInfo desde el .info.json con el mismo nombre base que el archivo (video o su audio)"""
+    info_path = Path(media_path).with_suffix('.info.json')
+    try:
+        with open(info_path, 'r', encoding='utf-8') as f:
+            info = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(info, dict) or not info.get('duration'):
+        return None
+    return MediaInfo(float(info['duration']), _info_json_streams(info), 'info.json')
+
+
+def run_ffprobe(media_path) -> Optional[MediaInfo]:
+    cmd = ["ffprobe", "-v", "quiet", "-print_format", "json", "-show_format", "-show_streams", str(media_path)]
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        data = json.loads(result.stdout or '{}')
+    except (OSError, ValueError):
+        return None
+    if result.returncode != 0 or not isinstance(data, dict):
+        return None
+
+    duration = (data.get('format') or {}).get('duration')
+    streams = [
+        {key: stream.get(key) for key in ('codec_type', 'codec_name', 'sample_rate', 'channels', 'width', 'height')
+         if stream.get(key) is not None}
+        for stream in data.get('streams') or []
+    ]
+    try:
+        duration = float(duration) if duration is not None else None
+    except ValueError:
+        duration = None
+    return MediaInfo(duration, streams, 'ffprobe')
+
+
+class MetadataService:
+    """Caché de MediaInfo por (ruta, tamaño, mtime), persistida en un JSON del directorio de caché"""
+
+    def __init__(self, cache_path=None, max_entries=5000):
+        self.cache_path = Path(cache_path) if cache_path else None
+        self.max_entries = max_entries
+        self._cache: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._loaded = False
+        # Número de procesos ffprobe lanzados (para el informe de tiempos)
+        self.probes = 0
+
+    @staticmethod
+    def cache_key(path):
+        stat = os.stat(path)
+        return f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+
+    def _load(self):
+        if self._loaded or self.cache_path is None:
+            return
+        self._loaded = True
+        try:
+            self._cache = json.loads(self.cache_path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            self._cache = {}
+
+    def _save(self):
+        if self.cache_path is None:
+            return
+        if len(self._cache) > self.max_entries:
+            # Se conservan las entradas más recientes (los dict mantienen el orden de inserción)
+            for key in list(self._cache)[:len(self._cache) - self.max_entries]:
+                del self._cache[key]
+        tmp = self.cache_path.with_name(f"{self.cache_path.name}.{os.getpid()}.tmp")
+        try:
+            tmp.write_text(json.dumps(self._cache), encoding='utf-8')
+            os.replace(tmp, self.cache_path)
+        except OSError:
+            pass
+
+    def get(self, media_path, probe=True) -> Optional[MediaInfo]:
+        """
+        MediaInfo del archivo, o None si no existe o no se pudo inspeccionar.
+        probe=False: solo caché y .info.json, nunca lanza ffprobe (para métricas baratas)
+        """
+        try:
+            key = self.cache_key(media_path)
+        except OSError:
+            return None
+
+        with self._lock:
+            self._load()
+            cached = self._cache.get(key)
+        if cached is not None:
+            return MediaInfo(**cached)
+
+        info = read_info_json(media_path)
+        if info is None:
+            if not probe:
+                return None
+            self.probes += 1
+            info = run_ffprobe(media_path)
+        if info is None:
+            return None
+
+        with self._lock:
+            self._cache[key] = asdict(info)
+            self._save()
+        return info
+
+    def duration(self, media_path, probe=True) -> Optional[float]:
+        info = self.get(media_path, probe)
+        return info.duration if info else None
@@ -0,0 +1,188 @@
+"""
+Transcripción parcial en disco
+Mientras el backend entrega segmentos (faster-whisper los produce uno a uno; algunas versiones
+de Replicate rellenan `output` durante el procesamiento) se añaden a archivos .partial junto a
+la salida final: SRT, JSONL (un segmento por línea, para recuperarlos tras un fallo) y los
+formatos legibles que se pueden construir añadiendo líneas (LEGIBLE y CONVERSACION).
+Al guardar la transcripción completa se generan los archivos definitivos y se borran los parciales.
+Si el proceso se interrumpe, la siguiente transcripción del mismo audio lee el .partial.jsonl y
+continúa tras el último segmento guardado (load_partial_segments / merge_resumed)
+"""
+
+import json
+from datetime import datetime
+from pathlib import Path
+
+from backends import segments_to_srt, seconds_to_srt_time
+
+PARTIAL_SUFFIXES = {
+    'srt': '_transcription.partial.srt',
+    'jsonl': '_transcription.partial.jsonl',
+    'clean': '_LEGIBLE.partial.txt',
+    'conversation': '_CONVERSACION.partial.txt',
+}
+
+# Pausa (s) que separa párrafos en el formato conversación (igual que TranscriptionFormatter)
+PARAGRAPH_PAUSE = 3
+# Margen (s) al comparar el punto de reanudación con los tiempos redondeados de los segmentos
+RESUME_TOLERANCE = 0.05
+
+
+def partial_paths(output_base):
+    base = Path(output_base).with_suffix('')
+    return {kind: Path(f"{base}{suffix}") for kind, suffix in PARTIAL_SUFFIXES.items()}
+
+
+def _readable(seconds):
+    hours, rest = divmod(int(seconds), 3600)
+    minutes, secs = divmod(rest, 60)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}" if hours else f"{minutes:02d}:{secs:02d}"
+
+
+def load_partial_segments(output_base):
+    """Segmentos ya persistidos de una transcripción interrumpida (lista vacía si no hay)"""
+    path = partial_paths(output_base)['jsonl']
+    segments = []
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    segments.append(json.loads(line))
+                except ValueError:
+                    break  # última línea a medio escribir
+    except OSError:
+        pass
+    return segments
+
+
+def merge_resumed(output, resumed, until):
+    """
+    Antepone a la salida de una transcripción reanudada los segmentos recuperados que terminan
+    antes de `until` (el punto desde el que se transcribió). Renumera los segmentos y regenera el SRT
+    """
+    kept = [segment for segment in resumed if segment['end'] <= until + RESUME_TOLERANCE]
+    if not kept or not isinstance(output, dict):
+        return output
+
+    new = output.get('segments') if isinstance(output.get('segments'), list) else []
+    segments = [dict(segment, id=i) for i, segment in enumerate(kept + new)]
+    merged = dict(output)
+    merged['segments'] = segments
+    merged['transcription'] = segments_to_srt(segments)
+    return merged
+
+
+class PartialTranscriptWriter:
+    """
+    Añade segmentos a los archivos parciales según llegan (sin reescribir lo ya escrito).
+    offset_map: si el audio tenía los silencios recortados, los tiempos se devuelven al original
+    """
+
+    def __init__(self, output_base, offset_map=None):
+        self.paths = partial_paths(output_base)
+        self.offset_map = offset_map
+        self.count = 0
+        # Segmentos recuperados de una ejecución anterior (no vienen en la salida del backend)
+        self.restored = 0
+        self._files = {}
+        self._current_minute = -1
+        self._paragraph = []
+        self._paragraph_start = None
+        self._last_end = 0.0
+
+    def _file(self, kind, header=None):
+        f = self._files.get(kind)
+        if f is None:
+            f = self._files[kind] = open(self.paths[kind], 'w', encoding='utf-8')
+            if header:
+                f.write(header)
+        return f
+
+    @staticmethod
+    def _header(title):
+        rule = "=" * 80
+        return (f"{rule}\n{title}\n{rule}\n"
+                f"⏳ Transcripción en curso (iniciada el {datetime.now().strftime('%Y-%m-%d %H:%M:%S')})\n"
+                f"{rule}\n\n")
+
+    def add(self, segment):
+        """Persiste un segmento {'start', 'end', 'text'} en todos los formatos parciales"""
+        start, end = float(segment.get('start') or 0), float(segment.get('end') or 0)
+        if self.offset_map is not None:
+            start = round(self.offset_map.to_original(start), 3)
+            end = round(self.offset_map.to_original(end, is_end=True), 3)
+        self._write(start, end, (segment.get('text') or '').strip())
+
+    def restore(self, segments):
+        """Reescribe los parciales con los segmentos de una ejecución interrumpida (ya en la línea temporal original)"""
+        for segment in segments:
+            self._write(float(segment['start']), float(segment['end']), (segment.get('text') or '').strip())
+        self.restored = self.count
+
+    def _write(self, start, end, text):
+        self.count += 1
+
+        f = self._file('jsonl')
+        f.write(json.dumps({'id': self.count - 1, 'start': start, 'end': end, 'text': text},
+                           ensure_ascii=False) + '\n')
+
+        if not text:
+            self._flush()
+            return
+
+        f = self._file('srt')
+        f.write(f"{self.count}\n{seconds_to_srt_time(start)} --> {seconds_to_srt_time(end)}\n{text}\n\n")
+
+        f = self._file('clean', self._header("TRANSCRIPCIÓN COMPLETA - FORMATO LEGIBLE"))
+        minute = int(start // 60)
+        if minute != self._current_minute:
+            if self._current_minute >= 0:
+                f.write("\n")
+            f.write(f"📍 MINUTO {minute:02d}\n{'-' * 40}\n")
+            self._current_minute = minute
+        f.write(f"[{_readable(start)}] {text}\n")
+
+        # Un párrafo se escribe cuando se cierra (pausa larga); hasta entonces queda en memoria
+        if start - self._last_end > PARAGRAPH_PAUSE and self._paragraph:
+            self._write_paragraph()
+        if not self._paragraph:
+            self._paragraph_start = start
+        self._paragraph.append(text)
+        self._last_end = end
+
+        self._flush()
+
+    def add_many(self, segments):
+        for segment in segments:
+            self.add(segment)
+
+    def sync_output(self, output):
+        """Para salidas que crecen durante el procesamiento: añade solo los segmentos nuevos"""
+        segments = output.get('segments') if isinstance(output, dict) else None
+        seen = self.count - self.restored
+        if isinstance(segments, list) and len(segments) > seen:
+            self.add_many(segments[seen:])
+
+    def _write_paragraph(self):
+        f = self._file('conversation', self._header("TRANSCRIPCIÓN - FORMATO CONVERSACIÓN"))
+        f.write(f"[{_readable(self._paragraph_start)}] {' '.join(self._paragraph)}\n\n")
+        self._paragraph = []
+
+    def _flush(self):
+        # flush (no fsync): lo escrito sobrevive a la caída del proceso sin pagar un fsync por segmento
+        for f in self._files.values():
+            f.flush()
+
+    def close(self):
+        """Cierra los archivos; el último párrafo abierto se escribe ahora"""
+        if self._paragraph:
+            self._write_paragraph()
+        for f in self._files.values():
+            f.close()
+        self._files = {}
+
+    def discard(self):
+        """Borra los parciales (una vez guardada la transcripción definitiva)"""
+        self.close()
+        for path in self.paths.values():
+            path.unlink(missing_ok=True)
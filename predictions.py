@@ -0,0 +1,81 @@
+"""
+Registro persistente de predicciones de Replicate
+Cada predicción se anota en cuanto predictions.create la devuelve, para poder recoger
+(reattach) o cancelar las que quedaron en curso si el proceso se interrumpe
+"""
+
+import sqlite3
+import time
+from contextlib import closing
+
+# pending: creada, resultado aún no guardado · done: resultado recogido/guardado
+PREDICTION_STATUSES = ('pending', 'done', 'failed', 'canceled')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+    id TEXT PRIMARY KEY,
+    audio_path TEXT NOT NULL,
+    output_base TEXT,
+    model_version TEXT,
+    status TEXT NOT NULL DEFAULT 'pending',
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS predictions_status ON predictions (status, created_at);
+"""
+
+
+class PredictionStore:
+    """Almacén SQLite de predicciones (una conexión por operación, seguro entre hilos y procesos)"""
+
+    def __init__(self, db_path):
+        self.db_path = str(db_path)
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def record(self, prediction_id, audio_path, output_base=None, model_version=None):
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO predictions "
+                "(id, audio_path, output_base, model_version, status, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, 'pending', ?, ?)",
+                (prediction_id, str(audio_path), str(output_base) if output_base else None, model_version,
+                 now, now)
+            )
+
+    def update(self, prediction_id, status, error=None):
+        if status not in PREDICTION_STATUSES:
+            raise ValueError(f"Estado de predicción no válido: {status}")
+        with closing(self._connect()) as conn:
+            conn.execute("UPDATE predictions SET status = ?, error = ?, updated_at = ? WHERE id = ?",
+                         (status, error, time.time(), prediction_id))
+
+    def get(self, prediction_id):
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT * FROM predictions WHERE id = ?", (prediction_id,)).fetchone()
+        return dict(row) if row else None
+
+    def outstanding(self):
+        """Predicciones creadas cuyo resultado aún no se ha guardado, de la más antigua a la más reciente"""
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT * FROM predictions WHERE status = 'pending' ORDER BY created_at").fetchall()
+        return [dict(row) for row in rows]
+
+    def list(self, status=None, limit=50):
+        query = "SELECT * FROM predictions"
+        params = []
+        if status:
+            query += " WHERE status = ?"
+            params.append(status)
+        query += " ORDER BY created_at DESC LIMIT ?"
+        params.append(int(limit))
+        with closing(self._connect()) as conn:
+            return [dict(row) for row in conn.execute(query, params).fetchall()]
@@ -0,0 +1,270 @@
+"""
+Capa de resiliencia para las llamadas a Replicate
+Reintentos acotados con backoff exponencial y jitter, respeto de Retry-After en los 429,
+circuit breaker cuando la API falla de forma continuada y un límite de concurrencia
+adaptativo (AIMD) que se ajusta según el throttling observado
+"""
+
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+# Clases de error
+THROTTLED = 'throttled'   # 429: esperar (Retry-After) y reducir la concurrencia
+TRANSIENT = 'transient'   # red, timeouts, 5xx: reintentar con backoff
+FATAL = 'fatal'           # autenticación, saldo, petición inválida: no reintentar
+
+_RETRY_AFTER_TEXT = re.compile(r'retry[- _]after\D{0,20}(\d+(?:\.\d+)?)', re.IGNORECASE)
+_TRANSIENT_NAMES = ('timeout', 'connect', 'network', 'transport', 'remoteprotocol', 'readerror', 'gaierror')
+# Errores deterministas del propio código o del entorno (cliente sin un método, ruta inválida...):
+# repetir la llamada daría lo mismo y no dicen nada sobre el estado de la API
+_PROGRAMMING_ERRORS = (AttributeError, TypeError, ValueError, OSError)
+
+
+class CircuitOpenError(RuntimeError):
+    """La API ha fallado demasiadas veces seguidas; no se hacen llamadas hasta que pase el enfriamiento"""
+
+    def __init__(self, retry_in):
+        super().__init__(f"Circuito abierto: demasiados fallos seguidos de la API (reintentar en {retry_in:.0f}s)")
+        self.retry_in = retry_in
+
+
+def status_code(exc) -> Optional[int]:
+    """Código HTTP de una excepción del cliente de Replicate/httpx, si lo lleva"""
+    for attr in ('status', 'status_code'):
+        value = getattr(exc, attr, None)
+        if isinstance(value, int):
+            return value
+    response = getattr(exc, 'response', None)
+    value = getattr(response, 'status_code', None)
+    return value if isinstance(value, int) else None
+
+
+def classify(exc) -> str:
+    status = status_code(exc)
+    if status is not None:
+        if status == 429:
+            return THROTTLED
+        if status == 408 or status >= 500:
+            return TRANSIENT
+        return FATAL
+
+    if isinstance(exc, (ConnectionError, TimeoutError)):
+        return TRANSIENT
+    name = type(exc).__name__.lower()
+    if any(part in name for part in _TRANSIENT_NAMES):
+        return TRANSIENT
+    if isinstance(exc, _PROGRAMMING_ERRORS):
+        return FATAL
+
+    message = str(exc).lower()
+    if '429' in message or 'rate limit' in message or 'throttled' in message:
+        return THROTTLED
+    if 'authentication' in message or 'unauthorized' in message or 'billing' in message:
+        return FATAL
+    return TRANSIENT
+
+
+def api_answered(exc) -> bool:
+    """True si el error es una respuesta de la API (código HTTP, autenticación, saldo): el servicio está accesible"""
+    if status_code(exc) is not None:
+        return True
+    message = str(exc).lower()
+    return 'authentication' in message or 'unauthorized' in message or 'billing' in message
+
+
+def retry_after(exc) -> Optional[float]:
+    """Segundos indicados por el servidor (cabecera Retry-After o texto del error)"""
+    response = getattr(exc, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    value = headers.get('Retry-After') or headers.get('retry-after')
+    if value:
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            try:
+                moment = parsedate_to_datetime(value)
+                return max(0.0, (moment - datetime.now(timezone.utc)).total_seconds())
+            except (TypeError, ValueError):
+                pass
+
+    match = _RETRY_AFTER_TEXT.search(str(exc))
+    return float(match.group(1)) if match else None
+
+
+@dataclass(slots=True)
+class RetryPolicy:
+    """Backoff exponencial con jitter completo: espera aleatoria en [0, min(max_delay, base * 2^n)]"""
+    max_attempts: int = 5
+    base_delay: float = 1.0
+    max_delay: float = 60.0
+    multiplier: float = 2.0
+
+    def backoff(self, attempt, rng=random) -> float:
+        return rng.uniform(0, min(self.max_delay, self.base_delay * self.multiplier ** (attempt - 1)))
+
+
+class CircuitBreaker:
+    """
+    Cerrado → abierto tras `failure_threshold` fallos seguidos; abierto durante `reset_timeout`
+    segundos; luego semiabierto: una llamada de prueba decide si vuelve a cerrarse
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=60.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        # Hilo que hace la llamada de prueba del estado semiabierto (None si no hay ninguna)
+        self._probing = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self.opened_at is None:
+                return 'closed'
+            return 'half_open' if self.clock() - self.opened_at >= self.reset_timeout else 'open'
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if self.clock() - self.opened_at < self.reset_timeout or self._probing is not None:
+                return False
+            self._probing = threading.get_ident()
+            return True
+
+    def retry_in(self) -> float:
+        with self._lock:
+            if self.opened_at is None:
+                return 0.0
+            return max(0.0, self.reset_timeout - (self.clock() - self.opened_at))
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self._probing is not None or self.failures >= self.failure_threshold:
+                self.opened_at = self.clock()
+            self._probing = None
+
+    def release_probe(self) -> None:
+        """Libera la llamada de prueba de este hilo sin cambiar el estado (terminó sin veredicto)"""
+        with self._lock:
+            if self._probing == threading.get_ident():
+                self._probing = None
+
+
+class AdaptiveLimiter:
+    """
+    Límite de predicciones simultáneas con incremento aditivo y reducción multiplicativa (AIMD):
+    +1 cada `limit` éxitos, ÷2 en cada throttling (como mucho una vez por ventana)
+    """
+
+    def __init__(self, initial=4, minimum=1, maximum=16, clock=time.monotonic):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = max(minimum, min(initial, maximum))
+        self.in_flight = 0
+        self.clock = clock
+        self._successes = 0
+        self._last_decrease = None
+        self._condition = threading.Condition()
+
+    @contextmanager
+    def slot(self):
+        with self._condition:
+            while self.in_flight >= self.limit:
+                self._condition.wait()
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self.in_flight -= 1
+                self._condition.notify_all()
+
+    def on_success(self) -> None:
+        with self._condition:
+            self._successes += 1
+            if self._successes >= self.limit and self.limit < self.maximum:
+                self.limit += 1
+                self._successes = 0
+                self._condition.notify_all()
+
+    def on_throttle(self, window=5.0) -> None:
+        with self._condition:
+            now = self.clock()
+            # Varias respuestas 429 de la misma ráfaga cuentan como una sola señal
+            if self._last_decrease is not None and now - self._last_decrease < window:
+                return
+            self._last_decrease = now
+            self.limit = max(self.minimum, self.limit // 2)
+            self._successes = 0
+
+
+class Resilience:
+    """Ejecuta llamadas a la API con reintentos, circuit breaker y limitador adaptativo compartidos"""
+
+    def __init__(self, policy=None, breaker=None, limiter=None, sleep=time.sleep):
+        self.policy = policy or RetryPolicy()
+        self.breaker = breaker or CircuitBreaker()
+        self.limiter = limiter or AdaptiveLimiter()
+        self.sleep = sleep
+
+    def call(self, func, on_retry=None):
+        """
+        Llama a func() reintentando los errores transitorios y de throttling.
+        on_retry(intento, espera, excepción) se invoca antes de cada espera.
+        Lanza CircuitOpenError si el circuito está abierto, o la última excepción al agotar intentos
+        """
+        for attempt in range(1, self.policy.max_attempts + 1):
+            if not self.breaker.allow():
+                raise CircuitOpenError(self.breaker.retry_in())
+
+            try:
+                result = func()
+            except Exception as e:
+                kind = classify(e)
+                if kind == FATAL:
+                    # Una respuesta de error de la API demuestra que está accesible
+                    if api_answered(e):
+                        self.breaker.record_success()
+                    raise
+
+                if kind == THROTTLED:
+                    # Un 429 indica que la API responde: no cuenta como fallo para el circuito
+                    self.breaker.record_success()
+                    self.limiter.on_throttle()
+                    delay = retry_after(e)
+                    if delay is None:
+                        delay = self.policy.backoff(attempt)
+                else:
+                    self.breaker.record_failure()
+                    delay = self.policy.backoff(attempt)
+
+                if attempt == self.policy.max_attempts:
+                    raise
+                if on_retry is not None:
+                    on_retry(attempt, delay, e)
+                self.sleep(delay)
+            else:
+                self.breaker.record_success()
+                return result
+            finally:
+                # Cualquier otra salida (error del propio código, KeyboardInterrupt...) no decide
+                # nada sobre la API, pero la llamada de prueba no puede quedarse ocupada para siempre
+                self.breaker.release_probe()
@@ -0,0 +1,74 @@
+"""
+Resultados tipados de cada etapa del pipeline (API de librería)
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, List, Optional
+
+
+@dataclass(slots=True)
+class DownloadResult:
+    """Resultado de una descarga con yt-dlp"""
+    ok: bool
+    url: str
+    platform: str
+    video_path: Optional[str] = None
+    return_code: Optional[int] = None
+    error: Optional[str] = None
+
+
+@dataclass(slots=True)
+class ExtractionResult:
+    """Resultado de la extracción de audio con ffmpeg"""
+    ok: bool
+    video_path: str
+    audio_path: Optional[str] = None
+    error: Optional[str] = None
+    skipped: bool = False  # el audio ya estaba al día
+
+
+@dataclass(slots=True)
+class CompressionResult:
+    """Resultado de la compresión de audio para la transcripción"""
+    ok: bool
+    source_path: str
+    output_path: Optional[str] = None
+    compressed: bool = False
+    original_size_mb: float = 0.0
+    final_size_mb: float = 0.0
+    bitrate_kbps: Optional[int] = None
+    error: Optional[str] = None
+    codec: Optional[str] = None
+
+
+@dataclass(slots=True)
+class TranscriptionResult:
+    """Resultado de la transcripción de un audio"""
+    ok: bool
+    audio_path: str
+    output: Any = None
+    prediction_id: Optional[str] = None
+    srt_path: Optional[str] = None
+    json_path: Optional[str] = None
+    readable_paths: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+
+
+@dataclass(slots=True)
+class ClipResult:
+    """Resultado de la exportación de clips de un archivo"""
+    ok: bool
+    source_path: str
+    clip_paths: List[str] = field(default_factory=list)
+    ffmpeg_runs: int = 0
+    error: Optional[str] = None
+
+
+@dataclass(slots=True)
+class SubtitleResult:
+    """Resultado de la exportación de subtítulos de una transcripción"""
+    ok: bool
+    transcript_path: str
+    subtitle_paths: List[str] = field(default_factory=list)
+    muxed_path: Optional[str] = None
+    error: Optional[str] = None
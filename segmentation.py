@@ -0,0 +1,82 @@
+"""
+Motor de segmentación de transcripciones
+Calcula una sola vez las pausas entre segmentos (a partir de los arrays de inicios y finales)
+y a partir de ellas las agrupaciones que usan los formatos legibles: párrafos por pausa
+(umbral fijo o percentil de las pausas), minutos y bloques de N segundos.
+Cada agrupación es una lista de rangos de índices (primero, último + 1) sobre los segmentos
+ordenados por inicio, así que los formatos no vuelven a recorrer ni copiar los segmentos
+"""
+
+import math
+from itertools import groupby
+
+
+def percentile(values, q):
+    """Percentil q (0-100) con interpolación lineal; None si no hay valores"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    lower = math.floor(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+class Segmentation:
+    """
+    starts/ends: tiempos (s) de los segmentos ordenados por inicio.
+    Las agrupaciones se calculan al pedirlas y se cachean por parámetro
+    """
+
+    def __init__(self, starts, ends):
+        self.starts = starts
+        self.ends = ends
+        # Pausa antes de cada segmento (el primero se mide desde 0, como el formato conversación)
+        self.gaps = [start - end for start, end in zip(starts, [0.0, *ends[:-1]])]
+        self._cache = {}
+
+    def pause_threshold(self, threshold=3.0, minimum=1.0):
+        """
+        Umbral de pausa en segundos. threshold puede ser un número o 'pNN' (percentil NN de las
+        pausas entre segmentos, adaptado al ritmo de cada grabación), nunca por debajo de minimum
+        """
+        if isinstance(threshold, str) and threshold.lower().startswith('p'):
+            key = ('threshold', threshold, minimum)
+            if key not in self._cache:
+                value = percentile([gap for gap in self.gaps[1:] if gap > 0], float(threshold[1:]))
+                self._cache[key] = max(minimum, value if value is not None else minimum)
+            return self._cache[key]
+        return float(threshold)
+
+    def paragraphs(self, threshold=3.0):
+        """
+        Rangos de segmentos separados por pausas mayores que el umbral. Con un percentil, las
+        pausas iguales al umbral también cortan (si no, 'p95' con muchas pausas iguales no cortaría nunca)
+        """
+        pause = self.pause_threshold(threshold)
+        inclusive = isinstance(threshold, str)
+        key = ('paragraphs', pause, inclusive)
+        if key not in self._cache:
+            breaks = [i for i, gap in enumerate(self.gaps)
+                      if i > 0 and (gap >= pause if inclusive else gap > pause)]
+            bounds = [0, *breaks, len(self.starts)]
+            self._cache[key] = [(a, b) for a, b in zip(bounds, bounds[1:]) if b > a]
+        return self._cache[key]
+
+    def buckets(self, width):
+        """[(número de bucket, primero, último + 1)] agrupando por int(inicio // width)"""
+        key = ('buckets', width)
+        if key not in self._cache:
+            runs, position = [], 0
+            for bucket, items in groupby(int(start // width) for start in self.starts):
+                size = sum(1 for _ in items)
+                runs.append((bucket, position, position + size))
+                position += size
+            self._cache[key] = runs
+        return self._cache[key]
+
+    def minutes(self):
+        return self.buckets(60)
+
+    def blocks(self, seconds=300):
+        return self.buckets(seconds)
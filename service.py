@@ -0,0 +1,524 @@
+"""
+Modo servicio: cola de trabajos persistente (SQLite) con un daemon de workers locales
+Acepta trabajos por HTTP local o socket Unix y los ejecuta con process_single_url / process_html_file
+"""
+
+import http.client
+import json
+import os
+import socket
+import socketserver
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import closing
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, urlencode
+
+from events import EventBus
+
+JOB_KINDS = ('url', 'html')
+JOB_STATUSES = ('queued', 'running', 'done', 'failed', 'canceled')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    target TEXT NOT NULL,
+    options TEXT NOT NULL DEFAULT '{}',
+    priority INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 3,
+    submitted_by TEXT,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    next_attempt_at REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS jobs_pending ON jobs (status, priority DESC, id);
+"""
+
+
+class JobStore:
+    """
+    Almacén de trabajos en SQLite. Cada operación abre su propia conexión,
+    así que se puede usar desde varios hilos (y sobrevive a reinicios del daemon)
+    """
+
+    def __init__(self, db_path, timeout=30):
+        self.db_path = str(db_path)
+        # Segundos que una operación espera a que otra conexión suelte el lock de escritura
+        self.timeout = timeout
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=self.timeout, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @staticmethod
+    def _row_to_job(row):
+        if row is None:
+            return None
+        job = dict(row)
+        job['options'] = json.loads(job['options'] or '{}')
+        if job['result']:
+            job['result'] = json.loads(job['result'])
+        return job
+
+    def submit(self, kind, target, options=None, priority=0, max_attempts=3, submitted_by=None):
+        """Encola un trabajo y devuelve su id"""
+        if kind not in JOB_KINDS:
+            raise ValueError(f"Tipo de trabajo no válido: {kind} (usa {', '.join(JOB_KINDS)})")
+
+        with closing(self._connect()) as conn:
+            cursor = conn.execute(
+                "INSERT INTO jobs (kind, target, options, priority, max_attempts, submitted_by, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (kind, target, json.dumps(options or {}), int(priority), int(max_attempts), submitted_by,
+                 time.time())
+            )
+            return cursor.lastrowid
+
+    def claim_next(self):
+        """
+        Reclama de forma atómica el trabajo pendiente de mayor prioridad (o None si no hay)
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT * FROM jobs WHERE status = 'queued' AND next_attempt_at <= ? "
+                "ORDER BY priority DESC, id LIMIT 1",
+                (now,)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+
+            conn.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, started_at = ?, error = NULL "
+                "WHERE id = ?",
+                (now, row['id'])
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            # Si falló el propio BEGIN (base de datos bloqueada) no hay transacción que deshacer
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+        return self.get(row['id'])
+
+    def finish(self, job_id, result):
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'done', result = ?, finished_at = ? WHERE id = ?",
+                (json.dumps(result, ensure_ascii=False, default=str), time.time(), job_id)
+            )
+
+    def fail(self, job_id, error, retry_delay=30):
+        """
+        Marca un intento fallido: reencola con backoff exponencial si quedan intentos
+        Devuelve True si el trabajo se reencoló
+        """
+        job = self.get(job_id)
+        now = time.time()
+
+        with closing(self._connect()) as conn:
+            if job and job['attempts'] < job['max_attempts']:
+                delay = retry_delay * (2 ** (job['attempts'] - 1))
+                conn.execute(
+                    "UPDATE jobs SET status = 'queued', error = ?, next_attempt_at = ? WHERE id = ?",
+                    (error, now + delay, job_id)
+                )
+                return True
+
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, finished_at = ? WHERE id = ?",
+                (error, now, job_id)
+            )
+            return False
+
+    def cancel(self, job_id):
+        """Cancela un trabajo que todavía no ha empezado"""
+        with closing(self._connect()) as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = 'canceled', finished_at = ? WHERE id = ? AND status = 'queued'",
+                (time.time(), job_id)
+            )
+            return cursor.rowcount > 0
+
+    def requeue_interrupted(self):
+        """
+        Devuelve a la cola los trabajos que quedaron 'running' tras una caída del daemon
+        """
+        with closing(self._connect()) as conn:
+            cursor = conn.execute("UPDATE jobs SET status = 'queued' WHERE status = 'running'")
+            return cursor.rowcount
+
+    def get(self, job_id):
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row)
+
+    def list(self, status=None, limit=100):
+        query = "SELECT * FROM jobs"
+        params = []
+        if status:
+            query += " WHERE status = ?"
+            params.append(status)
+        query += " ORDER BY id DESC LIMIT ?"
+        params.append(int(limit))
+
+        with closing(self._connect()) as conn:
+            rows = conn.execute(query, params).fetchall()
+        return [self._row_to_job(row) for row in rows]
+
+    def stats(self, window_seconds=3600):
+        """
+        Profundidad de la cola por estado y throughput de la última ventana
+        """
+        since = time.time() - window_seconds
+        with closing(self._connect()) as conn:
+            counts = dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+            finished, avg_duration = conn.execute(
+                "SELECT COUNT(*), AVG(finished_at - started_at) FROM jobs "
+                "WHERE status = 'done' AND finished_at >= ?",
+                (since,)
+            ).fetchone()
+
+        return {
+            'queue_depth': counts.get('queued', 0),
+            'by_status': {status: counts.get(status, 0) for status in JOB_STATUSES},
+            'window_seconds': window_seconds,
+            'completed_in_window': finished,
+            'throughput_per_hour': finished * 3600 / window_seconds,
+            'avg_job_seconds': round(avg_duration, 1) if avg_duration else None,
+        }
+
+
+class JobLogSubscriber:
+    """Suscriptor que escribe los mensajes de un trabajo con su id como prefijo"""
+
+    def __init__(self, job_id, stream=None):
+        self.job_id = job_id
+        self.stream = stream
+
+    def __call__(self, event):
+        if event.message and not event.kind.startswith('spinner.'):
+            for line in event.message.strip('\n').split('\n'):
+                print(f"[job {self.job_id}] {line}", file=self.stream or sys.stdout, flush=True)
+
+
+class JobService:
+    """
+    Daemon de workers: reclama trabajos del JobStore y los ejecuta con límites de concurrencia por etapa
+    """
+
+    def __init__(self, store, downloader_factory, workers=4, stage_limits=None, poll_interval=2, retry_delay=30,
+                 recorder=None, uploads=None, backend=None, trimmer=None, storage=None):
+        self.store = store
+        # UploadManager compartido: un mismo audio se sube una vez aunque lo procesen varios workers
+        self.uploads = uploads
+        # Backend de transcripción compartido (el local mantiene el modelo cargado entre trabajos)
+        self.backend = backend
+        self.trimmer = trimmer
+        # StorageManager compartido: los archivos en uso por cualquier worker quedan protegidos
+        self.storage = storage
+        # RunRecorder compartido: tiempos por etapa de todos los trabajos (expuestos en /metrics)
+        self.recorder = recorder
+        self.downloader_factory = downloader_factory
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.retry_delay = retry_delay
+        # Semáforos compartidos por todos los workers (p. ej. {'download': 2, 'transcribe': 2})
+        self.stage_limits = {
+            stage: threading.BoundedSemaphore(limit)
+            for stage, limit in (stage_limits or {}).items() if limit
+        }
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        recovered = self.store.requeue_interrupted()
+        if recovered:
+            print(f"♻️  {recovered} trabajo(s) interrumpido(s) devuelto(s) a la cola")
+
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker_loop, name=f"worker-{i + 1}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+
+    def _worker_loop(self):
+        while not self._stop.is_set():
+            job = None
+            try:
+                job = self.store.claim_next()
+                if job is None:
+                    self._stop.wait(self.poll_interval)
+                    continue
+                self.run_job(job)
+            except Exception as e:
+                # Un fallo del store (base de datos bloqueada...) no puede matar al worker:
+                # el trabajo en curso se da por fallido y el bucle sigue
+                error = f"{type(e).__name__}: {e}"
+                print(f"⚠️  [{threading.current_thread().name}] Error en el worker: {error}")
+                if job is not None:
+                    self._release(job, error)
+                self._stop.wait(self.poll_interval)
+
+    def _release(self, job, error):
+        """Reencola o marca como fallido un trabajo que se interrumpió por un error del propio worker"""
+        try:
+            requeued = self.store.fail(job['id'], error, self.retry_delay)
+        except Exception as e:
+            # Queda 'running' hasta que el daemon se reinicie y lo devuelva a la cola
+            print(f"[job {job['id']}] ⚠️  No se pudo registrar el fallo: {type(e).__name__}: {e}")
+            return
+        if requeued:
+            print(f"[job {job['id']}] 🔁 Reintento programado: {error}")
+        else:
+            print(f"[job {job['id']}] ❌ Falló definitivamente: {error}")
+
+    def run_job(self, job):
+        """Ejecuta un trabajo y registra su resultado en el store"""
+        events = EventBus()
+        events.subscribe(JobLogSubscriber(job['id']))
+        if self.recorder is not None:
+            events.subscribe(self.recorder)
+        downloader = self.downloader_factory(events=events)
+        downloader.stage_limits = self.stage_limits
+        if self.uploads is not None:
+            downloader.uploads = self.uploads
+        if self.backend is not None:
+            downloader.backend = self.backend
+        downloader.trimmer = self.trimmer
+        downloader.storage = self.storage
+
+        options = job['options']
+        args = (
+            job['target'],
+            options.get('output_dir', './downloads'),
+            options.get('referer'),
+            options.get('extract_audio', False),
+            options.get('transcribe', False),
+        )
+
+        try:
+            if job['kind'] == 'url':
+                result = downloader.process_single_url(*args)
+            else:
+                result = downloader.process_html_file(*args)
+        except Exception as e:
+            result = None
+            error = f"{type(e).__name__}: {e}"
+        else:
+            # process_single_url devuelve False y process_html_file None cuando fallan
+            error = "El procesamiento no produjo resultados" if result is None or result is False else None
+
+        if error is None:
+            self.store.finish(job['id'], result)
+        elif self.store.fail(job['id'], error, self.retry_delay):
+            print(f"[job {job['id']}] 🔁 Reintento programado: {error}")
+        else:
+            print(f"[job {job['id']}] ❌ Falló definitivamente: {error}")
+
+
+class JobRequestHandler(BaseHTTPRequestHandler):
+    """
+    API HTTP del servicio:
+      POST   /jobs         {"kind": "url"|"html", "target": ..., "priority": 0, "options": {...}}
+      GET    /jobs         ?status=queued&limit=100
+      GET    /jobs/<id>
+      DELETE /jobs/<id>    cancela un trabajo en cola
+      GET    /stats
+      GET    /metrics      formato de texto de Prometheus
+    """
+
+    server_version = "descarga-videos"
+
+    def address_string(self):
+        # En socket Unix client_address es una cadena vacía
+        return self.client_address[0] if isinstance(self.client_address, tuple) else 'unix'
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_metrics(self, stats):
+        lines = [
+            "# HELP descarga_jobs Trabajos por estado",
+            "# TYPE descarga_jobs gauge",
+        ]
+        lines += [f'descarga_jobs{{status="{status}"}} {count}' for status, count in stats['by_status'].items()]
+        lines += [
+            "# HELP descarga_jobs_throughput_per_hour Trabajos completados por hora (ventana deslizante)",
+            "# TYPE descarga_jobs_throughput_per_hour gauge",
+            f"descarga_jobs_throughput_per_hour {stats['throughput_per_hour']}",
+        ]
+        text = '\n'.join(lines) + '\n'
+        if self.server.recorder is not None:
+            text += self.server.recorder.prometheus_text()
+
+        body = text.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _job_id(self, path):
+        try:
+            return int(path.rstrip('/').split('/')[-1])
+        except ValueError:
+            return None
+
+    def do_GET(self):
+        store = self.server.store
+        parsed = urlparse(self.path)
+        query = parse_qs(parsed.query)
+
+        if parsed.path == '/stats':
+            self._send_json(200, store.stats())
+        elif parsed.path == '/metrics':
+            self._send_metrics(store.stats())
+        elif parsed.path.rstrip('/') == '/jobs':
+            status = query.get('status', [None])[0]
+            limit = query.get('limit', ['100'])[0]
+            self._send_json(200, store.list(status, limit))
+        elif parsed.path.startswith('/jobs/'):
+            job = store.get(self._job_id(parsed.path))
+            if job:
+                self._send_json(200, job)
+            else:
+                self._send_json(404, {'error': 'Trabajo no encontrado'})
+        else:
+            self._send_json(404, {'error': 'Ruta no encontrada'})
+
+    def do_POST(self):
+        if urlparse(self.path).path.rstrip('/') != '/jobs':
+            self._send_json(404, {'error': 'Ruta no encontrada'})
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            payload = json.loads(self.rfile.read(length) or b'{}')
+            job_id = self.server.store.submit(
+                payload.get('kind', 'url'),
+                payload['target'],
+                payload.get('options'),
+                payload.get('priority', 0),
+                payload.get('max_attempts', self.server.default_max_attempts),
+                payload.get('submitted_by'),
+            )
+        except (KeyError, ValueError) as e:
+            self._send_json(400, {'error': f"Petición no válida: {e}"})
+            return
+
+        self._send_json(201, self.server.store.get(job_id))
+
+    def do_DELETE(self):
+        job_id = self._job_id(urlparse(self.path).path)
+        if job_id is not None and self.server.store.cancel(job_id):
+            self._send_json(200, self.server.store.get(job_id))
+        else:
+            self._send_json(409, {'error': 'Solo se pueden cancelar trabajos en cola'})
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def make_server(store, host='127.0.0.1', port=8765, socket_path=None, default_max_attempts=3, recorder=None):
+    """Crea el servidor HTTP (TCP local o socket Unix) que expone el JobStore"""
+    if socket_path:
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        server = UnixHTTPServer(socket_path, JobRequestHandler)
+    else:
+        server = ThreadingHTTPServer((host, port), JobRequestHandler)
+
+    server.store = store
+    server.default_max_attempts = default_max_attempts
+    server.recorder = recorder
+    return server
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path, timeout=30):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class ServiceClient:
+    """Cliente mínimo de la API del servicio (TCP o socket Unix)"""
+
+    def __init__(self, server_url='http://127.0.0.1:8765', socket_path=None):
+        self.server_url = server_url
+        self.socket_path = socket_path
+
+    def _request(self, method, path, payload=None):
+        if self.socket_path:
+            conn = UnixHTTPConnection(self.socket_path)
+        else:
+            parsed = urlparse(self.server_url)
+            conn = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=30)
+
+        body = json.dumps(payload).encode('utf-8') if payload is not None else None
+        headers = {'Content-Type': 'application/json'} if body else {}
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+            data = json.loads(response.read() or b'null')
+        finally:
+            conn.close()
+
+        if response.status >= 400:
+            raise RuntimeError(data.get('error') if isinstance(data, dict) else response.reason)
+        return data
+
+    def submit(self, kind, target, options=None, priority=0, max_attempts=None, submitted_by=None):
+        payload = {'kind': kind, 'target': target, 'options': options or {}, 'priority': priority,
+                   'submitted_by': submitted_by}
+        if max_attempts is not None:
+            payload['max_attempts'] = max_attempts
+        return self._request('POST', '/jobs', payload)
+
+    def get(self, job_id):
+        return self._request('GET', f'/jobs/{job_id}')
+
+    def list(self, status=None, limit=100):
+        params = {'limit': limit}
+        if status:
+            params['status'] = status
+        return self._request('GET', f'/jobs?{urlencode(params)}')
+
+    def cancel(self, job_id):
+        return self._request('DELETE', f'/jobs/{job_id}')
+
+    def stats(self):
+        return self._request('GET', '/stats')
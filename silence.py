@@ -0,0 +1,213 @@
+"""
+Recorte de silencios antes de transcribir
+Detecta las regiones con voz con el filtro silencedetect de ffmpeg, genera un audio
+compactado (solo voz) y un mapa de desplazamientos para devolver los timestamps del
+SRT a la línea temporal original
+"""
+
+import bisect
+import json
+import re
+import subprocess
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+_SILENCE_START = re.compile(r'silence_start:\s*(-?\d+(?:\.\d+)?)')
+_SILENCE_END = re.compile(r'silence_end:\s*(-?\d+(?:\.\d+)?)')
+_DURATION = re.compile(r'Duration:\s*(\d+):(\d+):(\d+(?:\.\d+)?)')
+_SRT_TIME = re.compile(r'(\d{2}):(\d{2}):(\d{2}),(\d{3})(\s*-->\s*)(\d{2}):(\d{2}):(\d{2}),(\d{3})')
+
+
+class OffsetMap:
+    """
+    Correspondencia entre la línea temporal del audio compactado y la del original.
+    regions: lista ordenada de (inicio, fin) en segundos del original que se conservaron
+    """
+
+    def __init__(self, regions: List[Tuple[float, float]]):
+        self.regions = [(float(start), float(end)) for start, end in regions]
+        self.compact_starts = []
+        position = 0.0
+        for start, end in self.regions:
+            self.compact_starts.append(position)
+            position += end - start
+        self.compact_duration = position
+
+    def to_original(self, t, is_end=False):
+        """
+        Segundo del audio compactado → segundo del original.
+        Un final justo en un corte se asigna al final de la región anterior, no al inicio de la siguiente
+        """
+        if not self.regions:
+            return t
+        index = (bisect.bisect_left if is_end else bisect.bisect_right)(self.compact_starts, t) - 1
+        index = max(0, min(index, len(self.regions) - 1))
+        start, end = self.regions[index]
+        offset = t - self.compact_starts[index]
+        if index < len(self.regions) - 1:
+            offset = min(offset, end - start)
+        return start + offset
+
+    def remap_output(self, output):
+        """Devuelve la salida de transcripción (dict o SRT) con los tiempos en la línea temporal original"""
+        if isinstance(output, str):
+            return self.remap_srt(output)
+        if not isinstance(output, dict):
+            return output
+
+        remapped = dict(output)
+        if isinstance(output.get('transcription'), str):
+            remapped['transcription'] = self.remap_srt(output['transcription'])
+        if isinstance(output.get('segments'), list):
+            segments = []
+            for segment in output['segments']:
+                segment = dict(segment)
+                if isinstance(segment.get('start'), (int, float)):
+                    segment['start'] = round(self.to_original(segment['start']), 3)
+                if isinstance(segment.get('end'), (int, float)):
+                    segment['end'] = round(self.to_original(segment['end'], is_end=True), 3)
+                segments.append(segment)
+            remapped['segments'] = segments
+        return remapped
+
+    def shifted(self, seconds) -> 'OffsetMap':
+        """El mismo mapa para un audio que empieza `seconds` segundos después en el original"""
+        return OffsetMap([(start + seconds, end + seconds) for start, end in self.regions])
+
+    def remap_srt(self, srt_content):
+        def seconds(h, m, s, ms):
+            return int(h) * 3600 + int(m) * 60 + int(s) + int(ms) / 1000
+
+        def fmt(value):
+            millis = int(round(value * 1000))
+            h, millis = divmod(millis, 3600000)
+            m, millis = divmod(millis, 60000)
+            s, millis = divmod(millis, 1000)
+            return f"{h:02d}:{m:02d}:{s:02d},{millis:03d}"
+
+        def replace(match):
+            g = match.groups()
+            start = self.to_original(seconds(*g[0:4]))
+            end = self.to_original(seconds(*g[5:9]), is_end=True)
+            return f"{fmt(start)}{g[4]}{fmt(end)}"
+
+        return _SRT_TIME.sub(replace, srt_content)
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'regions': self.regions}, f)
+        return str(path)
+
+    @classmethod
+    def load(cls, path) -> Optional['OffsetMap']:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return cls([tuple(region) for region in json.load(f)['regions']])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+
+def offsets_path(audio_path):
+    """Archivo del mapa de desplazamientos que acompaña a un audio compactado"""
+    return Path(f"{audio_path}.offsets.json")
+
+
+@dataclass(slots=True)
+class SilenceTrimmer:
+    """
+    noise_db: umbral por debajo del cual se considera silencio
+    min_silence: duración mínima (s) de un silencio para recortarlo
+    padding: margen (s) de silencio que se conserva a cada lado de la voz
+    min_saving: fracción mínima de audio eliminable para que compense recodificar
+    """
+    noise_db: float = -35.0
+    min_silence: float = 1.0
+    padding: float = 0.25
+    min_saving: float = 0.05
+
+    def detect(self, audio_path):
+        """Devuelve (duración total, regiones con voz) o None si ffmpeg falla"""
+        cmd = [
+            "ffmpeg", "-hide_banner", "-nostats",
+            "-i", str(audio_path),
+            "-af", f"silencedetect=noise={self.noise_db}dB:d={self.min_silence}",
+            "-f", "null", "-",
+        ]
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode != 0:
+            return None
+
+        stderr = result.stderr or ''
+        match = _DURATION.search(stderr)
+        if not match:
+            return None
+        duration = int(match.group(1)) * 3600 + int(match.group(2)) * 60 + float(match.group(3))
+
+        # Silencios en orden; uno sin silence_end llega hasta el final del archivo
+        silences = []
+        start = None
+        for line in stderr.splitlines():
+            found = _SILENCE_START.search(line)
+            if found:
+                start = max(0.0, float(found.group(1)))
+                continue
+            found = _SILENCE_END.search(line)
+            if found and start is not None:
+                silences.append((start, float(found.group(1))))
+                start = None
+        if start is not None:
+            silences.append((start, duration))
+
+        regions = []
+        position = 0.0
+        for silence_start, silence_end in silences:
+            region_end = min(duration, silence_start + self.padding)
+            # Un silencio inicial no deja margen delante (no hay voz que proteger)
+            if silence_start > 0 and region_end > position:
+                if regions and position <= regions[-1][1]:
+                    # Con un margen mayor que medio silencio las regiones se solapan: se fusionan
+                    regions[-1] = (regions[-1][0], region_end)
+                else:
+                    regions.append((position, region_end))
+            position = max(position, silence_end - self.padding)
+        trailing_silence = bool(silences) and silences[-1][1] >= duration
+        if position < duration and not trailing_silence:
+            if regions and position <= regions[-1][1]:
+                regions[-1] = (regions[-1][0], duration)
+            else:
+                regions.append((position, duration))
+
+        return duration, [(round(a, 3), round(b, 3)) for a, b in regions if b - a > 0.01]
+
+    def trim(self, audio_path, output_path):
+        """
+        Genera el audio compactado (una sola codificación) y su mapa de desplazamientos.
+        Devuelve (ruta, OffsetMap, segundos eliminados) o None si no compensa o falla
+        """
+        detected = self.detect(audio_path)
+        if detected is None:
+            return None
+        duration, regions = detected
+        if not regions or duration <= 0:
+            return None
+
+        offset_map = OffsetMap(regions)
+        removed = duration - offset_map.compact_duration
+        if removed / duration < self.min_saving:
+            return None
+
+        selection = '+'.join(f"between(t,{start:.3f},{end:.3f})" for start, end in regions)
+        cmd = [
+            "ffmpeg", "-hide_banner", "-nostats", "-y",
+            "-i", str(audio_path),
+            "-af", f"aselect='{selection}',asetpts=N/SR/TB",
+            "-map", "a",
+            str(output_path),
+        ]
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode != 0:
+            return None
+
+        offset_map.save(offsets_path(output_path))
+        return str(output_path), offset_map, removed
@@ -0,0 +1,360 @@
+"""
+Política de almacenamiento de las descargas
+Cada video procesado deja varios artefactos (video, metadatos de yt-dlp, audio, intermedios de
+compresión/recorte y transcripciones). Aquí se clasifican por tipo y se aplica a cada tipo una
+regla de retención:
+
+    keep              no se borra nunca (por defecto: transcripciones, metadatos, exportaciones)
+    lru               se conserva, pero puede desalojarse si se supera el tope de disco
+                      (por defecto: video y audio)
+    after_audio       se borra en cuanto se extrae el audio (útil para el video)
+    after_transcript  se borra al guardar la transcripción (audio, transcripciones parciales)
+    immediate         se borra en cuanto deja de usarse (intermedios: _resto, _compressed, _voz)
+
+Con un tope (max_bytes) se desalojan primero los archivos usados hace más tiempo, y solo los
+que ya no hacen falta: un video cuyo audio o transcripción existe, o un audio ya transcrito.
+Las transcripciones no se desalojan nunca. Antes de cada etapa se comprueba el espacio libre
+"""
+
+import os
+import re
+import shutil
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Optional
+
+KINDS = ('video', 'audio', 'metadata', 'intermediate', 'partial', 'transcript', 'export', 'other')
+RULES = ('keep', 'lru', 'after_audio', 'after_transcript', 'immediate')
+
+DEFAULT_RETENTION = {
+    'video': 'lru',
+    'audio': 'lru',
+    'metadata': 'keep',
+    'intermediate': 'immediate',
+    'partial': 'after_transcript',
+    'transcript': 'keep',
+    'export': 'keep',
+    'other': 'keep',
+}
+
+VIDEO_EXTENSIONS = ('.mp4', '.webm', '.mkv', '.avi', '.mov', '.m4v')
+AUDIO_EXTENSIONS = ('.mp3', '.m4a', '.opus', '.ogg', '.wav', '.flac', '.aac')
+
+_TRANSCRIPT = re.compile(r'_(?:transcription\.(?:srt|json|bin)|LEGIBLE\.txt|CONVERSACION\.txt|TEMAS\.txt|INDICE\.txt)$')
+_PARTIAL = re.compile(r'\.partial\.\w+$')
+_INTERMEDIATE = re.compile(r'(?:_resto|_compressed|_voz)\.\w+$|\.offsets\.json$|\.tmp$')
+_SUFFIX = re.compile(r'(?:_resto|_compressed|_voz|_transcription|_LEGIBLE|_CONVERSACION|_TEMAS|_INDICE'
+                     r'|_subtitulado)?(?:\.partial)?(?:\.info)?(?:\.\w+)?(?:\.offsets\.json)?$')
+_SIZE = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*([kmgt]?)i?b?\s*$', re.I)
+
+
+def classify(path):
+    """Tipo de artefacto de un archivo de la carpeta de descargas"""
+    path = Path(path)
+    name = path.name
+    suffix = path.suffix.lower()
+    if _PARTIAL.search(name):
+        return 'partial'
+    if _TRANSCRIPT.search(name):
+        return 'transcript'
+    if _INTERMEDIATE.search(name):
+        return 'intermediate'
+    if name.endswith('.info.json') or suffix == '.description':
+        return 'metadata'
+    if path.stem.endswith('_subtitulado') or path.parent.name.endswith('_clips') or suffix in ('.srt', '.vtt', '.ass'):
+        return 'export'
+    if suffix in VIDEO_EXTENSIONS:
+        return 'video'
+    if suffix in AUDIO_EXTENSIONS:
+        return 'audio'
+    return 'other'
+
+
+def media_base(path):
+    """Nombre común de los artefactos de un video: 'Clase 1_transcription.json' → 'Clase 1'"""
+    return _SUFFIX.sub('', Path(path).name, count=1)
+
+
+def parse_size(value):
+    """'50G', '512M', '2.5GB' o un número de bytes → bytes"""
+    if value is None or isinstance(value, int):
+        return value
+    match = _SIZE.match(str(value))
+    if not match:
+        raise ValueError(f"Tamaño no válido: {value!r} (ejemplos: 500M, 20G)")
+    number, unit = float(match.group(1)), match.group(2).lower()
+    return int(number * 1024 ** ' kmgt'.index(unit or ' '))
+
+
+def format_size(size):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if abs(size) < 1024:
+            return f"{size:.1f} {unit}" if unit != 'B' else f"{size} B"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+
+def parse_retention(rules):
+    """['video=after_audio', 'audio=after_transcript'] (o una cadena separada por comas) → dict"""
+    if isinstance(rules, str):
+        rules = [rules]
+    retention = {}
+    for item in rules or []:
+        for rule in str(item).split(','):
+            if not rule.strip():
+                continue
+            kind, _, action = rule.partition('=')
+            kind, action = kind.strip().lower(), action.strip().lower()
+            if kind not in KINDS or action not in RULES:
+                raise ValueError(f"Regla de retención no válida: {rule!r} "
+                                 f"(tipos: {', '.join(KINDS)}; reglas: {', '.join(RULES)})")
+            retention[kind] = action
+    return retention
+
+
+@dataclass(slots=True)
+class StoragePolicy:
+    """Reglas por tipo de artefacto, tope de disco de la carpeta y espacio libre mínimo"""
+    retention: Dict[str, str] = field(default_factory=dict)
+    max_bytes: Optional[int] = None
+    min_free_bytes: int = 0
+
+    def rule(self, kind):
+        return self.retention.get(kind) or DEFAULT_RETENTION.get(kind, 'keep')
+
+    @property
+    def active(self):
+        return bool(self.max_bytes or self.min_free_bytes or
+                    any(self.rule(kind) != DEFAULT_RETENTION[kind] for kind in KINDS))
+
+    @classmethod
+    def from_env(cls, retention=None, max_disk=None, min_free=None):
+        """Opciones explícitas o, si faltan, DESCARGA_VIDEOS_RETENTION / _MAX_DISK / _MIN_FREE"""
+        rules = parse_retention(os.environ.get('DESCARGA_VIDEOS_RETENTION', ''))
+        rules.update(parse_retention(retention))
+        return cls(rules,
+                   parse_size(max_disk or os.environ.get('DESCARGA_VIDEOS_MAX_DISK') or None),
+                   parse_size(min_free or os.environ.get('DESCARGA_VIDEOS_MIN_FREE') or 0))
+
+
+class StorageManager:
+    """
+    Aplica una StoragePolicy sobre la carpeta de descargas (root). Es seguro compartirlo entre
+    hilos: los archivos en uso se marcan con pinned() y nunca se borran mientras tanto
+    """
+
+    def __init__(self, policy, root='./downloads', log=None):
+        self.policy = policy
+        self.root = Path(root)
+        self.log = log or (lambda message: None)
+        self.freed_bytes = 0
+        self._pins = Counter()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def pinned(self, *paths):
+        """Protege los artefactos de estos videos (por nombre base) mientras dura el bloque"""
+        keys = [self._key(path) for path in paths if path]
+        with self._lock:
+            self._pins.update(keys)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._pins.subtract(keys)
+                self._pins += Counter()  # descarta los contadores a cero
+
+    @staticmethod
+    def _key(path):
+        path = Path(path)
+        return str(path.parent.resolve() / media_base(path))
+
+    def _is_pinned(self, path):
+        return self._pins[self._key(path)] > 0
+
+    def _delete(self, path, reason):
+        try:
+            size = path.stat().st_size
+            path.unlink()
+        except FileNotFoundError:
+            return 0
+        except OSError as e:
+            self.log(f"⚠️  No se pudo eliminar {path.name}: {e}")
+            return 0
+        with self._lock:
+            self.freed_bytes += size
+        self.log(f"🗑️  {path.name} eliminado ({reason}, {format_size(size)})")
+        return size
+
+    # === Retención por evento ===
+
+    def siblings(self, path):
+        """Artefactos del mismo video que `path` (misma carpeta y mismo nombre base)"""
+        path = Path(path)
+        base = media_base(path)
+        try:
+            entries = list(path.parent.iterdir())
+        except OSError:
+            return []
+        return [entry for entry in entries if entry.is_file() and media_base(entry) == base]
+
+    def after(self, event, path, siblings=None):
+        """
+        Aplica las reglas tras un evento del ciclo de vida de un video ('audio' o 'transcript');
+        path es cualquiera de sus artefactos (siblings: sus artefactos, si ya se conocen).
+        Devuelve los bytes liberados
+        """
+        rules = {'audio': ('after_audio', 'immediate'),
+                 'transcript': ('after_audio', 'after_transcript', 'immediate')}[event]
+        siblings = self.siblings(path) if siblings is None else siblings
+        freed = 0
+        for sibling in siblings:
+            kind = classify(sibling)
+            rule = self.policy.rule(kind)
+            if rule not in rules:
+                continue
+            # Los intermedios de un audio que se sigue transcribiendo no se tocan hasta el final
+            if event == 'audio' and kind == 'intermediate':
+                continue
+            if rule == 'after_audio' and kind == 'video' and not any(
+                    classify(other) in ('audio', 'transcript') for other in siblings if other != sibling):
+                continue
+            freed += self._delete(sibling, f"regla {kind}={rule}")
+        return freed
+
+    @staticmethod
+    def _kinds_by_media(files):
+        """{(carpeta, nombre base): Counter(tipos)} de una pasada sobre los archivos"""
+        kinds = {}
+        for path in files:
+            kinds.setdefault((path.parent, media_base(path)), Counter())[classify(path)] += 1
+        return kinds
+
+    # === Tope de disco y espacio libre ===
+
+    def usage(self, root=None):
+        """{tipo: [archivos, bytes]} de todo lo que hay bajo root"""
+        usage = {kind: [0, 0] for kind in KINDS}
+        for path in self._files(root):
+            try:
+                size = path.stat().st_size
+            except OSError:
+                continue
+            entry = usage[classify(path)]
+            entry[0] += 1
+            entry[1] += size
+        return usage
+
+    def _files(self, root=None):
+        root = Path(root or self.root)
+        if not root.exists():
+            return []
+        return [path for path in root.rglob('*') if path.is_file()]
+
+    def evictable(self, path, kinds=None):
+        """
+        Un video se puede desalojar si ya tiene audio o transcripción; un audio si ya está transcrito.
+        kinds: Counter de los tipos de artefactos del video (si no, se lista su carpeta)
+        """
+        path = Path(path)
+        kind = classify(path)
+        if self.policy.rule(kind) == 'keep' or self._is_pinned(path):
+            return False
+        if kinds is None:
+            kinds = self._kinds_by_media(self.siblings(path)).get((path.parent, media_base(path)), Counter())
+        if kind == 'video':
+            return kinds['audio'] > 0 or kinds['transcript'] > 0
+        if kind == 'audio':
+            return kinds['transcript'] > 0
+        return kind in ('intermediate', 'partial') and kinds['transcript'] > 0
+
+    def _by_last_use(self, root=None):
+        """[(último uso, bytes, ruta)] del menos al más usado recientemente"""
+        files = []
+        for path in self._files(root):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            files.append((max(stat.st_atime, stat.st_mtime), stat.st_size, path))
+        files.sort(key=lambda item: item[0])
+        return files
+
+    def _evict(self, files, amount, reason):
+        # Los tipos de cada video se calculan una vez por pasada (no una por candidato)
+        kinds_by_media = self._kinds_by_media(path for _, _, path in files)
+        freed = 0
+        for _, _, path in files:
+            if freed >= amount:
+                break
+            kinds = kinds_by_media[(path.parent, media_base(path))]
+            if self.evictable(path, kinds):
+                freed += self._delete(path, reason)
+                if not path.exists():
+                    kinds[classify(path)] -= 1
+        return freed
+
+    def enforce(self, root=None, extra_bytes=0):
+        """
+        Desaloja los archivos usados hace más tiempo hasta que la carpeta (más extra_bytes que
+        se van a escribir) quepa en el tope. Devuelve los bytes liberados
+        """
+        if not self.policy.max_bytes:
+            return 0
+        files = self._by_last_use(root)
+        excess = sum(size for _, size, _ in files) + extra_bytes - self.policy.max_bytes
+        if excess <= 0:
+            return 0
+
+        freed = self._evict(files, excess, "tope de disco, el menos usado")
+        if freed < excess:
+            self.log(f"⚠️  La carpeta sigue {format_size(excess - freed)} por encima del tope "
+                     f"({format_size(self.policy.max_bytes)}): no queda nada más que se pueda desalojar")
+        return freed
+
+    @staticmethod
+    def free_space(path):
+        path = Path(path).resolve()
+        while not path.exists() and path != path.parent:
+            path = path.parent
+        return shutil.disk_usage(path).free
+
+    def ensure_space(self, path, needed=0, stage=''):
+        """
+        Comprueba antes de una etapa que quedan min_free_bytes libres tras escribir `needed`
+        bytes (y que la carpeta no supera el tope); si no, desaloja primero. True si hay sitio
+        """
+        self.enforce(extra_bytes=needed)
+        if not self.policy.min_free_bytes:
+            return True
+        missing = self.policy.min_free_bytes + needed - self.free_space(path)
+        if missing > 0:
+            self._evict(self._by_last_use(), missing, "poco espacio libre")
+        free = self.free_space(path)
+        if self.policy.min_free_bytes + needed > free:
+            self.log(f"❌ Espacio insuficiente para {stage or 'la etapa'}: {format_size(free)} libres, "
+                     f"se necesitan {format_size(needed)} + {format_size(self.policy.min_free_bytes)} de margen")
+            return False
+        return True
+
+    def sweep(self, root=None):
+        """
+        Aplica las reglas a lo que ya hay en la carpeta (p. ej. tras cambiar la política):
+        eventos 'transcript' para los videos transcritos, 'audio' para los que tienen audio
+        y después el tope de disco. Devuelve los bytes liberados
+        """
+        before = self.freed_bytes
+        groups = {}
+        for path in self._files(root):
+            groups.setdefault((path.parent, media_base(path)), []).append(path)
+        for paths in groups.values():
+            kinds = {classify(path): path for path in paths}
+            if 'transcript' in kinds:
+                self.after('transcript', kinds['transcript'], paths)
+            elif 'audio' in kinds:
+                self.after('audio', kinds['audio'], paths)
+        self.enforce(root)
+        return self.freed_bytes - before
@@ -0,0 +1,150 @@
+"""
+Exportación de subtítulos (SRT, WebVTT, ASS) y mux en el contenedor
+Los segmentos de la transcripción se reparten una sola vez en cues legibles (líneas de
+longitud acotada, duración máxima por cue) y de esa lista salen todos los formatos
+"""
+
+import math
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List
+
+SUBTITLE_FORMATS = ('srt', 'vtt', 'ass')
+
+# Códec de subtítulos de cada contenedor: el texto no se puede copiar tal cual en MP4/WebM
+MUX_CODECS = {'.mp4': 'mov_text', '.m4v': 'mov_text', '.mov': 'mov_text', '.mkv': 'ass', '.webm': 'webvtt'}
+MUX_SOURCE = {'mov_text': 'srt', 'ass': 'ass', 'webvtt': 'vtt'}
+
+ASS_HEADER = """[Script Info]
+ScriptType: v4.00+
+PlayResX: 1280
+PlayResY: 720
+WrapStyle: 2
+ScaledBorderAndShadow: yes
+
+[V4+ Styles]
+Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding
+Style: Default,Arial,44,&H00FFFFFF,&H000000FF,&H00000000,&H80000000,0,0,0,0,100,100,0,0,1,2,1,2,60,60,40,1
+
+[Events]
+Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
+"""
+
+
+@dataclass(slots=True)
+class Cue:
+    start: float
+    end: float
+    lines: List[str]
+
+
+def wrap_words(text, max_chars):
+    """Reparte el texto en líneas de hasta max_chars caracteres (una palabra más larga va sola)"""
+    lines, current = [], ''
+    for word in text.split():
+        if current and len(current) + 1 + len(word) > max_chars:
+            lines.append(current)
+            current = word
+        else:
+            current = f"{current} {word}" if current else word
+    if current:
+        lines.append(current)
+    return lines
+
+
+def build_cues(segments, max_chars=42, max_lines=2, max_duration=7.0, min_duration=1.0) -> List[Cue]:
+    """
+    Segmentos {'start', 'end', 'text'} → cues de como mucho max_lines líneas de max_chars.
+    Un segmento largo se divide en varios cues y su tiempo se reparte según los caracteres;
+    nunca se crean cues de menos de min_duration segundos
+    """
+    cues = []
+    for segment in segments:
+        lines = wrap_words(segment.get('text') or '', max_chars)
+        start, end = float(segment['start']), float(segment['end'])
+        if not lines or end <= start:
+            continue
+
+        duration = end - start
+        count = max(math.ceil(len(lines) / max_lines), math.ceil(duration / max_duration))
+        count = max(1, min(count, len(lines), int(duration // min_duration) or 1))
+        per_cue = math.ceil(len(lines) / count)
+        groups = [lines[i:i + per_cue] for i in range(0, len(lines), per_cue)]
+
+        total_chars = sum(len(line) for line in lines)
+        position = start
+        for index, group in enumerate(groups):
+            share = sum(len(line) for line in group) / total_chars
+            cue_end = end if index == len(groups) - 1 else position + duration * share
+            cues.append(Cue(position, cue_end, group))
+            position = cue_end
+    return cues
+
+
+def _clock(seconds, separator=',', hour_digits=2, fraction_digits=3):
+    total = int(round(seconds * 1000))
+    hours, total = divmod(total, 3600000)
+    minutes, total = divmod(total, 60000)
+    secs, millis = divmod(total, 1000)
+    fraction = f"{millis:03d}"[:fraction_digits]
+    return f"{hours:0{hour_digits}d}:{minutes:02d}:{secs:02d}{separator}{fraction}"
+
+
+def render_srt(cues):
+    return ''.join(f"{i}\n{_clock(c.start)} --> {_clock(c.end)}\n" + '\n'.join(c.lines) + "\n\n"
+                   for i, c in enumerate(cues, 1))
+
+
+def render_vtt(cues):
+    body = ''.join(f"{_clock(c.start, '.')} --> {_clock(c.end, '.')}\n" + '\n'.join(c.lines) + "\n\n"
+                   for c in cues)
+    return "WEBVTT\n\n" + body
+
+
+def render_ass(cues):
+    def escape(line):
+        return line.replace('\\', '\\\\').replace('{', '(').replace('}', ')')
+
+    events = ''.join(
+        f"Dialogue: 0,{_clock(c.start, '.', 1, 2)},{_clock(c.end, '.', 1, 2)},Default,,0,0,0,,"
+        + '\\N'.join(escape(line) for line in c.lines) + "\n"
+        for c in cues)
+    return ASS_HEADER + events
+
+
+RENDERERS = {'srt': render_srt, 'vtt': render_vtt, 'ass': render_ass}
+
+
+def subtitle_base(transcript_path):
+    """Video_transcription.json → Video (los reproductores cargan Video.srt/Video.vtt junto a Video.mp4)"""
+    path = Path(transcript_path)
+    stem = path.stem
+    if stem.endswith('_transcription'):
+        stem = stem[:-len('_transcription')]
+    return path.with_name(stem)
+
+
+def write_subtitles(cues, base, formats=SUBTITLE_FORMATS):
+    """Escribe <base>.<formato> para cada formato; devuelve {formato: ruta}"""
+    paths = {}
+    for fmt in formats:
+        path = Path(f"{base}.{fmt}")
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(RENDERERS[fmt](cues))
+        paths[fmt] = path
+    return paths
+
+
+def mux_command(video_path, subtitle_path, output_path, language=None):
+    """
+    Añade la pista de subtítulos copiando vídeo y audio (-c copy). El códec de subtítulos
+    depende del contenedor (mov_text en MP4, ass en MKV, webvtt en WebM)
+    """
+    codec = MUX_CODECS.get(Path(video_path).suffix.lower(), 'mov_text')
+    cmd = ["ffmpeg", "-hide_banner", "-nostats", "-y",
+           "-i", str(video_path), "-i", str(subtitle_path),
+           "-map", "0:v?", "-map", "0:a?", "-map", "1:0",
+           "-c", "copy", "-c:s", codec]
+    if language:
+        cmd += ["-metadata:s:s:0", f"language={language}"]
+    return cmd + [str(output_path)]
@@ -0,0 +1,197 @@
+"""
+Instrumentación por etapas del pipeline
+Convierte los eventos 'stage.end' del bus en spans y los exporta como informe JSON/CSV,
+texto de Prometheus u OTLP/JSON (compatible con OpenTelemetry)
+"""
+
+import csv
+import json
+import os
+import secrets
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+
+# Atributos numéricos que se agregan por etapa
+SUMMED_ATTRS = ('bytes', 'media_seconds')
+
+
+@dataclass(slots=True)
+class Span:
+    """Una ejecución de una etapa (probe, download, extract_audio, compress, upload, queue, inference, format...)"""
+    stage: str
+    started_at: float
+    duration: float
+    attrs: Dict[str, Any] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'stage': self.stage, 'started_at': self.started_at, 'duration': self.duration, **self.attrs}
+
+
+class RunRecorder:
+    """
+    Suscriptor del EventBus que acumula spans de una o varias ejecuciones.
+    Es seguro usarlo desde varios hilos (workers del modo servicio)
+    """
+
+    def __init__(self, max_spans=10000):
+        self.run_started_at = time.time()
+        self.max_spans = max_spans
+        self.spans: List[Span] = []
+        self._totals: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, event) -> None:
+        if event.kind != 'stage.end':
+            return
+
+        data = dict(event.data)
+        stage = data.pop('stage')
+        duration = data.pop('duration')
+        started_at = data.pop('started_at')
+        attrs = {key: value for key, value in data.items() if value is not None}
+        span = Span(stage, started_at, duration, attrs)
+
+        with self._lock:
+            # Los totales nunca se pierden; la lista de spans se acota para procesos de larga duración
+            self.spans.append(span)
+            if len(self.spans) > self.max_spans:
+                del self.spans[:len(self.spans) - self.max_spans]
+
+            totals = self._totals.setdefault(stage, {'count': 0, 'seconds': 0.0, 'errors': 0,
+                                                     'bytes': 0, 'media_seconds': 0.0})
+            totals['count'] += 1
+            totals['seconds'] += duration
+            if attrs.get('ok') is False:
+                totals['errors'] += 1
+            for key in SUMMED_ATTRS:
+                value = attrs.get(key)
+                if isinstance(value, (int, float)):
+                    totals[key] += value
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Totales por etapa, incluyendo throughput en bytes/s y segundos de media por segundo"""
+        with self._lock:
+            summary = {stage: dict(totals) for stage, totals in self._totals.items()}
+
+        for totals in summary.values():
+            seconds = totals['seconds'] or None
+            totals['avg_seconds'] = totals['seconds'] / totals['count'] if totals['count'] else 0.0
+            totals['bytes_per_second'] = totals['bytes'] / seconds if seconds else None
+            totals['media_seconds_per_second'] = totals['media_seconds'] / seconds if seconds else None
+        return summary
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            spans = [span.to_dict() for span in self.spans]
+        return {
+            'run_started_at': self.run_started_at,
+            'run_seconds': time.time() - self.run_started_at,
+            'stages': self.summary(),
+            'spans': spans,
+        }
+
+    def write_report(self, path) -> str:
+        """Escribe el informe en JSON o CSV según la extensión"""
+        path = str(path)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        if path.lower().endswith('.csv'):
+            with self._lock:
+                spans = [span.to_dict() for span in self.spans]
+            columns = ['stage', 'started_at', 'duration', 'ok', 'bytes', 'media_seconds', 'wait']
+            extra = sorted({key for span in spans for key in span} - set(columns))
+            with open(path, 'w', encoding='utf-8', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=columns + extra)
+                writer.writeheader()
+                writer.writerows(spans)
+        else:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(self.report(), f, ensure_ascii=False, indent=2, default=str)
+        return path
+
+    def prometheus_text(self, prefix='descarga') -> str:
+        """Métricas acumuladas en formato de exposición de texto de Prometheus"""
+        metrics = [
+            ('stage_runs_total', 'counter', 'Ejecuciones de la etapa', 'count'),
+            ('stage_errors_total', 'counter', 'Ejecuciones fallidas de la etapa', 'errors'),
+            ('stage_seconds_total', 'counter', 'Segundos acumulados en la etapa', 'seconds'),
+            ('stage_bytes_total', 'counter', 'Bytes procesados por la etapa', 'bytes'),
+            ('stage_media_seconds_total', 'counter', 'Segundos de media procesados por la etapa', 'media_seconds'),
+        ]
+        summary = self.summary()
+
+        lines = []
+        for name, metric_type, help_text, key in metrics:
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} {metric_type}")
+            for stage in sorted(summary):
+                lines.append(f'{prefix}_{name}{{stage="{stage}"}} {summary[stage][key]}')
+        return '\n'.join(lines) + '\n'
+
+    def otlp_json(self, service_name='descarga_videos') -> Dict[str, Any]:
+        """Spans en formato OTLP/JSON (importable por un OpenTelemetry Collector)"""
+        trace_id = secrets.token_hex(16)
+
+        def attribute(key, value):
+            if isinstance(value, bool):
+                return {'key': key, 'value': {'boolValue': value}}
+            if isinstance(value, int):
+                return {'key': key, 'value': {'intValue': str(value)}}
+            if isinstance(value, float):
+                return {'key': key, 'value': {'doubleValue': value}}
+            return {'key': key, 'value': {'stringValue': str(value)}}
+
+        with self._lock:
+            spans = list(self.spans)
+
+        otlp_spans = []
+        for span in spans:
+            start_ns = int(span.started_at * 1e9)
+            otlp_spans.append({
+                'traceId': trace_id,
+                'spanId': secrets.token_hex(8),
+                'name': span.stage,
+                'kind': 1,
+                'startTimeUnixNano': str(start_ns),
+                'endTimeUnixNano': str(start_ns + int(span.duration * 1e9)),
+                'attributes': [attribute(key, value) for key, value in span.attrs.items()],
+                'status': {'code': 2 if span.attrs.get('ok') is False else 1},
+            })
+
+        return {'resourceSpans': [{
+            'resource': {'attributes': [attribute('service.name', service_name)]},
+            'scopeSpans': [{'scope': {'name': 'descarga_videos.telemetry'}, 'spans': otlp_spans}],
+        }]}
+
+    def write_otlp(self, path) -> str:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.otlp_json(), f)
+        return str(path)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip('/') != '/metrics':
+            self.send_error(404)
+            return
+        body = self.server.recorder.prometheus_text().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_metrics(recorder: RunRecorder, port: int, host: str = '127.0.0.1') -> ThreadingHTTPServer:
+    """Expone /metrics en segundo plano (formato Prometheus) mientras dura el proceso"""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    server.recorder = recorder
+    threading.Thread(target=server.serve_forever, name='metrics', daemon=True).start()
+    return server
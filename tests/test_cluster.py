@@ -0,0 +1,174 @@
+import os
+import threading
+import time
+
+import pytest
+
+from cluster import ClusterWorker, DirectoryLock, MemoryWorkStore, SqliteWorkStore, open_work_store
+
+
+def vimeo(video_id, **extra):
+    return {'url': f"https://vimeo.com/{video_id}", 'platform': 'vimeo', **extra}
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def store(request, tmp_path):
+    if request.param == 'memory':
+        return MemoryWorkStore()
+    return SqliteWorkStore(tmp_path / 'cola.sqlite3')
+
+
+def test_enqueue_ignores_known_videos_and_prefers_the_hashed_url(store):
+    assert store.enqueue([vimeo(123456701), {'url': 'https://player.vimeo.com/video/123456701?h=abcdef12'}]) == 1
+    assert store.enqueue([vimeo(123456701), vimeo(123456702)]) == 1
+
+    urls = {item['video_id']: item['url'] for item in store.list()}
+    assert urls == {'123456701': 'https://player.vimeo.com/video/123456701?h=abcdef12',
+                    '123456702': 'https://vimeo.com/123456702'}
+
+
+def test_concurrent_claims_never_hand_out_the_same_video(store):
+    store.enqueue([vimeo(123456700 + i) for i in range(30)])
+    claimed = []
+    lock = threading.Lock()
+
+    def claim_all(worker):
+        while True:
+            item = store.claim(worker, lease_seconds=60)
+            if item is None:
+                return
+            with lock:
+                claimed.append(item['video_id'])
+
+    threads = [threading.Thread(target=claim_all, args=(f"node:1:{i}",)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(claimed) == 30
+    assert len(set(claimed)) == 30
+    assert store.stats()['by_status']['running'] == 30
+
+
+def test_expired_lease_is_reclaimed_and_the_old_owner_loses_it(store):
+    store.enqueue([vimeo(123456701)])
+    first = store.claim('a:1:1', lease_seconds=0.05)
+    assert first['attempts'] == 1
+    assert store.claim('b:1:1', lease_seconds=60) is None
+
+    time.sleep(0.1)
+    second = store.claim('b:1:1', lease_seconds=60)
+    assert (second['video_id'], second['owner'], second['attempts']) == ('123456701', 'b:1:1', 2)
+
+    assert store.heartbeat('vimeo', '123456701', 'a:1:1') is False
+    assert store.complete('vimeo', '123456701', 'a:1:1', {'video_path': 'x'}) is False
+    assert store.fail('vimeo', '123456701', 'a:1:1', 'boom') is None
+    assert store.complete('vimeo', '123456701', 'b:1:1', {'video_path': 'x'}) is True
+    assert store.list('done')[0]['result'] == {'video_path': 'x'}
+
+
+def test_heartbeat_extends_the_lease(store):
+    store.enqueue([vimeo(123456701)])
+    store.claim('a:1:1', lease_seconds=0.1)
+    assert store.heartbeat('vimeo', '123456701', 'a:1:1', lease_seconds=60) is True
+    time.sleep(0.15)
+    assert store.claim('b:1:1') is None
+
+
+def test_expired_lease_without_attempts_left_fails(store):
+    store.enqueue([vimeo(123456701)], max_attempts=1)
+    store.claim('a:1:1', lease_seconds=0.05)
+    time.sleep(0.1)
+
+    assert store.claim('b:1:1') is None
+    item = store.list()[0]
+    assert item['status'] == 'failed'
+    assert 'Lease caducado' in item['error']
+
+
+def test_fail_backs_off_exponentially_until_attempts_run_out(store):
+    store.enqueue([vimeo(123456701)], max_attempts=3)
+
+    store.claim('a:1:1')
+    before = time.time()
+    assert store.fail('vimeo', '123456701', 'a:1:1', 'primer fallo', retry_delay=30) == 'queued'
+    item = store.list()[0]
+    assert item['status'] == 'queued' and item['owner'] is None
+    assert before + 30 <= item['next_attempt_at'] <= time.time() + 30
+    assert store.claim('a:1:1') is None  # aún en espera
+
+    # Segundo intento: el retraso se duplica
+    _make_claimable(store)
+    store.claim('a:1:1')
+    before = time.time()
+    assert store.fail('vimeo', '123456701', 'a:1:1', 'segundo fallo', retry_delay=30) == 'queued'
+    assert store.list()[0]['next_attempt_at'] >= before + 60
+
+    _make_claimable(store)
+    assert store.claim('a:1:1')['attempts'] == 3
+    assert store.fail('vimeo', '123456701', 'a:1:1', 'último fallo') == 'failed'
+    item = store.list()[0]
+    assert (item['status'], item['error']) == ('failed', 'último fallo')
+    assert store.claim('a:1:1') is None
+
+
+def _make_claimable(store):
+    """Adelanta el reintento programado (sin esperar el backoff real)"""
+    if isinstance(store, MemoryWorkStore):
+        for item in store._items.values():
+            item['next_attempt_at'] = 0
+    else:
+        with store._write() as conn:
+            conn.execute("UPDATE videos SET next_attempt_at = 0")
+
+
+def test_open_work_store_specs(tmp_path):
+    assert isinstance(open_work_store('memory://'), MemoryWorkStore)
+    assert isinstance(open_work_store(tmp_path / 'a.sqlite3'), SqliteWorkStore)
+    assert isinstance(open_work_store(f"sqlite://{tmp_path}/b.sqlite3"), SqliteWorkStore)
+    with pytest.raises(ValueError):
+        open_work_store('redis://localhost')
+
+
+def test_directory_lock_only_releases_its_own_lock(tmp_path):
+    path = tmp_path / 'cola.lock'
+    mine = DirectoryLock(path)
+    mine.acquire()
+    DirectoryLock(path).release()  # sin testigo: no debe borrar el lock ajeno
+    assert path.is_dir()
+    mine.release()
+    assert not path.exists()
+
+
+def test_directory_lock_breaks_a_stale_lock(tmp_path):
+    path = tmp_path / 'cola.lock'
+    path.mkdir()
+    (path / DirectoryLock.OWNER_FILE).write_text('nodo-caido')
+    os.utime(path, (0, 0))
+
+    lock = DirectoryLock(path, stale=1, timeout=5)
+    lock.acquire()
+    assert (path / DirectoryLock.OWNER_FILE).read_text() != 'nodo-caido'
+    lock.release()
+    assert list(tmp_path.iterdir()) == []
+
+
+class FakeDownloader:
+    VIDEO_EXTENSIONS = ['.mp4']
+
+    def __init__(self, events=None):
+        self.events = events
+
+    def process_single_url(self, url, output_dir, referer, extract_audio, transcribe):
+        time.sleep(0.01)
+        return {'video_path': f"{output_dir}/{url.rsplit('/', 1)[-1]}.mp4"}
+
+
+def test_worker_threads_drain_the_queue_and_count_every_video(store, tmp_path):
+    store.enqueue([vimeo(123456700 + i) for i in range(40)])
+    worker = ClusterWorker(store, FakeDownloader, tmp_path / 'compartido', workers=4,
+                           extract_audio=False, transcribe=False, worker_id='nodo:1')
+
+    assert worker.run(drain=True) == 40
+    assert store.stats()['by_status']['done'] == 40
@@ -0,0 +1,71 @@
+import pytest
+
+from compact import CompactTranscript, compact_path, is_compact, srt_to_segments, write_compact
+
+OUTPUT = {
+    'segments': [
+        {'start': 0.0, 'end': 4.2, 'text': ' Hola a todos '},
+        {'start': 4.2, 'end': 9.0, 'text': 'Hoy vemos la configuración'},
+        {'start': 9.0, 'end': 30.5, 'text': 'Un segmento largo'},
+        {'start': 31.0, 'end': 33.0, 'text': 'ação, 日本語'},
+    ],
+    'transcription': 'ignorado: se regenera desde los segmentos',
+    'detected_language': 'es',
+    'backend': 'local',
+}
+
+
+@pytest.fixture
+def transcript(tmp_path):
+    path = compact_path(tmp_path / 'clase')
+    assert write_compact(path, OUTPUT) == 4
+    with CompactTranscript(path) as transcript:
+        yield transcript
+
+
+def test_round_trip_keeps_segments_and_metadata(transcript):
+    assert is_compact(transcript.path)
+    assert len(transcript) == 4
+    assert transcript.meta == {'detected_language': 'es', 'backend': 'local'}
+    assert transcript.segment(0) == {'id': 0, 'start': 0.0, 'end': 4.2, 'text': 'Hola a todos'}
+    assert transcript.text(3) == 'ação, 日本語'
+    assert transcript.duration == 33.0
+
+    output = transcript.to_output()
+    assert output['detected_language'] == 'es'
+    assert output['transcription'].startswith('1\n00:00:00,000 --> 00:00:04,200\nHola a todos\n')
+    assert [s['text'] for s in srt_to_segments(transcript.to_srt())] == [s['text'].strip() for s in OUTPUT['segments']]
+
+
+@pytest.mark.parametrize('start, end, expected', [
+    (0, 1, [0]),
+    (4.2, 5, [1]),          # el segmento que termina justo en 4.2 no se solapa
+    (20, 31.5, [2, 3]),     # el segmento largo empezó mucho antes del rango
+    (30.6, 30.9, []),
+    (100, 200, []),
+])
+def test_slice_finds_the_overlapping_segments(transcript, start, end, expected):
+    assert [s['id'] for s in transcript.slice(start, end)] == expected
+
+
+def test_writes_from_srt_and_rejects_other_files(tmp_path):
+    path = tmp_path / 'srt.bin'
+    write_compact(path, "1\n00:00:01,000 --> 00:00:02,500\nuna línea\n\n2\n00:00:03,000 --> 00:00:04,000\notra\n")
+    with CompactTranscript(path) as transcript:
+        assert transcript.segments() == [{'id': 0, 'start': 1.0, 'end': 2.5, 'text': 'una línea'},
+                                         {'id': 1, 'start': 3.0, 'end': 4.0, 'text': 'otra'}]
+
+    other = tmp_path / 'otro.bin'
+    other.write_bytes(b'{"segments": []}' + b'\0' * 64)
+    assert not is_compact(other)
+    with pytest.raises(ValueError):
+        CompactTranscript(other)
+
+
+def test_empty_transcript(tmp_path):
+    path = tmp_path / 'vacia.bin'
+    write_compact(path, {'segments': []})
+    with CompactTranscript(path) as transcript:
+        assert len(transcript) == 0
+        assert transcript.duration == 0.0
+        assert transcript.slice(0, 10) == []
@@ -0,0 +1,105 @@
+import json
+from pathlib import Path
+
+import main
+from events import EventBus
+from partial import PartialTranscriptWriter, load_partial_segments, merge_resumed, partial_paths
+from results import TranscriptionResult
+from silence import OffsetMap
+
+
+def segment(start, end, text):
+    return {'start': start, 'end': end, 'text': text}
+
+
+def test_load_skips_a_half_written_last_line(tmp_path):
+    base = tmp_path / 'clase'
+    writer = PartialTranscriptWriter(base)
+    writer.add_many([segment(0, 2, 'hola'), segment(2, 4, 'mundo')])
+    writer.close()
+    with open(partial_paths(base)['jsonl'], 'a', encoding='utf-8') as f:
+        f.write('{"id": 2, "start": 4')
+
+    assert [s['text'] for s in load_partial_segments(base)] == ['hola', 'mundo']
+    assert load_partial_segments(tmp_path / 'otra') == []
+
+
+def test_restore_keeps_times_and_sync_output_only_adds_new_segments(tmp_path):
+    base = tmp_path / 'clase'
+    writer = PartialTranscriptWriter(base, OffsetMap([(100, 200)]))
+    writer.restore([segment(0, 50, 'antes'), segment(50, 100, 'del corte')])
+    writer.sync_output({'segments': [segment(0, 5, 'uno')]})
+    writer.sync_output({'segments': [segment(0, 5, 'uno'), segment(5, 9, 'dos')]})
+    writer.close()
+
+    saved = load_partial_segments(base)
+    assert [(s['id'], s['start'], s['text']) for s in saved] == [
+        (0, 0, 'antes'), (1, 50, 'del corte'), (2, 100, 'uno'), (3, 105, 'dos')]
+
+
+def test_merge_resumed_prepends_only_segments_before_the_resume_point():
+    resumed = [segment(0, 3, 'a'), segment(3, 6.001, 'b'), segment(6, 9, 'repetido')]
+    output = {'segments': [{'id': 0, **segment(6, 8, 'c')}], 'detected_language': 'es'}
+
+    merged = merge_resumed(output, resumed, until=6)
+    assert [(s['id'], s['text']) for s in merged['segments']] == [(0, 'a'), (1, 'b'), (2, 'c')]
+    assert merged['transcription'].startswith('1\n00:00:00,000 --> 00:00:03,000\na\n')
+    assert merged['detected_language'] == 'es'
+    assert merge_resumed(output, [], until=6) is output
+
+
+class FlakyBackend:
+    """Entrega segmentos al writer y falla a mitad la primera vez"""
+    name = 'fake'
+    max_size_mb = None
+    compression_formats = ('mp3',)
+
+    def __init__(self, segments, fail_after=None):
+        self.segments = segments
+        self.fail_after = fail_after
+        self.calls = []
+
+    def transcribe(self, downloader, audio_path, output_base=None, writer=None):
+        self.calls.append(Path(audio_path).name)
+        delivered = []
+        for i, item in enumerate(self.segments):
+            if self.fail_after is not None and i == self.fail_after:
+                return TranscriptionResult(False, str(audio_path), error='proceso interrumpido')
+            delivered.append({'id': i, **item})
+            writer.add(delivered[-1])
+        return TranscriptionResult(True, str(audio_path), {'segments': delivered, 'transcription': ''})
+
+
+def test_rerun_resumes_after_the_last_saved_segment(tmp_path, monkeypatch):
+    audio = tmp_path / 'clase.mp3'
+    audio.write_bytes(b'audio')
+    base = tmp_path / 'clase'
+    downloader = main.VideoDownloader(events=EventBus())
+
+    downloader.backend = FlakyBackend([segment(0, 4, 'uno'), segment(4, 9, 'dos'), segment(9, 12, 'tres')],
+                                      fail_after=2)
+    assert downloader._transcribe(audio, base).ok is False
+    assert len(load_partial_segments(base)) == 2
+
+    cuts = []
+
+    def audio_tail(path, start):
+        cuts.append(start)
+        tail = tmp_path / 'clase_resto.mp3'
+        tail.write_bytes(b'resto')
+        return tail, OffsetMap([(start, 30)])
+
+    monkeypatch.setattr(downloader, '_audio_tail', audio_tail)
+    # El resto del audio empieza en 0 en su propia línea temporal
+    downloader.backend = FlakyBackend([segment(0, 3, 'tres'), segment(3, 5, 'cuatro')])
+    result = downloader._transcribe(audio, base)
+
+    assert result.ok
+    assert cuts == [9]
+    assert downloader.backend.calls == ['clase_resto.mp3']
+    assert [(s['start'], s['end'], s['text']) for s in result.output['segments']] == [
+        (0, 4, 'uno'), (4, 9, 'dos'), (9, 12, 'tres'), (12, 14, 'cuatro')]
+    saved = json.loads((tmp_path / 'clase_transcription.json').read_text(encoding='utf-8'))
+    assert [s['text'] for s in saved['segments']] == ['uno', 'dos', 'tres', 'cuatro']
+    assert not any(path.exists() for path in partial_paths(base).values())
+    assert not [path.name for path in tmp_path.iterdir() if '_resto' in path.name or 'offsets' in path.name]
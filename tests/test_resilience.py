@@ -0,0 +1,156 @@
+import pytest
+
+from resilience import (CircuitBreaker, CircuitOpenError, FATAL, RetryPolicy, Resilience, THROTTLED,
+                        TRANSIENT, classify)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class HttpError(Exception):
+    def __init__(self, status, message='error'):
+        super().__init__(message)
+        self.status = status
+
+
+def make_resilience(clock, threshold=1, attempts=1):
+    breaker = CircuitBreaker(failure_threshold=threshold, reset_timeout=30, clock=clock)
+    return Resilience(policy=RetryPolicy(max_attempts=attempts), breaker=breaker, sleep=lambda delay: None)
+
+
+def fail_with(exc):
+    def func():
+        raise exc
+    return func
+
+
+def open_circuit(resilience, clock):
+    with pytest.raises(HttpError):
+        resilience.call(fail_with(HttpError(503)))
+    assert resilience.breaker.state == 'open'
+    clock.now += 31
+    assert resilience.breaker.state == 'half_open'
+
+
+def test_classify():
+    assert classify(HttpError(429)) == THROTTLED
+    assert classify(HttpError(503)) == TRANSIENT
+    assert classify(HttpError(408)) == TRANSIENT
+    assert classify(HttpError(401)) == FATAL
+    assert classify(ConnectionError('reset')) == TRANSIENT
+    assert classify(TimeoutError()) == TRANSIENT
+    assert classify(RuntimeError('Billing required')) == FATAL
+    assert classify(RuntimeError('algo raro')) == TRANSIENT
+
+
+def test_circuit_opens_after_threshold_and_rejects_calls():
+    clock = Clock()
+    resilience = make_resilience(clock, threshold=2, attempts=2)
+    with pytest.raises(HttpError):
+        resilience.call(fail_with(HttpError(500)))
+    assert resilience.breaker.state == 'open'
+
+    with pytest.raises(CircuitOpenError) as error:
+        resilience.call(lambda: 'ok')
+    assert error.value.retry_in == 30
+
+
+def test_successful_probe_closes_the_circuit():
+    clock = Clock()
+    resilience = make_resilience(clock)
+    open_circuit(resilience, clock)
+
+    assert resilience.call(lambda: 'ok') == 'ok'
+    assert resilience.breaker.state == 'closed'
+
+
+def test_failed_probe_reopens_the_circuit():
+    clock = Clock()
+    resilience = make_resilience(clock, threshold=5)
+    resilience.breaker.failures = 4
+    open_circuit(resilience, clock)
+
+    with pytest.raises(HttpError):
+        resilience.call(fail_with(HttpError(502)))
+    assert resilience.breaker.state == 'open'
+
+
+def test_fatal_probe_counts_as_the_api_answering():
+    clock = Clock()
+    resilience = make_resilience(clock)
+    open_circuit(resilience, clock)
+
+    with pytest.raises(HttpError):
+        resilience.call(fail_with(HttpError(401, 'Unauthorized')))
+    assert resilience.breaker.state == 'closed'
+    clock.now = 1e6
+    assert resilience.call(lambda: 'ok') == 'ok'
+
+
+@pytest.mark.parametrize('exc', [KeyboardInterrupt(), GeneratorExit()])
+def test_interrupted_probe_releases_the_half_open_slot(exc):
+    clock = Clock()
+    resilience = make_resilience(clock)
+    open_circuit(resilience, clock)
+
+    with pytest.raises(type(exc)):
+        resilience.call(fail_with(exc))
+    assert resilience.breaker.state == 'half_open'
+    assert resilience.call(lambda: 'ok') == 'ok'
+    assert resilience.breaker.state == 'closed'
+
+
+def test_only_one_probe_at_a_time():
+    clock = Clock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=clock)
+    breaker.record_failure()
+    clock.now += 31
+
+    assert breaker.allow() is True
+    assert breaker.allow() is False
+    breaker.release_probe()
+    assert breaker.allow() is True
+
+
+def test_throttling_retries_with_retry_after_and_halves_the_limit():
+    clock = Clock()
+    delays = []
+    breaker = CircuitBreaker(failure_threshold=1, clock=clock)
+    resilience = Resilience(policy=RetryPolicy(max_attempts=3), breaker=breaker, sleep=delays.append)
+    resilience.limiter.limit = 8
+    calls = iter([HttpError(429, 'Too many requests, retry after 7 seconds'), None])
+
+    def func():
+        exc = next(calls)
+        if exc:
+            raise exc
+        return 'ok'
+
+    assert resilience.call(func) == 'ok'
+    assert delays == [7.0]
+    assert resilience.limiter.limit == 4
+    assert breaker.state == 'closed'
+
+
+@pytest.mark.parametrize('exc', [AttributeError("'Client' object has no attribute 'files'"),
+                                 ValueError('La API de archivos de Replicate no devolvió una URL de descarga'),
+                                 FileNotFoundError('/no/existe')])
+def test_programming_errors_are_not_retried_nor_counted(exc):
+    clock = Clock()
+    calls = []
+    resilience = make_resilience(clock, threshold=1, attempts=5)
+
+    def func():
+        calls.append(1)
+        raise exc
+
+    with pytest.raises(type(exc)):
+        resilience.call(func)
+    assert classify(exc) == FATAL
+    assert len(calls) == 1
+    assert resilience.breaker.state == 'closed'
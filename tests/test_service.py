@@ -0,0 +1,146 @@
+import sqlite3
+import time
+from contextlib import closing
+
+import pytest
+
+from service import JobService, JobStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(tmp_path / 'jobs.sqlite3', timeout=0.1)
+
+
+def _make_claimable(store):
+    """Adelanta los reintentos programados (sin esperar el backoff real)"""
+    with closing(store._connect()) as conn:
+        conn.execute("UPDATE jobs SET next_attempt_at = 0")
+
+
+def test_claims_by_priority_then_order(store):
+    first = store.submit('url', 'https://vimeo.com/1')
+    urgent = store.submit('url', 'https://vimeo.com/2', priority=5)
+    store.submit('html', 'pagina.html')
+
+    job = store.claim_next()
+    assert (job['id'], job['status'], job['attempts']) == (urgent, 'running', 1)
+    assert store.claim_next()['id'] == first
+    assert store.claim_next()['kind'] == 'html'
+    assert store.claim_next() is None
+
+
+def test_submit_rejects_unknown_kinds(store):
+    with pytest.raises(ValueError):
+        store.submit('ftp', 'x')
+
+
+def test_fail_requeues_with_backoff_until_attempts_run_out(store):
+    job_id = store.submit('url', 'https://vimeo.com/1', max_attempts=2)
+
+    store.claim_next()
+    before = time.time()
+    assert store.fail(job_id, 'primer fallo', retry_delay=30) is True
+    job = store.get(job_id)
+    assert job['status'] == 'queued'
+    assert job['next_attempt_at'] >= before + 30
+    assert store.claim_next() is None  # aún en espera
+
+    _make_claimable(store)
+    assert store.claim_next()['attempts'] == 2
+    assert store.fail(job_id, 'segundo fallo') is False
+    job = store.get(job_id)
+    assert (job['status'], job['error']) == ('failed', 'segundo fallo')
+
+
+def test_cancel_only_affects_queued_jobs(store):
+    running = store.submit('url', 'https://vimeo.com/1', priority=1)
+    queued = store.submit('url', 'https://vimeo.com/2')
+    store.claim_next()
+
+    assert store.cancel(running) is False
+    assert store.cancel(queued) is True
+    assert store.get(queued)['status'] == 'canceled'
+
+
+def test_requeue_interrupted(store):
+    job_id = store.submit('url', 'https://vimeo.com/1')
+    store.claim_next()
+    assert store.requeue_interrupted() == 1
+    assert store.get(job_id)['status'] == 'queued'
+
+
+def test_claim_on_a_locked_database_raises_the_lock_error(store):
+    store.submit('url', 'https://vimeo.com/1')
+    with closing(sqlite3.connect(store.db_path, isolation_level=None)) as other:
+        other.execute("BEGIN IMMEDIATE")
+        with pytest.raises(sqlite3.OperationalError, match='locked'):
+            store.claim_next()
+        other.execute("ROLLBACK")
+
+    assert store.claim_next()['status'] == 'running'
+
+
+class FakeDownloader:
+    def __init__(self, events=None):
+        self.events = events
+
+    def process_single_url(self, url, output_dir, referer, extract_audio, transcribe):
+        return {'video_path': f"{output_dir}/{url.rsplit('/', 1)[-1]}.mp4"}
+
+
+def _wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_worker_survives_store_errors_and_keeps_processing(store, monkeypatch):
+    service = JobService(store, FakeDownloader, workers=1, poll_interval=0.01, retry_delay=0)
+    broken = store.submit('url', 'https://vimeo.com/1', priority=1, max_attempts=1)
+    healthy = store.submit('url', 'https://vimeo.com/2')
+
+    finish = store.finish
+    calls = []
+
+    def flaky_finish(job_id, result):
+        calls.append(job_id)
+        if len(calls) == 1:
+            raise sqlite3.OperationalError('database is locked')
+        finish(job_id, result)
+
+    monkeypatch.setattr(store, 'finish', flaky_finish)
+    service.start()
+    try:
+        assert _wait_until(lambda: store.get(healthy)['status'] == 'done')
+    finally:
+        service.stop()
+
+    job = store.get(broken)
+    assert job['status'] == 'failed'
+    assert 'database is locked' in job['error']
+
+
+def test_worker_survives_claim_errors(store, monkeypatch):
+    service = JobService(store, FakeDownloader, workers=1, poll_interval=0.01)
+    job_id = store.submit('url', 'https://vimeo.com/1')
+
+    claim_next = store.claim_next
+    failures = iter([sqlite3.OperationalError('database is locked')])
+
+    def flaky_claim():
+        error = next(failures, None)
+        if error:
+            raise error
+        return claim_next()
+
+    monkeypatch.setattr(store, 'claim_next', flaky_claim)
+    service.start()
+    try:
+        assert _wait_until(lambda: store.get(job_id)['status'] == 'done')
+        assert all(thread.is_alive() for thread in service._threads)
+    finally:
+        service.stop()
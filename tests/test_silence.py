@@ -0,0 +1,47 @@
+import pytest
+
+from silence import OffsetMap, offsets_path
+
+# Voz en [0, 10) y [25, 40): se recortaron 15 s de silencio
+REGIONS = [(0, 10), (25, 40)]
+
+
+@pytest.mark.parametrize('compact, original', [(0, 0), (4.5, 4.5), (10, 25), (12, 27), (25, 40), (30, 45)])
+def test_to_original_skips_the_removed_silence(compact, original):
+    assert OffsetMap(REGIONS).to_original(compact) == original
+
+
+def test_an_end_at_a_cut_stays_in_the_previous_region():
+    offset_map = OffsetMap(REGIONS)
+    assert offset_map.to_original(10, is_end=True) == 10
+    assert offset_map.to_original(10) == 25
+    assert offset_map.compact_duration == 25
+
+
+def test_remap_output_moves_segments_and_srt_to_the_original_timeline():
+    output = {
+        'transcription': "1\n00:00:08,000 --> 00:00:10,000\nfin\n\n2\n00:00:10,000 --> 00:00:12,500\nsigue\n",
+        'segments': [{'start': 8, 'end': 10, 'text': 'fin'}, {'start': 10, 'end': 12.5, 'text': 'sigue'}],
+        'detected_language': 'es',
+    }
+    remapped = OffsetMap(REGIONS).remap_output(output)
+
+    assert [(s['start'], s['end']) for s in remapped['segments']] == [(8, 10), (25, 27.5)]
+    assert '00:00:08,000 --> 00:00:10,000' in remapped['transcription']
+    assert '00:00:25,000 --> 00:00:27,500' in remapped['transcription']
+    assert remapped['detected_language'] == 'es'
+    assert output['segments'][1]['start'] == 10  # la salida original no se modifica
+
+
+def test_shifted_map_starts_later_in_the_original():
+    shifted = OffsetMap(REGIONS).shifted(100)
+    assert shifted.regions == [(100, 110), (125, 140)]
+    assert shifted.to_original(12) == 127
+
+
+def test_save_and_load(tmp_path):
+    audio = tmp_path / 'clase_voz.mp3'
+    OffsetMap(REGIONS).save(offsets_path(audio))
+
+    assert OffsetMap.load(offsets_path(audio)).regions == [(0, 10), (25, 40)]
+    assert OffsetMap.load(tmp_path / 'no-existe.json') is None
@@ -0,0 +1,103 @@
+import os
+
+import pytest
+
+from storage import StorageManager, StoragePolicy, classify, media_base, parse_retention, parse_size
+
+
+def make(folder, name, size=100, age=0):
+    path = folder / name
+    path.write_bytes(b'x' * size)
+    os.utime(path, (1_000_000 + age, 1_000_000 + age))
+    return path
+
+
+@pytest.mark.parametrize('name, kind', [
+    ('Clase 1.mp4', 'video'),
+    ('Clase 1.mp3', 'audio'),
+    ('Clase 1_compressed.opus', 'intermediate'),
+    ('Clase 1_resto_voz.mp3', 'intermediate'),
+    ('Clase 1.mp3.offsets.json', 'intermediate'),
+    ('Clase 1_transcription.partial.jsonl', 'partial'),
+    ('Clase 1_transcription.bin', 'transcript'),
+    ('Clase 1_LEGIBLE.txt', 'transcript'),
+    ('Clase 1.info.json', 'metadata'),
+    ('Clase 1.vtt', 'export'),
+])
+def test_classify_and_media_base(name, kind):
+    assert classify(name) == kind
+    assert media_base(name) in ('Clase 1', 'Clase 1_resto')
+
+
+def test_parsers():
+    assert parse_size('1.5K') == 1536
+    assert parse_size('20G') == 20 * 1024 ** 3
+    assert parse_retention('video=after_audio, audio=lru') == {'video': 'after_audio', 'audio': 'lru'}
+    with pytest.raises(ValueError):
+        parse_size('mucho')
+    with pytest.raises(ValueError):
+        parse_retention('video=nunca')
+
+
+def test_transcript_event_removes_intermediates_but_keeps_transcripts(tmp_path):
+    video = make(tmp_path, 'a.mp4')
+    compressed = make(tmp_path, 'a_compressed.opus')
+    partial = make(tmp_path, 'a_transcription.partial.srt')
+    transcript = make(tmp_path, 'a_transcription.json')
+    other_video = make(tmp_path, 'b_compressed.opus')
+    manager = StorageManager(StoragePolicy(), tmp_path)
+
+    manager.after('transcript', transcript)
+
+    assert not compressed.exists() and not partial.exists()
+    assert video.exists() and transcript.exists() and other_video.exists()
+
+
+def test_after_audio_keeps_a_video_without_audio(tmp_path):
+    manager = StorageManager(StoragePolicy({'video': 'after_audio'}), tmp_path)
+    video = make(tmp_path, 'a.mp4')
+    manager.after('audio', video)
+    assert video.exists()
+
+    make(tmp_path, 'a.mp3')
+    manager.after('audio', video)
+    assert not video.exists()
+
+
+def test_disk_cap_evicts_least_recently_used_and_only_what_is_no_longer_needed(tmp_path):
+    # a: transcrito (video y audio desalojables); b: solo video (hace falta para extraer el audio)
+    old_video = make(tmp_path, 'a.mp4', 1000, age=0)
+    old_audio = make(tmp_path, 'a.mp3', 500, age=1)
+    transcript = make(tmp_path, 'a_transcription.json', 50, age=2)
+    untouched = make(tmp_path, 'b.mp4', 1000, age=-10)
+    manager = StorageManager(StoragePolicy(max_bytes=1600), tmp_path)
+
+    assert manager.enforce() == 1000
+    assert not old_video.exists()
+    assert old_audio.exists() and transcript.exists() and untouched.exists()
+
+    manager.policy.max_bytes = 100
+    assert manager.enforce() == 500
+    assert not old_audio.exists()
+    assert transcript.exists() and untouched.exists()
+
+
+def test_pinned_files_are_never_evicted(tmp_path):
+    video = make(tmp_path, 'a.mp4', 1000)
+    make(tmp_path, 'a.mp3', 10)
+    manager = StorageManager(StoragePolicy(max_bytes=100), tmp_path)
+
+    with manager.pinned(video):
+        assert manager.enforce() == 0
+        assert video.exists()
+    assert manager.enforce() == 1000
+
+
+def test_a_video_with_audio_goes_but_an_untranscribed_audio_stays(tmp_path):
+    audio = make(tmp_path, 'a.mp3', 500, age=0)
+    video = make(tmp_path, 'a.mp4', 1000, age=1)
+    manager = StorageManager(StoragePolicy(max_bytes=10), tmp_path)
+
+    assert manager.enforce() == 1000
+    assert not video.exists()
+    assert audio.exists()
@@ -0,0 +1,42 @@
+from subtitles import Cue, build_cues, render_ass, render_srt, render_vtt, wrap_words
+
+LONG_TEXT = ("En esta lección vamos a configurar el servidor paso a paso, revisando cada opción "
+             "del archivo de configuración y explicando qué hace cada una de ellas")
+
+
+def test_wrap_words_respects_the_line_length():
+    lines = wrap_words(LONG_TEXT, 42)
+    assert ' '.join(lines) == LONG_TEXT
+    assert all(len(line) <= 42 for line in lines)
+    assert wrap_words('supercalifragilisticoespialidoso corto', 10) == ['supercalifragilisticoespialidoso', 'corto']
+
+
+def test_long_segment_is_split_into_cues_that_cover_its_time():
+    cues = build_cues([{'start': 10, 'end': 22, 'text': LONG_TEXT}])
+
+    assert len(cues) > 1
+    assert all(len(cue.lines) <= 2 and all(len(line) <= 42 for line in cue.lines) for cue in cues)
+    assert cues[0].start == 10 and cues[-1].end == 22
+    assert all(a.end == b.start for a, b in zip(cues, cues[1:]))
+    assert ' '.join(line for cue in cues for line in cue.lines) == LONG_TEXT
+
+
+def test_short_segments_are_not_split_below_the_minimum_duration():
+    cues = build_cues([{'start': 0, 'end': 1.5, 'text': LONG_TEXT}], min_duration=1.0)
+    assert len(cues) == 1
+    assert cues[0].end - cues[0].start == 1.5
+
+
+def test_empty_or_inverted_segments_are_skipped():
+    assert build_cues([{'start': 0, 'end': 2, 'text': '  '}, {'start': 5, 'end': 4, 'text': 'al revés'}]) == []
+
+
+def test_renderers():
+    cues = [Cue(1.5, 3.25, ['Hola', 'mundo']), Cue(3661.0, 3662.0, ['{llaves}'])]
+
+    assert render_srt(cues) == ("1\n00:00:01,500 --> 00:00:03,250\nHola\nmundo\n\n"
+                                "2\n01:01:01,000 --> 01:01:02,000\n{llaves}\n\n")
+    assert render_vtt(cues).startswith("WEBVTT\n\n00:00:01.500 --> 00:00:03.250\nHola\nmundo\n\n")
+    ass = render_ass(cues)
+    assert "Dialogue: 0,0:00:01.50,0:00:03.25,Default,,0,0,0,,Hola\\Nmundo\n" in ass
+    assert "(llaves)" in ass
@@ -0,0 +1,24 @@
+import pytest
+
+from uploads import LocalDirectoryBackend, UploadCache, UploadManager
+
+
+def test_local_directory_backend_needs_a_public_url(tmp_path):
+    with pytest.raises(ValueError):
+        LocalDirectoryBackend(tmp_path / 'subidas', None)
+
+
+def test_upload_once_per_content_and_reuse_the_url(tmp_path):
+    audio = tmp_path / 'clase.mp3'
+    audio.write_bytes(b'audio')
+    backend = LocalDirectoryBackend(tmp_path / 'subidas', 'https://cdn.example.com/audio/', ttl=3600)
+    manager = UploadManager(backend, UploadCache(tmp_path / 'uploads.json'))
+
+    upload, reused = manager.url_for(audio)
+    assert not reused
+    assert upload.url == f"https://cdn.example.com/audio/{upload.sha256}.mp3"
+    assert (tmp_path / 'subidas' / f"{upload.sha256}.mp3").read_bytes() == b'audio'
+
+    # Otro proceso (otra caché sobre el mismo archivo) reutiliza la subida
+    other = UploadManager(backend, UploadCache(tmp_path / 'uploads.json'))
+    assert other.url_for(audio) == (upload, True)
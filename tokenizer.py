@@ -0,0 +1,130 @@
+"""
+Tokenización para el índice buscable y la búsqueda en transcripciones.
+Las lecciones pueden estar en español, inglés o portugués (la transcripción usa language=auto),
+así que el idioma sale del detected_language de la transcripción o, si no está (un SRT suelto),
+se estima contando palabras vacías. Cada segmento se recorre con una sola expresión compilada;
+las palabras se normalizan (NFKC, minúsculas, sin acentos: "Información" e "informacion" son la
+misma entrada) y se descartan las palabras vacías y muletillas del idioma ("entonces", "like",
+"então"...). El plegado se memoriza por palabra distinta, que son pocas frente al total
+"""
+
+import re
+import unicodedata
+from functools import lru_cache
+
+MIN_LENGTH = 4
+# Letras de cualquier alfabeto (sin dígitos ni _), con apóstrofo interno (don't, d'água)
+_WORD = re.compile(r"[^\W\d_]+(?:['’][^\W\d_]+)*")
+
+# Formas plegadas (minúsculas, sin acentos), incluidas las muletillas habituales de cada idioma
+STOP_WORDS = {
+    'es': frozenset("""
+        algo algun alguna algunas alguno algunos ante antes aqui aquel aquella aquellas aquellos asi aunque
+        bastante bien bueno buena buenas buenos cada casi claro como con contra cosa cosas cual cuales cualquier
+        cuando cuanto cuanta cuantos cuantas dado debe deben decir decia desde despues dice dicen dicho donde
+        durante ella ellas ellos entonces entre eran eres esta estaba estaban estado estamos estan estar estas
+        este esto estos estoy fuera fueron gran hace hacemos hacen hacer hacia hasta hay hemos igual luego
+        mayor mejor menos mientras mismo misma mismos mismas mucha muchas mucho muchos nada nadie nosotros
+        nuestra nuestras nuestro nuestros otra otras otro otros para pero poco poder podemos porque pues puede
+        pueden puedes quien quienes quiere quiero sabes sean segun sera siempre siendo sido sino sobre solo somos
+        sois suya suyo tambien tampoco tanto tener tengo tenemos tiene tienen toda todas todavia todo todos
+        tras tuvo usted ustedes vale vamos varios vaya verdad vez veces vosotros vuestra vuestro yendo ahora
+        ahi alla aca osea digamos tipo oye mira mirad okay okey cierto dije dijo tal tales
+        """.split()),
+    'en': frozenset("""
+        about above actually after again against also another anyway around aren because been before being
+        below between both cannot could couldn didn does doesn doing done down during each else even ever every
+        first from further gonna gotta have haven having here hers herself himself into itself just kind know
+        like little made make many maybe more most much must myself need never next okay only other ours
+        ourselves over pretty quite really right same says shall shan should shouldn since some something sort
+        still such sure take than that thats their theirs them themselves then there these they thing things
+        think this those though through thus today together very wanna want wasn well were weren what whatever
+        when where whether which while whom whose will with within without won't wont would wouldn yeah yes
+        your yours yourself yourselves don't it's that's there's i'm you're we're they're i've you've can't
+        going gets getting come comes look mean means basically literally stuff alright
+        """.split()),
+    'pt': frozenset("""
+        agora ainda algo alguem algum alguma algumas alguns antes aqui aquela aquelas aquele aqueles aquilo
+        assim ate bastante bem cada coisa coisas como contra depois desde dessa desse desta deste disso disto
+        dizer durante ela elas ele eles entao entre era eram essa essas esse esses esta estao estas estava
+        estavam este estes estou estar fazer fazem feito fica ficar foram gente isso isto mais mas mesma
+        mesmo mesmos muita muitas muito muitos nada nenhum nessa nesse nesta neste nossa nossas nosso nossos
+        numa outra outras outro outros para pela pelas pelo pelos pode podem porque pois quais qual qualquer
+        quando quanto quem sabe seja sejam sem sera seu seus sido sobre somos sua suas tambem tanto tem tempo
+        tenho ter teve tinha toda todas todo todos tudo uma umas vamos voce voces vai beleza tipo olha certo
+        """.split()),
+}
+
+# detected_language puede venir como código (faster-whisper: 'es') o nombre (Replicate: 'spanish')
+LANGUAGE_ALIASES = {
+    'es': 'es', 'spa': 'es', 'spanish': 'es', 'espanol': 'es', 'castellano': 'es',
+    'en': 'en', 'eng': 'en', 'english': 'en', 'ingles': 'en',
+    'pt': 'pt', 'por': 'pt', 'portuguese': 'pt', 'portugues': 'pt',
+}
+
+# Muestra para estimar el idioma cuando la transcripción no lo trae
+DETECT_SAMPLE = 200
+
+
+def fold_text(text):
+    """Forma de comparación: normalización de compatibilidad, minúsculas y sin diacríticos ('Ação' -> 'acao')"""
+    decomposed = unicodedata.normalize('NFKD', text.casefold().replace('’', "'"))
+    return unicodedata.normalize('NFC', ''.join(c for c in decomposed if not unicodedata.combining(c)))
+
+
+# La misma función memorizada por palabra (un segmento repite pocas palabras distintas)
+fold = lru_cache(maxsize=65536)(fold_text)
+
+
+def normalize_language(language):
+    """'es', 'es-ES', 'Spanish', 'español'... -> 'es'; None si no es un idioma soportado"""
+    if not language:
+        return None
+    code = fold(str(language)).replace('_', '-').split('-')[0].strip()
+    return LANGUAGE_ALIASES.get(code)
+
+
+def detect_language(texts):
+    """Idioma con más palabras vacías en una muestra de los textos (None si no hay indicios)"""
+    hits = dict.fromkeys(STOP_WORDS, 0)
+    for text in texts[:DETECT_SAMPLE]:
+        for match in _WORD.finditer(text):
+            word = fold(match.group())
+            for language, stop_words in STOP_WORDS.items():
+                if word in stop_words:
+                    hits[language] += 1
+    language, count = max(hits.items(), key=lambda item: item[1])
+    return language if count else None
+
+
+class Tokenizer:
+    """
+    Palabras indexables de un texto en un idioma. tokens() devuelve pares (clave plegada,
+    forma original en minúsculas) para poder indexar por la clave y mostrar la palabra con
+    sus acentos
+    """
+
+    def __init__(self, language=None, min_length=MIN_LENGTH):
+        self.language = normalize_language(language)
+        self.min_length = min_length
+        # Sin idioma conocido se descartan las palabras vacías de todos los soportados
+        self.stop_words = (STOP_WORDS[self.language] if self.language
+                           else frozenset().union(*STOP_WORDS.values()))
+
+    @classmethod
+    def for_texts(cls, texts, language=None):
+        """Tokenizer con el idioma indicado o, si falta o no se reconoce, el estimado de los textos"""
+        return cls(normalize_language(language) or detect_language(texts))
+
+    def tokens(self, text):
+        stop_words = self.stop_words
+        min_length = self.min_length
+        result = []
+        for match in _WORD.finditer(text):
+            word = match.group()
+            if len(word) < min_length:
+                continue
+            key = fold(word)
+            if key not in stop_words:
+                result.append((key, word.lower()))
+        return result
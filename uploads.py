@@ -0,0 +1,195 @@
+"""
+Gestor de subidas de audio para la transcripción
+Sube cada audio una sola vez (API de archivos de Replicate o un sustituto local/almacén de
+objetos) y cachea la URL resultante por hash de contenido hasta que caduca, de modo que los
+reintentos y las re-transcripciones con otros parámetros reutilizan la misma subida
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+# Margen antes de la caducidad en el que una URL ya no se reutiliza
+# (el modelo tiene que poder descargarla cuando arranque la predicción)
+EXPIRY_MARGIN = 15 * 60
+
+# Vida útil asumida cuando el backend no informa de la caducidad
+DEFAULT_TTL = 24 * 3600
+
+
+def file_sha256(path, chunk_size=1024 * 1024) -> str:
+    """Hash SHA-256 del contenido, leído por bloques"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _parse_expiry(value) -> Optional[float]:
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, datetime):
+        return value.timestamp()
+    try:
+        return datetime.fromisoformat(str(value).replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        return None
+
+
+@dataclass(slots=True)
+class Upload:
+    """Una subida reutilizable: URL del audio y cuándo deja de ser válida"""
+    sha256: str
+    url: str
+    expires_at: float
+    size: int
+    backend: str
+    file_id: Optional[str] = None
+
+    def is_valid(self, now=None, margin=EXPIRY_MARGIN) -> bool:
+        return self.expires_at - margin > (now or time.time())
+
+
+class ReplicateFilesBackend:
+    """Sube a la API de archivos de Replicate (replicate.files.create)"""
+
+    name = 'replicate'
+
+    def upload(self, path, sha256):
+        import replicate
+
+        with open(path, 'rb') as f:
+            uploaded = replicate.files.create(f, metadata={'sha256': sha256, 'name': Path(path).name})
+
+        urls = getattr(uploaded, 'urls', None) or {}
+        url = urls.get('get') if isinstance(urls, dict) else getattr(urls, 'get', None)
+        if not url:
+            raise ValueError("La API de archivos de Replicate no devolvió una URL de descarga")
+        return url, _parse_expiry(getattr(uploaded, 'expires_at', None)), getattr(uploaded, 'id', None)
+
+
+class LocalDirectoryBackend:
+    """
+    Sustituto local: copia el audio a un directorio (p. ej. montado desde un almacén de objetos
+    o servido por HTTP) y devuelve su URL bajo base_url. base_url es obligatoria: el modelo
+    descarga el audio desde los servidores de Replicate, así que una ruta file:// no le sirve
+    """
+
+    name = 'local'
+
+    def __init__(self, directory, base_url, ttl=None):
+        if not base_url:
+            raise ValueError("El directorio de subidas necesita una URL pública desde la que Replicate "
+                             "pueda descargar el audio (DESCARGA_VIDEOS_UPLOAD_URL)")
+        self.directory = Path(directory)
+        self.base_url = base_url.rstrip('/')
+        self.ttl = ttl
+
+    def upload(self, path, sha256):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        name = f"{sha256}{Path(path).suffix}"
+        target = self.directory / name
+        if not target.exists():
+            tmp = target.with_name(target.name + '.part')
+            shutil.copyfile(path, tmp)
+            os.replace(tmp, target)
+
+        url = f"{self.base_url}/{name}"
+        expires_at = time.time() + self.ttl if self.ttl else None
+        return url, expires_at, name
+
+
+class UploadCache:
+    """
+    Caché persistente sha256 → Upload en un archivo JSON.
+    Se relee del disco antes de subir, así que varios procesos comparten las subidas
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._entries: Dict[str, Upload] = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                raw = json.load(f)
+        except (OSError, ValueError):
+            return
+        now = time.time()
+        self._entries = {
+            sha256: Upload(**entry) for sha256, entry in raw.items()
+            if isinstance(entry, dict) and entry.get('expires_at', 0) > now
+        }
+
+    def _save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = {sha256: {'sha256': u.sha256, 'url': u.url, 'expires_at': u.expires_at, 'size': u.size,
+                         'backend': u.backend, 'file_id': u.file_id}
+                for sha256, u in self._entries.items()}
+        tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp, self.path)
+
+    def get(self, sha256, backend) -> Optional[Upload]:
+        with self._lock:
+            upload = self._entries.get(sha256)
+            if upload is None or not upload.is_valid():
+                self._load()
+                upload = self._entries.get(sha256)
+        if upload is not None and upload.backend == backend and upload.is_valid():
+            return upload
+        return None
+
+    def put(self, upload: Upload) -> None:
+        with self._lock:
+            self._load()
+            self._entries[upload.sha256] = upload
+            self._save()
+
+
+class UploadManager:
+    """
+    Devuelve una URL para un audio subiéndolo solo si no hay una subida vigente del mismo contenido.
+    Las subidas simultáneas del mismo archivo (varios workers) se serializan por hash
+    """
+
+    def __init__(self, backend=None, cache=None):
+        self.backend = backend or ReplicateFilesBackend()
+        self.cache = cache
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def _lock_for(self, sha256):
+        with self._locks_guard:
+            return self._locks.setdefault(sha256, threading.Lock())
+
+    def url_for(self, path):
+        """
+        Devuelve (Upload, reutilizada). Lanza la excepción del backend si la subida falla
+        """
+        sha256 = file_sha256(path)
+        with self._lock_for(sha256):
+            if self.cache is not None:
+                upload = self.cache.get(sha256, self.backend.name)
+                if upload is not None:
+                    return upload, True
+
+            url, expires_at, file_id = self.backend.upload(path, sha256)
+            upload = Upload(sha256, url, expires_at or time.time() + DEFAULT_TTL, os.path.getsize(path),
+                            self.backend.name, file_id)
+            if self.cache is not None:
+                self.cache.put(upload)
+            return upload, False
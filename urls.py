@@ -0,0 +1,105 @@
+"""
+Canonicalización de URLs de video (Vimeo y Loom)
+Una misma grabación aparece en las páginas con formas distintas (player.vimeo.com/video/ID?h=HASH,
+vimeo.com/ID/HASH, embed o share de Loom, entidades HTML, barras escapadas, parámetros de
+reproductor y de seguimiento). Aquí se reducen a una URL descargable y una clave única
+(plataforma, ID), conservando solo los parámetros que dan acceso al video:
+  - h: hash de los videos ocultos de Vimeo (sin él yt-dlp recibe un 404)
+  - app_id: identificador de la app del reproductor embebido de Vimeo
+El resultado se memoriza: una página repite la misma URL decenas de veces
+"""
+
+import html
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+# Parámetros que se conservan por plataforma (el resto es configuración del reproductor o seguimiento)
+KEEP_PARAMS = {'vimeo': ('h', 'app_id'), 'loom': ()}
+
+_VIMEO_PLAYER_PATH = re.compile(r'^/video/(\d+)(?:/config)?/?$', re.I)
+# vimeo.com/ID, /ID/HASH, /channels/x/ID, /groups/x/videos/ID, /showcase/N/video/ID, /manage/videos/ID/HASH
+_VIMEO_PAGE_PATH = re.compile(
+    r'^/(?:channels/[\w-]+/|groups/[\w-]+/videos/|showcase/\d+/video/|manage/videos/)?(\d{6,})(?:/([0-9a-f]{6,}))?/?$',
+    re.I)
+_LOOM_PATH = re.compile(r'^/(embed|share)/([a-f0-9]{32})/?$', re.I)
+
+
+@dataclass(frozen=True, slots=True)
+class CanonicalUrl:
+    platform: str
+    url: str
+    video_id: Optional[str] = None
+    unlisted_hash: Optional[str] = None
+
+    @property
+    def key(self):
+        """Clave de deduplicación: las distintas formas de un mismo video dan la misma"""
+        return (self.platform, self.video_id or self.url)
+
+
+def detect_platform(url):
+    host = urlsplit(url).netloc.lower()
+    if host.endswith('vimeo.com'):
+        return 'vimeo'
+    if host.endswith('loom.com'):
+        return 'loom'
+    return None
+
+
+def _prepare(raw_url):
+    """Entidades HTML, barras escapadas de JSON, comillas/barras finales y esquema"""
+    url = html.unescape(raw_url.strip()).replace('\\/', '/')
+    url = url.rstrip('\\"\').,;')
+    if url.startswith('//'):
+        url = 'https:' + url
+    elif not re.match(r'^[a-z]+://', url, re.I):
+        url = 'https://' + url
+    return url
+
+
+@lru_cache(maxsize=4096)
+def canonical_video_url(raw_url, platform=None) -> CanonicalUrl:
+    """
+    Forma canónica de una URL de Vimeo o Loom. Las URLs que no se reconocen se devuelven sin
+    parámetros de seguimiento y con video_id None (su clave es la propia URL)
+    """
+    url = _prepare(raw_url)
+    parts = urlsplit(url)
+    platform = platform or detect_platform(url) or ''
+    host = parts.netloc.lower()
+    params = dict(parse_qsl(parts.query))
+    keep = {key: params[key] for key in KEEP_PARAMS.get(platform, ()) if params.get(key)}
+
+    if platform == 'vimeo':
+        player = _VIMEO_PLAYER_PATH.match(parts.path)
+        page = None if player or host.startswith('player.') else _VIMEO_PAGE_PATH.match(parts.path)
+        if player:
+            video_id = player.group(1)
+            unlisted_hash = keep.get('h')
+            query = urlencode({key: keep[key] for key in ('h', 'app_id') if key in keep})
+            return CanonicalUrl('vimeo', f"https://player.vimeo.com/video/{video_id}" + (f"?{query}" if query else ''),
+                                video_id, unlisted_hash)
+        if page:
+            video_id = page.group(1)
+            unlisted_hash = page.group(2) or keep.get('h')
+            return CanonicalUrl('vimeo', f"https://vimeo.com/{video_id}" + (f"/{unlisted_hash}" if unlisted_hash else ''),
+                                video_id, unlisted_hash)
+
+    if platform == 'loom':
+        match = _LOOM_PATH.match(parts.path)
+        if match:
+            kind, video_id = match.group(1).lower(), match.group(2).lower()
+            return CanonicalUrl('loom', f"https://www.loom.com/{kind}/{video_id}", video_id)
+
+    query = urlencode(keep)
+    return CanonicalUrl(platform, f"{parts.scheme}://{parts.netloc}{parts.path}" + (f"?{query}" if query else ''))
+
+
+def prefer(current, candidate):
+    """Entre dos formas del mismo video, la que trae el hash de acceso (si no, la primera)"""
+    if current is None or (candidate.unlisted_hash and not current.unlisted_hash):
+        return candidate
+    return current
@@ -0,0 +1,196 @@
+"""
+Ejecución de yt-dlp: construcción del comando, lectura del progreso y supervisor de descargas
+en paralelo.
+La salida de cada proceso se lee por bloques desde un único bucle asyncio (sin un hilo por
+proceso) y cada línea se clasifica con una sola expresión regular compilada, que produce
+eventos estructurados: progreso, destino del archivo, fusión de formatos, errores...
+"""
+
+import asyncio
+import re
+import time
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+# Navegador "real" para Loom, que a veces rechaza el user-agent por defecto
+LOOM_USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
+                   "Chrome/91.0.4472.124 Safari/537.36")
+
+READ_SIZE = 64 * 1024
+# yt-dlp separa las actualizaciones de progreso con \r; las demás líneas con \n
+_LINE_BREAK = re.compile(rb'\r\n|\r|\n')
+
+PROGRESS_LINE = re.compile(
+    r'^\[download\]\s+(?:'
+    # [download]  45.2% of ~ 123.45MiB at 1.23MiB/s ETA 00:32 (frag 3/40)
+    r'(?P<percent>\d+(?:\.\d+)?)%\s+of\s+~?\s*(?P<size>\S+)(?:\s+in\s+\S+)?'
+    r'(?:\s+at\s+(?P<speed>\S+))?(?:\s+ETA\s+(?P<eta>\S+))?(?:\s+\(frag\s+(?P<fragment>\d+/\d+)\))?'
+    r'|Destination:\s+(?P<destination>.+)'
+    r'|(?P<existing>.+?) has already been downloaded.*'
+    r'|(?P<step>Downloading .+)'
+    r')$'
+    r'|^\[Merger\]\s+Merging formats into\s+"(?P<merged>.+)"$'
+    r'|^(?P<note>\[\w+\]\s+(?:Writing|Merging|Fixing|Deleting) .+)$'
+    r'|^(?P<error>ERROR:.+)$'
+)
+
+
+@dataclass(slots=True)
+class ProgressEvent:
+    """Línea de yt-dlp ya interpretada. kind: progress, path, step, note o error"""
+    kind: str
+    percent: Optional[float] = None
+    size: Optional[str] = None
+    speed: Optional[str] = None
+    eta: Optional[str] = None
+    fragment: Optional[str] = None
+    path: Optional[str] = None
+    message: Optional[str] = None
+
+
+def parse_line(line) -> Optional[ProgressEvent]:
+    """Interpreta una línea de salida de yt-dlp; None si no es relevante"""
+    match = PROGRESS_LINE.match(line.strip())
+    if match is None:
+        return None
+    groups = match.groupdict()
+    if groups['percent'] is not None:
+        return ProgressEvent('progress', float(groups['percent']), groups['size'], groups['speed'],
+                             groups['eta'], groups['fragment'])
+    path = groups['merged'] or groups['destination'] or groups['existing']
+    if path:
+        return ProgressEvent('path', path=path.strip(), message=match.group(0),
+                             percent=100.0 if groups['existing'] else None)
+    if groups['step']:
+        return ProgressEvent('step', message=groups['step'])
+    if groups['note']:
+        return ProgressEvent('note', message=groups['note'])
+    return ProgressEvent('error', message=groups['error'])
+
+
+def build_command(url, platform, platform_dir, referer=None):
+    """Comando de yt-dlp con progreso línea a línea y los metadatos junto al video"""
+    cmd = [
+        "yt-dlp",
+        url,
+        "-o", f"{platform_dir}/%(title)s.%(ext)s",
+        "--write-description",
+        "--write-info-json",
+        "--progress",  # Mostrar progreso
+        "--newline",  # Una línea por actualización (más fácil de leer desde una tubería)
+        "--no-warnings",  # Reducir ruido
+    ]
+    if platform == 'loom':
+        cmd.extend(["--user-agent", LOOM_USER_AGENT])
+    if referer:
+        cmd.extend(["--referer", referer])
+    return cmd
+
+
+@dataclass(slots=True)
+class DownloadJob:
+    """Una ejecución de yt-dlp y su estado, actualizado a medida que llega la salida"""
+    url: str
+    platform: str
+    cmd: List[str]
+    slot: int = 0
+    label: str = ''
+    percent: float = 0.0
+    size: Optional[str] = None
+    speed: Optional[str] = None
+    eta: Optional[str] = None
+    path: Optional[str] = None
+    returncode: Optional[int] = None
+    error: Optional[str] = None
+    started_at: Optional[float] = None
+    duration: float = 0.0
+
+    @property
+    def ok(self):
+        return self.returncode == 0
+
+    @property
+    def state(self):
+        if self.started_at is None:
+            return 'pendiente'
+        if self.returncode is None and self.error is None:
+            return 'descargando'
+        return 'ok' if self.ok else 'error'
+
+
+class YtDlpSupervisor:
+    """
+    Ejecuta varios yt-dlp a la vez (como mucho max_parallel) y multiplexa su salida en un solo
+    hilo. on_event(job, ProgressEvent) se llama por cada línea relevante; on_finish(job) al
+    terminar cada proceso. Ambos se ejecutan en el hilo que llamó a run()
+    """
+
+    def __init__(self, max_parallel=8, on_event: Callable = None, on_finish: Callable = None):
+        self.max_parallel = max(1, int(max_parallel or 1))
+        self.on_event = on_event
+        self.on_finish = on_finish
+
+    def run(self, jobs):
+        """Ejecuta los trabajos y devuelve la misma lista con returncode/path/error rellenados"""
+        for slot, job in enumerate(jobs):
+            job.slot = slot
+        if jobs:
+            asyncio.run(self._run_all(jobs))
+        return jobs
+
+    async def _run_all(self, jobs):
+        semaphore = asyncio.Semaphore(self.max_parallel)
+        await asyncio.gather(*(self._run_job(job, semaphore) for job in jobs))
+
+    async def _run_job(self, job, semaphore):
+        async with semaphore:
+            job.started_at = time.time()
+            start = time.perf_counter()
+            try:
+                process = await asyncio.create_subprocess_exec(
+                    *job.cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT)
+            except FileNotFoundError:
+                job.error = f"{job.cmd[0]} no está instalado"
+            except OSError as e:
+                job.error = str(e)
+            else:
+                try:
+                    await self._read_output(job, process)
+                    job.returncode = await process.wait()
+                except asyncio.CancelledError:
+                    # Ctrl+C: no dejar procesos huérfanos descargando
+                    if process.returncode is None:
+                        process.kill()
+                    raise
+                if job.returncode != 0 and job.error is None:
+                    job.error = f"yt-dlp terminó con código {job.returncode}"
+            job.duration = time.perf_counter() - start
+            if self.on_finish is not None:
+                self.on_finish(job)
+
+    async def _read_output(self, job, process):
+        pending = b''
+        while True:
+            chunk = await process.stdout.read(READ_SIZE)
+            if not chunk:
+                break
+            *lines, pending = _LINE_BREAK.split(pending + chunk)
+            for line in lines:
+                self._handle_line(job, line)
+        if pending:
+            self._handle_line(job, pending)
+
+    def _handle_line(self, job, raw):
+        event = parse_line(raw.decode('utf-8', errors='replace'))
+        if event is None:
+            return
+        if event.kind == 'progress':
+            job.percent, job.size, job.speed, job.eta = event.percent, event.size, event.speed, event.eta
+        elif event.kind == 'path':
+            job.path = event.path  # la última (fusión de formatos) es la definitiva
+            if event.percent is not None:
+                job.percent = event.percent
+        elif event.kind == 'error':
+            job.error = event.message
+        if self.on_event is not None:
+            self.on_event(job, event)